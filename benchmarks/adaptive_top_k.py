@@ -0,0 +1,140 @@
+"""
+compare the fixed top k retrieval against the adaptive top k configs,
+reporting the candidates passed on to the reranker and how many of
+the query topic's points they hold
+
+usage:
+    python -m benchmarks.adaptive_top_k --top-k 50
+    python -m benchmarks.adaptive_top_k --target server  # the configured qdrant
+
+the points gather around topics, a query is relevant to its topic's points
+"""
+
+import argparse
+import json
+import time
+import uuid
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from tc_hivemind_backend.db.qdrant import QdrantSingleton
+from utils.qdrant_utils import AdaptiveTopK
+
+ADAPTIVE_CONFIGS = {
+    "threshold=0.5": {"score_threshold": 0.5},
+    "gap=0.05": {"score_gap": 0.05},
+    "threshold=0.5,gap=0.05": {"score_threshold": 0.5, "score_gap": 0.05},
+}
+
+
+def prepare_collection(
+    client: QdrantClient, vectors: np.ndarray, topics: np.ndarray
+) -> str:
+    collection_name = f"benchmark_adaptive_top_k_{uuid.uuid4().hex[:8]}"
+    client.create_collection(
+        collection_name,
+        vectors_config=models.VectorParams(
+            size=vectors.shape[1], distance=models.Distance.COSINE
+        ),
+    )
+    for offset in range(0, len(vectors), 1000):
+        batch = vectors[offset : offset + 1000]
+        client.upsert(
+            collection_name,
+            points=models.Batch(
+                ids=list(range(offset, offset + len(batch))),
+                vectors=batch.tolist(),
+                payloads=[
+                    {"topic": int(topic)} for topic in topics[offset : offset + 1000]
+                ],
+            ),
+        )
+    return collection_name
+
+
+def measure(
+    client: QdrantClient,
+    collection_name: str,
+    queries: np.ndarray,
+    query_topics: np.ndarray,
+    adaptive_top_k: AdaptiveTopK,
+) -> dict[str, float]:
+    candidates = []
+    precisions = []
+    latencies = []
+    for query, topic in zip(queries, query_topics):
+        start = time.perf_counter()
+        points = client.query_points(
+            collection_name,
+            query=query.tolist(),
+            limit=adaptive_top_k.max_k,
+            score_threshold=adaptive_top_k.score_threshold,
+            with_payload=["topic"],
+        ).points
+        points = adaptive_top_k.cut(points)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        candidates.append(len(points))
+        relevant = sum(point.payload["topic"] == topic for point in points)
+        precisions.append(relevant / max(len(points), 1))
+
+    return {
+        "mean_candidates": float(np.mean(candidates)),
+        "precision": float(np.mean(precisions)),
+        "mean_ms": float(np.mean(latencies)),
+    }
+
+
+def main(args: argparse.Namespace) -> dict:
+    rng = np.random.default_rng(args.seed)
+    centers = rng.normal(size=(args.topics, args.dim))
+    topics = rng.integers(0, args.topics, args.points)
+    vectors = centers[topics] + rng.normal(scale=0.6, size=(args.points, args.dim))
+    query_topics = rng.integers(0, args.topics, args.queries)
+    queries = centers[query_topics] + rng.normal(
+        scale=0.6, size=(args.queries, args.dim)
+    )
+
+    if args.target == "server":
+        client = QdrantSingleton.get_instance().get_client()
+    else:
+        client = QdrantClient(":memory:")
+    collection_name = prepare_collection(client, vectors, topics)
+    try:
+        report = {
+            "fixed": measure(
+                client,
+                collection_name,
+                queries,
+                query_topics,
+                AdaptiveTopK(max_k=args.top_k),
+            )
+        }
+        for name, config in ADAPTIVE_CONFIGS.items():
+            report[name] = measure(
+                client,
+                collection_name,
+                queries,
+                query_topics,
+                AdaptiveTopK(min_k=args.min_k, max_k=args.top_k, **config),
+            )
+    finally:
+        client.delete_collection(collection_name)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument("--min-k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", choices=["memory", "server"], default="memory")
+    args = parser.parse_args()
+
+    print(json.dumps(main(args), indent=2))
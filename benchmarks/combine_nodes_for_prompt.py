@@ -0,0 +1,135 @@
+"""
+time building the summary query prompt context from the retrieved nodes,
+against the previous per-node implementation
+
+usage:
+    python -m benchmarks.combine_nodes_for_prompt --summary-nodes 100 --raw-nodes 500
+"""
+
+import argparse
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from llama_index.core.schema import NodeWithScore, TextNode
+from schema.type import DataType
+from utils.query_engine.qdrant_query_engine_utils import QdrantEngineUtils
+
+START_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def legacy_combine_nodes_for_prompt(
+    metadata_date_key: str,
+    summary_nodes: list[NodeWithScore],
+    raw_nodes: list[NodeWithScore],
+) -> str:
+    # the implementation before the vectorized day keys, kept to compare against
+    raw_nodes_by_date: dict[str, list[NodeWithScore]] = {}
+    for raw_node in raw_nodes:
+        timestamp = raw_node.metadata[metadata_date_key]
+        date_str = (
+            datetime.fromtimestamp(timestamp)
+            .replace(tzinfo=timezone.utc)
+            .strftime("%Y-%m-%d")
+        )
+        if date_str not in raw_nodes_by_date:
+            raw_nodes_by_date[date_str] = []
+        raw_nodes_by_date[date_str].append(raw_node)
+
+    combined_summaries: dict[str, str] = defaultdict(str)
+    for summary_node in summary_nodes:
+        date = summary_node.metadata["date"]
+        summary_bullets = set(summary_node.text.split("\n"))
+        if "" in summary_bullets:
+            summary_bullets.remove("")
+        combined_summaries[date] += "\n".join(summary_bullets)
+
+    combined_sections = []
+    for date, summary_bullets in combined_summaries.items():
+        section = f"Date: {date}\nContext Summary:\n" + summary_bullets + "\n\n"
+        if date in raw_nodes_by_date:
+            raw_texts_cleaned = []
+            for node in raw_nodes_by_date[date]:
+                raw_texts_cleaned.append(node.text.replace("\n", " "))
+            section += "Raw Messages:\n" + "\n".join(raw_texts_cleaned)
+        combined_sections.append(section)
+
+    return "\n\n".join(combined_sections)
+
+
+def random_nodes(
+    summary_count: int, raw_count: int, days: int
+) -> tuple[list[NodeWithScore], list[NodeWithScore]]:
+    summary_nodes = [
+        NodeWithScore(
+            node=TextNode(
+                text="\n".join(
+                    f"- bullet {random.randint(0, 50)} of the day" for _ in range(8)
+                ),
+                metadata={
+                    "date": (
+                        START_DATE + timedelta(days=random.randint(0, days - 1))
+                    ).strftime("%Y-%m-%d")
+                },
+            )
+        )
+        for _ in range(summary_count)
+    ]
+    raw_nodes = [
+        NodeWithScore(
+            node=TextNode(
+                text=" ".join(f"word{random.randint(0, 5000)}" for _ in range(40)),
+                metadata={
+                    "createdAt": (
+                        START_DATE + timedelta(minutes=random.randint(0, days * 1440))
+                    ).timestamp()
+                },
+            )
+        )
+        for _ in range(raw_count)
+    ]
+    return summary_nodes, raw_nodes
+
+
+def time_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(args: argparse.Namespace) -> dict:
+    random.seed(args.seed)
+    summary_nodes, raw_nodes = random_nodes(args.summary_nodes, args.raw_nodes, args.days)
+    utils = QdrantEngineUtils(
+        metadata_date_key="createdAt",
+        metadata_date_format=DataType.FLOAT,
+        date_margin=1,
+    )
+
+    return {
+        "legacy_ms": time_call(
+            lambda: legacy_combine_nodes_for_prompt(
+                "createdAt", summary_nodes, raw_nodes
+            ),
+            args.repeat,
+        ),
+        "current_ms": time_call(
+            lambda: utils.combine_nodes_for_prompt(summary_nodes, raw_nodes),
+            args.repeat,
+        ),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--summary-nodes", type=int, default=100)
+    parser.add_argument("--raw-nodes", type=int, default=500)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(main(args), indent=2))
@@ -0,0 +1,144 @@
+"""
+compare expanding the summary dates with one search over their date ranges
+vs. a batched request of a bounded search per summary day
+
+usage:
+    python -m benchmarks.day_grouped_expansion --summary-days 10
+    python -m benchmarks.day_grouped_expansion --target server  # the configured qdrant
+
+the prompt pairs each summary with the raw messages of its own day,
+`on_summary_days` is the share of the retrieved messages that could be paired
+"""
+
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from schema.type import DataType
+from tc_hivemind_backend.db.qdrant import QdrantSingleton
+from utils.globals import D_RETRIEVER_SEARCH, K2_RETRIEVER_SEARCH
+from utils.query_engine.qdrant_query_engine_utils import QdrantEngineUtils
+
+START_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def prepare_collection(
+    client: QdrantClient, vectors: np.ndarray, dates: np.ndarray
+) -> str:
+    collection_name = f"benchmark_day_grouped_{uuid.uuid4().hex[:8]}"
+    client.create_collection(
+        collection_name,
+        vectors_config=models.VectorParams(
+            size=vectors.shape[1], distance=models.Distance.COSINE
+        ),
+    )
+    for offset in range(0, len(vectors), 1000):
+        batch = vectors[offset : offset + 1000]
+        client.upsert(
+            collection_name,
+            points=models.Batch(
+                ids=list(range(offset, offset + len(batch))),
+                vectors=batch.tolist(),
+                payloads=[{"date": float(date)} for date in dates[offset : offset + 1000]],
+            ),
+        )
+    return collection_name
+
+
+def on_days(points: list, days: set[str]) -> float:
+    paired = sum(
+        datetime.fromtimestamp(point.payload["date"], tz=timezone.utc).strftime(
+            "%Y-%m-%d"
+        )
+        in days
+        for point in points
+    )
+    return paired / max(len(points), 1)
+
+
+def main(args: argparse.Namespace) -> dict:
+    rng = np.random.default_rng(args.seed)
+    vectors = rng.normal(size=(args.points, args.dim)).astype(np.float32)
+    dates = START_DATE.timestamp() + rng.uniform(0, 365 * 86400, args.points)
+    queries = rng.normal(size=(args.queries, args.dim))
+
+    utils = QdrantEngineUtils(
+        metadata_date_key="date",
+        metadata_date_format=DataType.FLOAT,
+        date_margin=D_RETRIEVER_SEARCH,
+    )
+
+    if args.target == "server":
+        client = QdrantSingleton.get_instance().get_client()
+    else:
+        client = QdrantClient(":memory:")
+    collection_name = prepare_collection(client, vectors, dates)
+    try:
+        report: dict = {}
+        measures: dict[str, dict[str, list[float]]] = {
+            "date_ranges": {"ms": [], "candidates": [], "on_summary_days": []},
+            "day_grouped": {"ms": [], "candidates": [], "on_summary_days": []},
+        }
+        for query in queries:
+            summary_days = [
+                (START_DATE + timedelta(days=int(day))).strftime("%Y-%m-%d")
+                for day in rng.choice(365, args.summary_days, replace=False)
+            ]
+
+            start = time.perf_counter()
+            points = client.search(
+                collection_name,
+                query_vector=query.tolist(),
+                query_filter=utils.define_raw_data_filters(summary_days),
+                limit=K2_RETRIEVER_SEARCH,
+                with_payload=["date"],
+            )
+            measure = measures["date_ranges"]
+            measure["ms"].append((time.perf_counter() - start) * 1000)
+            measure["candidates"].append(len(points))
+            measure["on_summary_days"].append(on_days(points, set(summary_days)))
+
+            start = time.perf_counter()
+            responses = client.search_batch(
+                collection_name,
+                requests=[
+                    models.SearchRequest(
+                        vector=query.tolist(),
+                        filter=filter,
+                        limit=args.group_size,
+                        with_payload=models.PayloadSelectorInclude(include=["date"]),
+                    )
+                    for filter in utils.define_day_filters(summary_days)
+                ],
+            )
+            points = [point for group in responses for point in group]
+            measure = measures["day_grouped"]
+            measure["ms"].append((time.perf_counter() - start) * 1000)
+            measure["candidates"].append(len(points))
+            measure["on_summary_days"].append(on_days(points, set(summary_days)))
+
+        for name, measure in measures.items():
+            report[name] = {key: float(np.mean(values)) for key, values in measure.items()}
+    finally:
+        client.delete_collection(collection_name)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--summary-days", type=int, default=10)
+    parser.add_argument("--group-size", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", choices=["memory", "server"], default="memory")
+    args = parser.parse_args()
+
+    print(json.dumps(main(args), indent=2))
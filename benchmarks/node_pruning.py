@@ -0,0 +1,88 @@
+"""
+measure pruning the retrieved nodes of their duplicates before reranking:
+the candidates left for the cross-encoder, the context words left for the llm,
+and the time the pruning takes
+
+usage:
+    python -m benchmarks.node_pruning --nodes 150 --repost-share 0.3 --mmr-top-k 30
+
+the candidates are random messages, a share of them reposted with a word edited
+and all having a random embedding near their topic's one
+"""
+
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+from llama_index.core.schema import NodeWithScore, TextNode
+from utils.globals import NODE_MMR_LAMBDA, SIMHASH_MAX_DISTANCE
+from utils.query_engine.node_pruning import prune_nodes
+
+
+def random_nodes(args: argparse.Namespace, rng: np.random.Generator) -> list[NodeWithScore]:
+    vocabulary = [f"word{i}" for i in range(5000)]
+    topics = rng.normal(size=(args.topics, args.dim))
+    originals = [random.choices(vocabulary, k=args.words) for _ in range(args.nodes)]
+
+    texts: list[list[str]] = []
+    for _ in range(args.nodes):
+        if texts and random.random() < args.repost_share:
+            words = list(random.choice(texts))
+            words[random.randrange(len(words))] = random.choice(vocabulary)
+        else:
+            words = originals[len(texts)]
+        texts.append(words)
+
+    nodes = []
+    for words in texts:
+        embedding = topics[random.randrange(args.topics)] + rng.normal(
+            scale=0.3, size=args.dim
+        )
+        nodes.append(
+            NodeWithScore(
+                node=TextNode(text=" ".join(words), embedding=embedding.tolist()),
+                score=random.uniform(0.3, 0.9),
+            )
+        )
+    nodes.sort(key=lambda node: node.score, reverse=True)
+    return nodes
+
+
+def main(args: argparse.Namespace) -> dict:
+    random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+    nodes = random_nodes(args, rng)
+    words = sum(len(node.node.get_content().split()) for node in nodes)
+
+    report: dict = {"candidates": len(nodes), "context_words": words}
+    for name, kwargs in {
+        "near_duplicates": {"near_duplicates": True},
+        "near_duplicates_mmr": {"near_duplicates": True, "mmr_top_k": args.mmr_top_k},
+    }.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            pruned = prune_nodes(nodes, mmr_lambda=NODE_MMR_LAMBDA, **kwargs)
+        report[name] = {
+            "ms": (time.perf_counter() - start) / args.repeat * 1000,
+            "candidates": len(pruned),
+            "context_words": sum(len(node.node.get_content().split()) for node in pruned),
+        }
+    report["simhash_max_distance"] = SIMHASH_MAX_DISTANCE
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=150)
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--repost-share", type=float, default=0.3)
+    parser.add_argument("--topics", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--mmr-top-k", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(main(args), indent=2))
@@ -0,0 +1,147 @@
+"""
+time the filtered searches of the raw and summary collections
+before and after creating their payload indexes
+
+usage:
+    python -m benchmarks.payload_indexes --points 100000
+    python -m benchmarks.payload_indexes --target memory  # a quick smoke run
+
+the `server` target is the configured qdrant, the `memory` target runs
+qdrant-client's local mode which ignores payload indexes
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from schema.type import DataType
+from tc_hivemind_backend.db.qdrant import QdrantSingleton
+from utils import qdrant_utils
+from utils.globals import D_RETRIEVER_SEARCH
+from utils.qdrant_utils import ensure_collection_indexes
+from utils.query_engine.qdrant_query_engine_utils import QdrantEngineUtils
+
+VECTOR_SIZE = 256
+START_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+SUMMARY_TYPES = ["day", "week", "thread", "channel"]
+
+
+def prepare_collection(client: QdrantClient, points: int) -> str:
+    collection_name = f"benchmark_payload_indexes_{uuid.uuid4().hex[:8]}"
+    client.create_collection(
+        collection_name,
+        vectors_config=models.VectorParams(
+            size=VECTOR_SIZE, distance=models.Distance.COSINE
+        ),
+    )
+    for offset in range(0, points, 1000):
+        client.upsert(
+            collection_name,
+            points=[
+                models.PointStruct(
+                    id=i,
+                    vector=[random.random() for _ in range(VECTOR_SIZE)],
+                    payload={
+                        "date": (
+                            START_DATE + timedelta(minutes=random.randint(0, 525600))
+                        ).timestamp(),
+                        "type": random.choice(SUMMARY_TYPES),
+                    },
+                )
+                for i in range(offset, min(offset + 1000, points))
+            ],
+        )
+    return collection_name
+
+
+def wait_for_indexing(client: QdrantClient, collection_name: str) -> None:
+    while client.get_collection(collection_name).status != models.CollectionStatus.GREEN:
+        time.sleep(1)
+
+
+def time_filters(
+    client: QdrantClient,
+    collection_name: str,
+    filters: dict[str, models.Filter],
+    repeat: int,
+) -> dict[str, float]:
+    timings: dict[str, float] = {}
+    for name, filter in filters.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            client.query_points(
+                collection_name,
+                query=[random.random() for _ in range(VECTOR_SIZE)],
+                query_filter=filter,
+                limit=50,
+            )
+        timings[name] = (time.perf_counter() - start) / repeat * 1000
+    return timings
+
+
+def main(args: argparse.Namespace) -> dict:
+    utils = QdrantEngineUtils(
+        metadata_date_key="date",
+        metadata_date_format=DataType.FLOAT,
+        date_margin=D_RETRIEVER_SEARCH,
+    )
+    dates = [
+        (START_DATE + timedelta(days=random.randint(0, 364))).strftime("%Y-%m-%d")
+        for _ in range(args.summary_dates)
+    ]
+    filters = {
+        "raw_dates_ms": utils.define_raw_data_filters(dates),
+        "summary_type_ms": models.Filter(
+            must=[
+                models.FieldCondition(key="type", match=models.MatchValue(value="day"))
+            ]
+        ),
+    }
+
+    if args.target == "server":
+        client = QdrantSingleton.get_instance().get_client()
+    else:
+        client = QdrantClient(":memory:")
+    collection_name = prepare_collection(client, args.points)
+    try:
+        if args.target == "server":
+            wait_for_indexing(client, collection_name)
+        report = {"before": time_filters(client, collection_name, filters, args.repeat)}
+
+        start = time.perf_counter()
+        created = ensure_collection_indexes(
+            client,
+            collection_name,
+            {
+                "date": models.PayloadSchemaType.FLOAT,
+                "type": models.PayloadSchemaType.KEYWORD,
+            },
+        )
+        if args.target == "server":
+            wait_for_indexing(client, collection_name)
+        report["indexing"] = {
+            "created": created,
+            "seconds": time.perf_counter() - start,
+        }
+        report["after"] = time_filters(client, collection_name, filters, args.repeat)
+    finally:
+        client.delete_collection(collection_name)
+        qdrant_utils._indexed_collections.discard(collection_name)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--summary-dates", type=int, default=20)
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--target", choices=["memory", "server"], default="server")
+    args = parser.parse_args()
+
+    print(json.dumps(main(args), indent=2))
@@ -0,0 +1,130 @@
+"""
+compare fetching the whole llama-index payload of the retrieved points
+vs. the projected payload used to answer
+
+usage:
+    python -m benchmarks.payload_projection --top-k 100
+    python -m benchmarks.payload_projection --target server  # the configured qdrant
+
+the bytes are the JSON size of the returned payloads (and vectors),
+the parse time is converting the points into the nodes
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from llama_index.core.schema import TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from tc_hivemind_backend.db.qdrant import QdrantSingleton
+from utils.query_engine.combined_qdrant_retriever import (
+    PROJECTED_METADATA_KEYS,
+    PROJECTED_PAYLOAD_FIELDS,
+    points_to_nodes,
+    projected_points_to_nodes,
+)
+
+# the cohere embedding size
+VECTOR_SIZE = 1024
+START_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def random_node(i: int) -> TextNode:
+    # a discord-like raw message with its metadata
+    date = START_DATE + timedelta(minutes=random.randint(0, 525600))
+    return TextNode(
+        id_=str(uuid.uuid4()),
+        text=" ".join(f"word{random.randint(0, 5000)}" for _ in range(60)),
+        metadata={
+            "date": date.timestamp(),
+            "url": f"https://discord.com/channels/1/2/{i}",
+            "author": f"user{random.randint(0, 500)}",
+            "author_username": f"username{random.randint(0, 500)}",
+            "channel": "general",
+            "thread": f"thread {random.randint(0, 100)}",
+            "mentions": [f"user{random.randint(0, 500)}" for _ in range(3)],
+            "replied_user": f"user{random.randint(0, 500)}",
+            "reactions": [f"user{random.randint(0, 500)}" for _ in range(5)],
+            "type": "message",
+        },
+        embedding=[random.random() for _ in range(VECTOR_SIZE)],
+    )
+
+
+def response_bytes(points: list) -> int:
+    return sum(
+        len(json.dumps(point.payload or {})) + len(json.dumps(point.vector or []))
+        for point in points
+    )
+
+
+def time_call(fn, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main(args: argparse.Namespace) -> dict:
+    if args.target == "server":
+        client = QdrantSingleton.get_instance().get_client()
+    else:
+        client = QdrantClient(":memory:")
+
+    collection_name = f"benchmark_payload_projection_{uuid.uuid4().hex[:8]}"
+    vector_store = QdrantVectorStore(client=client, collection_name=collection_name)
+    vector_store.add([random_node(i) for i in range(args.points)])
+    try:
+        query = [random.random() for _ in range(VECTOR_SIZE)]
+        selectors = {
+            "full_with_vectors": (True, True),
+            "full": (True, False),
+            "projected": (
+                models.PayloadSelectorInclude(include=PROJECTED_PAYLOAD_FIELDS),
+                False,
+            ),
+        }
+        report: dict = {}
+        for name, (with_payload, with_vectors) in selectors.items():
+            points, search_ms = time_call(
+                lambda: client.search(
+                    collection_name,
+                    query_vector=query,
+                    limit=args.top_k,
+                    with_payload=with_payload,
+                    with_vectors=with_vectors,
+                ),
+                args.repeat,
+            )
+            if name == "projected":
+                parse = lambda: projected_points_to_nodes(  # noqa: E731
+                    points, PROJECTED_METADATA_KEYS
+                )
+            else:
+                parse = lambda: points_to_nodes(vector_store, points)  # noqa: E731
+            _, parse_ms = time_call(parse, args.repeat)
+            report[name] = {
+                "bytes": response_bytes(points),
+                "search_ms": search_ms,
+                "parse_ms": parse_ms,
+            }
+    finally:
+        client.delete_collection(collection_name)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--target", choices=["memory", "server"], default="memory")
+    args = parser.parse_args()
+
+    print(json.dumps(main(args), indent=2))
@@ -0,0 +1,181 @@
+"""
+sweep the qdrant search params and report their latency and recall@k
+against the exact search, to choose a platform's `QDRANT_SEARCH_PARAMS`
+
+usage:
+    python -m benchmarks.qdrant_search_params --points 50000 --quantization scalar
+    python -m benchmarks.qdrant_search_params --target memory  # a quick smoke run
+
+the `server` target is the configured qdrant (i.e. a local docker container),
+the `memory` target runs qdrant-client's local mode which always searches
+exhaustively, so the params make no difference there
+"""
+
+import argparse
+import json
+import time
+import uuid
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from tc_hivemind_backend.db.qdrant import QdrantSingleton
+
+HNSW_EF_VALUES = [16, 32, 64, 128, 256]
+OVERSAMPLING_VALUES = [1.0, 2.0, 4.0]
+
+
+def clustered_vectors(count: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    # messages gather around topics, uniform random vectors would be unrealistic
+    centers = rng.normal(size=(max(count // 200, 1), dim))
+    vectors = centers[rng.integers(0, len(centers), count)] + rng.normal(
+        scale=0.3, size=(count, dim)
+    )
+    return vectors.astype(np.float32)
+
+
+def prepare_collection(
+    client: QdrantClient, vectors: np.ndarray, quantization: str
+) -> str:
+    collection_name = f"benchmark_search_params_{uuid.uuid4().hex[:8]}"
+    quantization_config = None
+    if quantization == "scalar":
+        quantization_config = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, always_ram=True
+            )
+        )
+    elif quantization == "binary":
+        quantization_config = models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+
+    client.create_collection(
+        collection_name,
+        vectors_config=models.VectorParams(
+            size=vectors.shape[1], distance=models.Distance.COSINE
+        ),
+        quantization_config=quantization_config,
+    )
+    for offset in range(0, len(vectors), 1000):
+        batch = vectors[offset : offset + 1000]
+        client.upsert(
+            collection_name,
+            points=models.Batch(
+                ids=list(range(offset, offset + len(batch))), vectors=batch.tolist()
+            ),
+        )
+    return collection_name
+
+
+def wait_for_indexing(client: QdrantClient, collection_name: str) -> None:
+    while client.get_collection(collection_name).status != models.CollectionStatus.GREEN:
+        time.sleep(1)
+
+
+def sweep_params(quantization: str) -> dict[str, models.SearchParams]:
+    params = {
+        f"hnsw_ef={ef}": models.SearchParams(hnsw_ef=ef) for ef in HNSW_EF_VALUES
+    }
+    if quantization != "none":
+        params["quantization_ignored"] = models.SearchParams(
+            hnsw_ef=128, quantization=models.QuantizationSearchParams(ignore=True)
+        )
+        params["no_rescore"] = models.SearchParams(
+            hnsw_ef=128, quantization=models.QuantizationSearchParams(rescore=False)
+        )
+        for oversampling in OVERSAMPLING_VALUES:
+            params[f"rescore_oversampling={oversampling}"] = models.SearchParams(
+                hnsw_ef=128,
+                quantization=models.QuantizationSearchParams(
+                    rescore=True, oversampling=oversampling
+                ),
+            )
+    return params
+
+
+def search_ids(
+    client: QdrantClient,
+    collection_name: str,
+    query: np.ndarray,
+    top_k: int,
+    params: models.SearchParams,
+) -> tuple[set, float]:
+    start = time.perf_counter()
+    points = client.query_points(
+        collection_name,
+        query=query.tolist(),
+        limit=top_k,
+        search_params=params,
+        with_payload=False,
+        with_vectors=False,
+    ).points
+    return {point.id for point in points}, (time.perf_counter() - start) * 1000
+
+
+def main(args: argparse.Namespace) -> dict:
+    rng = np.random.default_rng(args.seed)
+    vectors = clustered_vectors(args.points, args.dim, rng)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)] + rng.normal(
+        scale=0.1, size=(args.queries, args.dim)
+    )
+
+    if args.target == "server":
+        client = QdrantSingleton.get_instance().get_client()
+    else:
+        client = QdrantClient(":memory:")
+    collection_name = prepare_collection(client, vectors, args.quantization)
+    try:
+        if args.target == "server":
+            wait_for_indexing(client, collection_name)
+
+        exact = models.SearchParams(exact=True)
+        ground_truth = []
+        exact_latencies = []
+        for query in queries:
+            ids, latency = search_ids(client, collection_name, query, args.top_k, exact)
+            ground_truth.append(ids)
+            exact_latencies.append(latency)
+
+        report: dict = {
+            "exact": {
+                "recall": 1.0,
+                "mean_ms": float(np.mean(exact_latencies)),
+                "p95_ms": float(np.percentile(exact_latencies, 95)),
+            }
+        }
+        for name, params in sweep_params(args.quantization).items():
+            recalls = []
+            latencies = []
+            for query, expected in zip(queries, ground_truth):
+                ids, latency = search_ids(
+                    client, collection_name, query, args.top_k, params
+                )
+                recalls.append(len(ids & expected) / max(len(expected), 1))
+                latencies.append(latency)
+            report[name] = {
+                "recall": float(np.mean(recalls)),
+                "mean_ms": float(np.mean(latencies)),
+                "p95_ms": float(np.percentile(latencies, 95)),
+                "params": params.model_dump(exclude_none=True),
+            }
+    finally:
+        client.delete_collection(collection_name)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument(
+        "--quantization", choices=["none", "scalar", "binary"], default="scalar"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", choices=["memory", "server"], default="server")
+    args = parser.parse_args()
+
+    print(json.dumps(main(args), indent=2))
@@ -0,0 +1,152 @@
+"""
+compare the raw data date filters, one range per expanded day
+vs. the expanded days merged into disjoint intervals
+
+usage:
+    python -m benchmarks.raw_data_filters --summary-dates 100
+    python -m benchmarks.raw_data_filters --target server  # the configured qdrant
+
+the `memory` target runs qdrant-client's local mode,
+representative for the filter sizes but not the server's latencies
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from schema.type import DataType
+from tc_hivemind_backend.db.qdrant import QdrantSingleton
+from utils.globals import D_RETRIEVER_SEARCH
+from utils.query_engine.qdrant_query_engine_utils import QdrantEngineUtils
+
+VECTOR_SIZE = 64
+START_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def per_day_filter(utils: QdrantEngineUtils, dates: list[str]) -> models.Filter:
+    """
+    the previous implementation, one range for each distinct expanded day
+    """
+    cutoff = datetime.now(tz=timezone.utc).timestamp()
+    days: set[datetime] = set()
+    for date in dates:
+        day = datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        for i in range(-utils.date_margin, utils.date_margin + 1):
+            days.add(day + timedelta(days=i))
+
+    should = [
+        models.FieldCondition(
+            key=utils.metadata_date_key,
+            range=models.Range(
+                gte=day.timestamp(),
+                lte=min((day + timedelta(days=1)).timestamp(), cutoff),
+            ),
+        )
+        for day in days
+    ]
+    return models.Filter(
+        should=should,
+        must=[
+            models.FieldCondition(
+                key=utils.metadata_date_key, range=models.Range(lte=cutoff)
+            )
+        ],
+    )
+
+
+def time_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def prepare_collection(client: QdrantClient, points: int) -> str:
+    collection_name = f"benchmark_raw_data_filters_{uuid.uuid4().hex[:8]}"
+    client.create_collection(
+        collection_name,
+        vectors_config=models.VectorParams(
+            size=VECTOR_SIZE, distance=models.Distance.COSINE
+        ),
+    )
+    client.create_payload_index(
+        collection_name, "date", field_schema=models.PayloadSchemaType.FLOAT
+    )
+    for offset in range(0, points, 1000):
+        client.upsert(
+            collection_name,
+            points=[
+                models.PointStruct(
+                    id=i,
+                    vector=[random.random() for _ in range(VECTOR_SIZE)],
+                    payload={
+                        "date": (
+                            START_DATE + timedelta(minutes=random.randint(0, 525600))
+                        ).timestamp()
+                    },
+                )
+                for i in range(offset, min(offset + 1000, points))
+            ],
+        )
+    return collection_name
+
+
+def main(args: argparse.Namespace) -> dict:
+    utils = QdrantEngineUtils(
+        metadata_date_key="date",
+        metadata_date_format=DataType.FLOAT,
+        date_margin=D_RETRIEVER_SEARCH,
+    )
+    dates = [
+        (START_DATE + timedelta(days=random.randint(0, 364))).strftime("%Y-%m-%d")
+        for _ in range(args.summary_dates)
+    ]
+    filters = {
+        "per_day": per_day_filter(utils, dates),
+        "merged": utils.define_raw_data_filters(dates),
+    }
+    report: dict = {
+        name: {"conditions": len(filter.should or [])}
+        for name, filter in filters.items()
+    }
+    report["per_day"]["build_ms"] = time_call(
+        lambda: per_day_filter(utils, dates), args.repeat
+    )
+    report["merged"]["build_ms"] = time_call(
+        lambda: utils.define_raw_data_filters(dates), args.repeat
+    )
+
+    if args.target == "server":
+        client = QdrantSingleton.get_instance().get_client()
+    else:
+        client = QdrantClient(":memory:")
+    collection_name = prepare_collection(client, args.points)
+    try:
+        query = [random.random() for _ in range(VECTOR_SIZE)]
+        for name, filter in filters.items():
+            report[name]["query_ms"] = time_call(
+                lambda: client.query_points(
+                    collection_name, query=query, query_filter=filter, limit=50
+                ),
+                args.repeat,
+            )
+    finally:
+        client.delete_collection(collection_name)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--summary-dates", type=int, default=100)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--target", choices=["memory", "server"], default="memory")
+    args = parser.parse_args()
+
+    print(json.dumps(main(args), indent=2))
@@ -0,0 +1,104 @@
+"""
+compare the serialized size of the platforms' results passed through
+the workflow history, full source nodes vs. compact references
+
+usage:
+    python -m benchmarks.reference_payload --sub-questions 3 --nodes 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from bot.agent.tools.rag import to_reference
+from llama_index.core.query_engine import SubQuestionAnswerPair
+from llama_index.core.question_gen.types import SubQuestion
+from llama_index.core.schema import NodeWithScore, TextNode
+from schema.workflow import SubQuestionResult
+from temporalio.converter import DataConverter
+
+TEXT = (
+    "We discussed the release plan during the weekly call and agreed to "
+    "ship the new retrieval pipeline after the evaluation results are in. "
+) * 10
+
+
+def make_node(index: int) -> NodeWithScore:
+    return NodeWithScore(
+        node=TextNode(
+            text=TEXT,
+            metadata={
+                "author_id": f"user{index}",
+                "author_username": f"username{index}",
+                "createdAt": "2024-05-01T12:00:00",
+                "date": "2024-05-01",
+                "channel": "general",
+                "thread": "release planning",
+                "mention_usernames": ["user1", "user2"],
+                "reactions": ["👍", "🎉"],
+                "replied_user": "user3",
+                "url": f"https://discord.com/channels/1/2/{index}",
+            },
+            excluded_embed_metadata_keys=["author_id", "url", "createdAt"],
+            excluded_llm_metadata_keys=["author_id", "url"],
+        ),
+        score=0.5 + index / 1000,
+    )
+
+
+async def measure(payload: object) -> dict[str, float]:
+    converter = DataConverter.default
+    start = time.perf_counter()
+    payloads = await converter.encode([payload])
+    elapsed = time.perf_counter() - start
+    return {
+        "bytes": sum(len(p.data) for p in payloads),
+        "encode_ms": elapsed * 1000,
+    }
+
+
+async def main(sub_questions: int, nodes: int) -> dict[str, dict[str, float]]:
+    pairs = [
+        SubQuestionAnswerPair(
+            sub_q=SubQuestion(sub_question=f"question {i}", tool_name="Discord"),
+            answer="the answer of the sub-question",
+            sources=[make_node(i * nodes + j) for j in range(nodes)],
+        )
+        for i in range(sub_questions)
+    ]
+    results = [
+        SubQuestionResult(
+            tool_name=pair.sub_q.tool_name,
+            sub_question=pair.sub_q.sub_question,
+            answer=pair.answer,
+            sources=[to_reference(node) for node in pair.sources],
+        )
+        for pair in pairs
+    ]
+    without_snippets = [
+        result.model_copy(
+            update={
+                "sources": [
+                    source.model_copy(update={"snippet": None})
+                    for source in result.sources
+                ]
+            }
+        )
+        for result in results
+    ]
+
+    return {
+        "full_nodes": await measure(("response", pairs)),
+        "references": await measure(("response", results)),
+        "references_without_snippets": await measure(("response", without_snippets)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sub-questions", type=int, default=3)
+    parser.add_argument("--nodes", type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(main(args.sub_questions, args.nodes)), indent=2))
@@ -0,0 +1,123 @@
+"""
+measure the throughput of a Temporal worker running a blocking pipeline
+directly in an async activity vs. on the event loop's executor with heartbeats
+
+usage:
+    python -m benchmarks.temporal_throughput --workflows 32 --job-seconds 0.5
+    python -m benchmarks.temporal_throughput --target-host localhost:7233
+
+without `--target-host` a local Temporal dev server is started (downloaded once)
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from temporal_tasks import HEARTBEAT_TIMEOUT, heartbeat_while
+from temporalio import activity, workflow
+from temporalio.client import Client
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import UnsandboxedWorkflowRunner, Worker
+
+
+@activity.defn
+async def blocking_activity(job_seconds: float) -> float:
+    # the previous behavior, the sync pipeline blocking the worker's loop
+    time.sleep(job_seconds)
+    return job_seconds
+
+
+@activity.defn
+async def offloaded_activity(job_seconds: float) -> float:
+    return await heartbeat_while(asyncio.to_thread(time.sleep, job_seconds))
+
+
+@workflow.defn
+class BenchmarkWorkflow:
+    @workflow.run
+    async def run(self, activity_name: str, job_seconds: float) -> None:
+        await workflow.execute_activity(
+            activity_name,
+            job_seconds,
+            start_to_close_timeout=timedelta(minutes=5),
+            heartbeat_timeout=HEARTBEAT_TIMEOUT,
+        )
+
+
+async def run_workflows(
+    client: Client,
+    activity_name: str,
+    workflows: int,
+    job_seconds: float,
+    max_activities: int,
+) -> dict[str, float]:
+    task_queue = f"benchmark-{uuid.uuid4()}"
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=max_activities)
+    )
+    async with Worker(
+        client,
+        task_queue=task_queue,
+        workflows=[BenchmarkWorkflow],
+        activities=[blocking_activity, offloaded_activity],
+        workflow_runner=UnsandboxedWorkflowRunner(),
+        max_concurrent_activities=max_activities,
+    ):
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                client.execute_workflow(
+                    BenchmarkWorkflow.run,
+                    args=[activity_name, job_seconds],
+                    id=f"{task_queue}-{i}",
+                    task_queue=task_queue,
+                )
+                for i in range(workflows)
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+    return {
+        "seconds": elapsed,
+        "workflows_per_second": workflows / elapsed,
+    }
+
+
+async def main(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    if args.target_host:
+        client = await Client.connect(args.target_host)
+        env = None
+    else:
+        env = await WorkflowEnvironment.start_local()
+        client = env.client
+
+    report = {}
+    try:
+        for activity_name in ["blocking_activity", "offloaded_activity"]:
+            report[activity_name] = await run_workflows(
+                client,
+                activity_name,
+                workflows=args.workflows,
+                job_seconds=args.job_seconds,
+                max_activities=args.max_activities,
+            )
+    finally:
+        if env is not None:
+            await env.shutdown()
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workflows", type=int, default=32)
+    parser.add_argument("--job-seconds", type=float, default=0.5)
+    parser.add_argument("--max-activities", type=int, default=8)
+    parser.add_argument("--target-host", type=str, default=None)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(main(args)), indent=2))
@@ -0,0 +1,81 @@
+"""
+measure the first-task latency and the per-child memory of forked workers
+with and without preloading the models in the parent process
+
+usage:
+    python -m benchmarks.worker_warmup --children 4
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import time
+
+from utils.model_cache import (
+    CachedPreprocessor,
+    get_cross_encoder,
+    preload_models,
+    warm_up_models,
+)
+from worker.utils.memory import current_rss_mb, private_memory_mb
+
+QUESTION = "What did the community decide about the next release date?"
+DOCUMENTS = [f"message number {i} about the release planning" for i in range(50)]
+
+
+def first_task(results: multiprocessing.Queue, warm_up: bool) -> None:
+    if warm_up:
+        warm_up_models()
+
+    start = time.perf_counter()
+    CachedPreprocessor().extract_main_content(text=QUESTION)
+    get_cross_encoder().predict([(QUESTION, doc) for doc in DOCUMENTS])
+    latency = time.perf_counter() - start
+
+    results.put(
+        {
+            "first_task_seconds": latency,
+            "rss_mb": current_rss_mb(),
+            "private_mb": private_memory_mb(),
+        }
+    )
+
+
+def run(children: int, preload: bool) -> list[dict]:
+    context = multiprocessing.get_context("fork")
+    if preload:
+        preload_models()
+        gc.freeze()
+
+    results: multiprocessing.Queue = context.Queue()
+    processes = [
+        context.Process(target=first_task, args=(results, preload))
+        for _ in range(children)
+    ]
+    for process in processes:
+        process.start()
+    measurements = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    return measurements
+
+
+def summarize(measurements: list[dict]) -> dict[str, float]:
+    summary: dict[str, float] = {}
+    for key in ["first_task_seconds", "rss_mb", "private_mb"]:
+        values = [m[key] for m in measurements if m[key] is not None]
+        summary[f"avg_{key}"] = sum(values) / len(values) if values else float("nan")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--children", type=int, default=4)
+    args = parser.parse_args()
+
+    # lazy loading has to run first, as preloading fills the parent's caches
+    report = {"lazy": summarize(run(args.children, preload=False))}
+    report["preloaded"] = summarize(run(args.children, preload=True))
+    print(json.dumps(report, indent=2))
@@ -1,2 +1,9 @@
-from .rag import rag_tool
-from .general_llm import general_llm_tool
\ No newline at end of file
+from .evaluation import evaluate_answer
+from .general_llm import general_llm_answer
+from .rag import (
+    QueryEngineUnavailableError,
+    aanswer_sub_question,
+    plan_sub_questions,
+    synthesize_sub_answers,
+)
+from .router import route_question
@@ -0,0 +1,176 @@
+import asyncio
+
+from bot.agent.tools.rag import from_reference
+from bot.evaluations.answer_relevance import AnswerRelevanceEvaluation
+from bot.evaluations.answer_confidence import AnswerConfidenceEvaluation
+from bot.evaluations.question_answered import QuestionAnswerCoverageEvaluation
+from bot.evaluations.node_relevance import NodeRelevanceEvaluation
+from bot.evaluations.schema import (
+    AnswerRelevanceSuccess,
+    AnswerConfidenceSuccess,
+    QuestionAnswerCoverageSuccess,
+    AnswerRelevanceError,
+    AnswerConfidenceError,
+    QuestionAnswerCoverageError,
+    NodeRelevanceSuccess,
+)
+from schema.workflow import AnswerEvaluation, EvaluationRequest
+
+
+async def evaluate_answer(request: EvaluationRequest) -> AnswerEvaluation:
+    """
+    evaluate the answer and, if retrieval was used, the retrieved nodes
+
+    Parameters
+    ------------
+    request : EvaluationRequest
+        the question, its answer and the platforms' results
+
+    Returns
+    ---------
+    evaluation : AnswerEvaluation
+        the evaluations as the metadata to persist
+        alongside the coverage score used for answer skipping
+    """
+    raw_nodes = [
+        from_reference(node) for result in request.results for node in result.sources
+    ]
+    summary_nodes = [
+        from_reference(node)
+        for result in request.results
+        for node in result.summary_nodes
+    ]
+
+    # Evaluate nodes
+    node_evaluator = NodeRelevanceEvaluation()
+    summary_node_evaluations, raw_node_evaluations = await asyncio.gather(
+        node_evaluator.evaluate_nodes_batch(
+            question=request.query, nodes=summary_nodes, node_type="summary"
+        ),
+        node_evaluator.evaluate_nodes_batch(
+            question=request.query, nodes=raw_nodes, node_type="raw"
+        ),
+    )
+
+    if request.response:
+        relevancy_result, confidence_result, coverage_result = await asyncio.gather(
+            AnswerRelevanceEvaluation().evaluate(
+                question=request.query, answer=request.response
+            ),
+            AnswerConfidenceEvaluation().evaluate(
+                question=request.query, answer=request.response
+            ),
+            QuestionAnswerCoverageEvaluation().evaluate(
+                question=request.query, answer=request.response
+            ),
+        )
+    else:
+        error = (
+            "No response from the query engine"
+            if request.retrieval_used
+            else "No response from the LLM"
+        )
+        relevancy_result = AnswerRelevanceError(
+            error=error, question=request.query, answer=None
+        )
+        confidence_result = AnswerConfidenceError(
+            error=error, question=request.query, answer=None
+        )
+        coverage_result = QuestionAnswerCoverageError(
+            error=error, question=request.query, answer=None
+        )
+
+    # Build metadata dictionary with all evaluations
+    evaluation_metadata = {
+        "answer_relevance_score": (
+            relevancy_result.score
+            if isinstance(relevancy_result, AnswerRelevanceSuccess)
+            else relevancy_result.error
+        ),
+        "answer_relevance_explanation": (
+            relevancy_result.explanation
+            if isinstance(relevancy_result, AnswerRelevanceSuccess)
+            else relevancy_result.error
+        ),
+        "answer_confidence_score": (
+            confidence_result.score
+            if isinstance(confidence_result, AnswerConfidenceSuccess)
+            else confidence_result.error
+        ),
+        "answer_confidence_explanation": (
+            confidence_result.explanation
+            if isinstance(confidence_result, AnswerConfidenceSuccess)
+            else confidence_result.error
+        ),
+        "answer_coverage_answered": (
+            coverage_result.answered
+            if isinstance(coverage_result, QuestionAnswerCoverageSuccess)
+            else False
+        ),
+        "answer_coverage_score": (
+            coverage_result.score
+            if isinstance(coverage_result, QuestionAnswerCoverageSuccess)
+            else coverage_result.error
+        ),
+        "answer_coverage_explanation": (
+            coverage_result.explanation
+            if isinstance(coverage_result, QuestionAnswerCoverageSuccess)
+            else coverage_result.error
+        ),
+    }
+    if not request.retrieval_used:
+        # Explicitly indicate no retrieval context was used
+        evaluation_metadata.update({"retrieval_used": False, "references_count": 0})
+
+    # Add node evaluations to metadata
+    if summary_node_evaluations or raw_node_evaluations:
+        nodes_evaluation_summary = node_evaluator.create_evaluation_summary(
+            question=request.query,
+            summary_results=summary_node_evaluations,
+            raw_results=raw_node_evaluations,
+        )
+        evaluation_metadata.update(
+            {
+                "nodes_total_count": nodes_evaluation_summary.total_nodes,
+                "nodes_summary_count": nodes_evaluation_summary.summary_nodes_count,
+                "nodes_raw_count": nodes_evaluation_summary.raw_nodes_count,
+                "nodes_average_relevance_score": nodes_evaluation_summary.average_relevance_score,
+                "nodes_high_relevance_count": nodes_evaluation_summary.high_relevance_nodes,
+                "nodes_successful_evaluations": nodes_evaluation_summary.successful_evaluations,
+                "nodes_failed_evaluations": nodes_evaluation_summary.failed_evaluations,
+            }
+        )
+
+    # Add individual node evaluation results for detailed analysis
+    for key, evaluations in [
+        ("summary_node_evaluations", summary_node_evaluations),
+        ("raw_node_evaluations", raw_node_evaluations),
+    ]:
+        if evaluations:
+            evaluation_metadata[key] = [
+                {
+                    "relevance_score": (
+                        eval_result.relevance_score
+                        if isinstance(eval_result, NodeRelevanceSuccess)
+                        else None
+                    ),
+                    "explanation": (
+                        eval_result.explanation
+                        if isinstance(eval_result, NodeRelevanceSuccess)
+                        else eval_result.error
+                    ),
+                    "node_id": getattr(eval_result, "node_id", "unknown"),
+                    "node_score": getattr(eval_result, "node_score", 0.0),
+                    "success": isinstance(eval_result, NodeRelevanceSuccess),
+                }
+                for eval_result in evaluations
+            ]
+
+    return AnswerEvaluation(
+        metadata=evaluation_metadata,
+        coverage_score=(
+            coverage_result.score
+            if isinstance(coverage_result, QuestionAnswerCoverageSuccess)
+            else None
+        ),
+    )
@@ -1,254 +1,236 @@
-from bot.evaluations.answer_relevance import AnswerRelevanceEvaluation
-from bot.evaluations.answer_confidence import AnswerConfidenceEvaluation
-from bot.evaluations.question_answered import QuestionAnswerCoverageEvaluation
-from bot.evaluations.node_relevance import NodeRelevanceEvaluation
-from bot.evaluations.schema import (
-    AnswerRelevanceSuccess,
-    AnswerConfidenceSuccess,
-    QuestionAnswerCoverageSuccess,
-    AnswerRelevanceError,
-    AnswerConfidenceError,
-    QuestionAnswerCoverageError,
-    NodeRelevanceSuccess,
+import asyncio
+
+from llama_index.core import QueryBundle, Settings
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.response.schema import RESPONSE_TYPE
+from llama_index.core.query_engine import SubQuestionAnswerPair
+from llama_index.core.question_gen.types import SubQuestion
+from llama_index.core.response_synthesizers import get_response_synthesizer
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core.tools.types import ToolMetadata
+from schema.workflow import (
+    NodeReference,
+    RetrievalPlan,
+    SubQuestionResult,
+    SubQuestionTask,
+    SynthesisRequest,
+)
+from subquery import (
+    PLATFORM_TOOLS_METADATA,
+    configure_settings,
+    get_question_generator,
+    prepare_query_engine_tools,
+)
+from utils.globals import (
+    NO_ANSWER_REFERENCE,
+    NO_ANSWER_REFERENCE_PLACEHOLDER,
+    REFERENCE_SNIPPET_CHARS,
+)
+from utils.model_cache import CachedPreprocessor
+from utils.query_engine.dual_qdrant_retrieval_engine import DualQdrantRetrievalEngine
+from utils.query_engine.subquestion_engine import (
+    generate_sub_questions,
+    synthesize_answer,
 )
-from tc_temporal_backend.schema.hivemind import HivemindQueryPayload
-from worker.tasks import query_data_sources
-from utils.query_engine.prepare_answer_sources import PrepareAnswerSources
-from utils.globals import NO_ANSWER_REFERENCE
-from schema import RouteModel, RouteModelPayload, QuestionModel, ResponseModel
-from utils.persist_payload import PersistPayload
-import logging
-from llama_index.core.schema import NodeWithScore
-
-
-async def rag_tool(payload: HivemindQueryPayload):
-    result = query_data_sources(
-        community_id=payload.community_id,
-        query=payload.query,
-        enable_answer_skipping=payload.enable_answer_skipping,
-        return_metadata=True,
-    )
 
-    response, references, metadata = result
-
-    # Initialize node relevance evaluator
-    node_evaluator = NodeRelevanceEvaluation()
-
-    # Extract summary nodes and raw nodes from metadata
-    summary_nodes: list[NodeWithScore] = []
-    raw_nodes: list[NodeWithScore] = []
-
-    for i in range(len(references)):
-        # references is a list of SubQuestionAnswerPair
-        raw_nodes.extend([node for node in references[i].sources])
-
-    # Extract summary nodes from metadata if available
-    # metadata structure: {'Telegram': {'summary_nodes': [node_list]}, 'Discord': {'summary_nodes': [node_list]}, ...}
-    if metadata:
-        for platform_name, platform_metadata in metadata.items():
-            platform_summary_nodes = platform_metadata["summary_nodes"]
-            if isinstance(platform_summary_nodes, list):
-                # Filter out None values
-                valid_summary_nodes = [
-                    node for node in platform_summary_nodes if node is not None
-                ]
-                summary_nodes.extend(valid_summary_nodes)
-
-    # Evaluate nodes
-    summary_node_evaluations = []
-    raw_node_evaluations = []
-    nodes_evaluation_summary = None
-
-    if summary_nodes:
-        summary_node_evaluations = await node_evaluator.evaluate_nodes_batch(
-            question=payload.query, nodes=summary_nodes, node_type="summary"
-        )
 
-    if raw_nodes:
-        raw_node_evaluations = await node_evaluator.evaluate_nodes_batch(
-            question=payload.query, nodes=raw_nodes, node_type="raw"
-        )
+class QueryEngineUnavailableError(ValueError):
+    """
+    the platform of a sub-question has no query engine, i.e. no data indexed for it
+    """
+
+
+def to_reference(
+    node: NodeWithScore, snippet_chars: int | None = REFERENCE_SNIPPET_CHARS
+) -> NodeReference:
+    """
+    the compact reference of a retrieved node
+
+    Parameters
+    ------------
+    node : NodeWithScore
+        the retrieved node
+    snippet_chars : int | None
+        the characters of the node's text to keep
+        if None, no snippet would be kept
+
+    Returns
+    ---------
+    reference : NodeReference
+        the node id, score, url and the truncated text of the node
+    """
+    snippet = None
+    if snippet_chars is not None:
+        text = node.node.get_content()
+        snippet = text[:snippet_chars] + ("..." if len(text) > snippet_chars else "")
+
+    return NodeReference(
+        node_id=node.node.node_id,
+        score=node.score,
+        url=node.node.metadata.get("url"),
+        snippet=snippet,
+    )
 
-    # Create nodes evaluation summary
-    if summary_node_evaluations or raw_node_evaluations:
-        nodes_evaluation_summary = node_evaluator.create_evaluation_summary(
-            question=payload.query,
-            summary_results=summary_node_evaluations,
-            raw_results=raw_node_evaluations,
-        )
 
-    if response:
-        relevancy_result = await AnswerRelevanceEvaluation().evaluate(
-            question=payload.query, answer=response
-        )
-        confidence_result = await AnswerConfidenceEvaluation().evaluate(
-            question=payload.query, answer=response
-        )
-        coverage_result = await QuestionAnswerCoverageEvaluation().evaluate(
-            question=payload.query, answer=response
-        )
-    else:
-        relevancy_result = AnswerRelevanceError(
-            error="No response from the query engine",
-            question=payload.query,
-            answer=None,
-        )
-        confidence_result = AnswerConfidenceError(
-            error="No response from the query engine",
-            question=payload.query,
-            answer=None,
-        )
-        coverage_result = QuestionAnswerCoverageError(
-            error="No response from the query engine",
-            question=payload.query,
-            answer=None,
-        )
-
-    # Build metadata dictionary with all evaluations
-    evaluation_metadata = {
-        "answer_relevance_score": (
-            relevancy_result.score
-            if isinstance(relevancy_result, AnswerRelevanceSuccess)
-            else relevancy_result.error
-        ),
-        "answer_relevance_explanation": (
-            relevancy_result.explanation
-            if isinstance(relevancy_result, AnswerRelevanceSuccess)
-            else relevancy_result.error
-        ),
-        "answer_confidence_score": (
-            confidence_result.score
-            if isinstance(confidence_result, AnswerConfidenceSuccess)
-            else confidence_result.error
-        ),
-        "answer_confidence_explanation": (
-            confidence_result.explanation
-            if isinstance(confidence_result, AnswerConfidenceSuccess)
-            else confidence_result.error
+def from_reference(reference: NodeReference) -> NodeWithScore:
+    """
+    a node having the reference's snippet as its text
+    """
+    return NodeWithScore(
+        node=TextNode(
+            id_=reference.node_id,
+            text=reference.snippet or "",
+            metadata={"url": reference.url} if reference.url else {},
         ),
-        "answer_coverage_answered": (
-            coverage_result.answered
-            if isinstance(coverage_result, QuestionAnswerCoverageSuccess)
-            else False
-        ),
-        "answer_coverage_score": (
-            coverage_result.score
-            if isinstance(coverage_result, QuestionAnswerCoverageSuccess)
-            else coverage_result.error
-        ),
-        "answer_coverage_explanation": (
-            coverage_result.explanation
-            if isinstance(coverage_result, QuestionAnswerCoverageSuccess)
-            else coverage_result.error
-        ),
-    }
-
-    # Add node evaluations to metadata
-    if nodes_evaluation_summary:
-        evaluation_metadata.update(
-            {
-                "nodes_total_count": nodes_evaluation_summary.total_nodes,
-                "nodes_summary_count": nodes_evaluation_summary.summary_nodes_count,
-                "nodes_raw_count": nodes_evaluation_summary.raw_nodes_count,
-                "nodes_average_relevance_score": nodes_evaluation_summary.average_relevance_score,
-                "nodes_high_relevance_count": nodes_evaluation_summary.high_relevance_nodes,
-                "nodes_successful_evaluations": nodes_evaluation_summary.successful_evaluations,
-                "nodes_failed_evaluations": nodes_evaluation_summary.failed_evaluations,
-            }
-        )
+        score=reference.score,
+    )
 
-    # Add individual node evaluation results for detailed analysis
-    if summary_node_evaluations:
-        evaluation_metadata["summary_node_evaluations"] = [
-            {
-                "relevance_score": (
-                    eval_result.relevance_score
-                    if isinstance(eval_result, NodeRelevanceSuccess)
-                    else None
-                ),
-                "explanation": (
-                    eval_result.explanation
-                    if isinstance(eval_result, NodeRelevanceSuccess)
-                    else eval_result.error
-                ),
-                "node_id": (
-                    eval_result.node_id
-                    if hasattr(eval_result, "node_id")
-                    else "unknown"
-                ),
-                "node_score": (
-                    eval_result.node_score
-                    if hasattr(eval_result, "node_score")
-                    else 0.0
-                ),
-                "success": isinstance(eval_result, NodeRelevanceSuccess),
-            }
-            for eval_result in summary_node_evaluations
-        ]
 
-    if raw_node_evaluations:
-        evaluation_metadata["raw_node_evaluations"] = [
-            {
-                "relevance_score": (
-                    eval_result.relevance_score
-                    if isinstance(eval_result, NodeRelevanceSuccess)
-                    else None
-                ),
-                "explanation": (
-                    eval_result.explanation
-                    if isinstance(eval_result, NodeRelevanceSuccess)
-                    else eval_result.error
-                ),
-                "node_id": (
-                    eval_result.node_id
-                    if hasattr(eval_result, "node_id")
-                    else "unknown"
-                ),
-                "node_score": (
-                    eval_result.node_score
-                    if hasattr(eval_result, "node_score")
-                    else 0.0
-                ),
-                "success": isinstance(eval_result, NodeRelevanceSuccess),
-            }
-            for eval_result in raw_node_evaluations
+def plan_sub_questions(
+    community_id: str,
+    query: str,
+    enable_answer_skipping: bool,
+    data_sources: dict[str, str],
+) -> RetrievalPlan:
+    """
+    break the query into sub-questions for the selected platforms
+
+    Parameters
+    ------------
+    community_id : str
+        the community id to get their data
+    query : str
+        the user question
+    enable_answer_skipping : bool
+        skip answering questions with non-relevant retrieved nodes
+    data_sources : dict[str, str]
+        the platform names and their ids selected for the community
+
+    Returns
+    ---------
+    plan : RetrievalPlan
+        the sub-questions, each to be answered by one platform
+        `valid_query` would be False if there was nothing to ask
+    """
+    if not CachedPreprocessor().extract_main_content(text=query):
+        return RetrievalPlan(valid_query=False)
+
+    configure_settings()
+    # only the tools' descriptions are needed, the engines are built by the retrievals
+    # (a platform having no data fails its retrieval and is left out of the answer)
+    # the platform (and its id) of each tool name
+    platforms: dict[str, tuple[str, str]] = {}
+    tools: list[ToolMetadata] = []
+    for platform, platform_id in data_sources.items():
+        tool_metadata = PLATFORM_TOOLS_METADATA.get(platform)
+        if not platform_id or tool_metadata is None:
+            continue
+        platforms[tool_metadata.name] = (platform, platform_id)
+        tools.append(tool_metadata)
+
+    if not tools:
+        return RetrievalPlan()
+
+    sub_questions = generate_sub_questions(
+        get_question_generator(), tools, QueryBundle(query_str=query)
+    )
+    return RetrievalPlan(
+        sub_questions=[
+            SubQuestionTask(
+                community_id=community_id,
+                query=query,
+                enable_answer_skipping=enable_answer_skipping,
+                platform=platforms[sub_q.tool_name][0],
+                platform_id=platforms[sub_q.tool_name][1],
+                tool_name=sub_q.tool_name,
+                sub_question=sub_q.sub_question,
+            )
+            for sub_q in sub_questions
+            if sub_q.tool_name in platforms
         ]
+    )
 
 
-    # Prepare answer references for response
-    answer_reference = ""
-    if references and response != NO_ANSWER_REFERENCE:
-        answer_reference = PrepareAnswerSources().prepare_answer_sources(
-            nodes=references  # type: ignore
+async def aanswer_sub_question(task: SubQuestionTask) -> SubQuestionResult:
+    """
+    retrieve from the task's platform and answer its sub-question
+
+    the qdrant engines retrieve and call the llm on the running event loop,
+    so many sub-questions could share it. The engines without
+    an async implementation, and the engine setup, run on a thread
+    """
+    query_engine = await asyncio.to_thread(_prepare_sub_question_engine, task)
+    if isinstance(query_engine, DualQdrantRetrievalEngine):
+        response = await query_engine.aquery(task.sub_question)
+    else:
+        response = await asyncio.to_thread(query_engine.query, task.sub_question)
+    return _sub_question_result(task, response)
+
+
+def _prepare_sub_question_engine(task: SubQuestionTask) -> BaseQueryEngine:
+    configure_settings()
+    tools = prepare_query_engine_tools(
+        query=task.query,
+        community_id=task.community_id,
+        enable_answer_skipping=task.enable_answer_skipping,
+        **{task.platform: task.platform_id},
+    )
+    query_engine = next(
+        (tool.query_engine for tool in tools if tool.metadata.name == task.tool_name),
+        None,
+    )
+    if query_engine is None:
+        raise QueryEngineUnavailableError(
+            f"No `{task.tool_name}` query engine available for the "
+            f"platform `{task.platform}` with id `{task.platform_id}`!"
         )
+    return query_engine
+
 
+def _sub_question_result(
+    task: SubQuestionTask, response: RESPONSE_TYPE
+) -> SubQuestionResult:
+    metadata = getattr(response, "metadata", None) or {}
+    summary_nodes = metadata.get("summary_nodes") or []
 
-    response_payload = RouteModelPayload(
-        communityId=payload.community_id,
-        route=RouteModel(source="temporal", destination=None),
-        question=QuestionModel(message=payload.query),
-        response=ResponseModel(message=f"{response or ''}\n\n{answer_reference}"),
-        metadata=evaluation_metadata,
+    return SubQuestionResult(
+        tool_name=task.tool_name,
+        sub_question=task.sub_question,
+        answer=str(response),
+        sources=[to_reference(node) for node in response.source_nodes],
+        summary_nodes=[to_reference(node) for node in summary_nodes if node],
     )
 
-    # Get workflow ID and update the payload in the database
-    # If workflow_id is None, insert new data; else update existing document with evaluation results and response
-    workflow_id = getattr(payload, "workflow_id", None)
-    persister = PersistPayload()
-    persister.persist_payload(response_payload, workflow_id=workflow_id)
-
-    # Hardcoded threshold for answer relevance
-    # if the relevance score is less than 3, we do not return the answer
-    # and in case of enable_answer_skipping is True (auto-answering questions)
-    if (
-        isinstance(coverage_result, QuestionAnswerCoverageSuccess)
-        and coverage_result.score < 3
-        and payload.enable_answer_skipping
-    ):
-        logging.warning(
-            f"Answer coverage score is less than 3, skipping answer: {coverage_result.score}"
-        )
 
-        return None, []
+def synthesize_sub_answers(request: SynthesisRequest) -> str:
+    """
+    synthesize the final answer from the platforms' answers
+
+    Returns
+    ---------
+    response : str
+        the answer, or `NO_ANSWER_REFERENCE` if the llm couldn't answer
+    """
+    configure_settings()
+    qa_pairs = [
+        SubQuestionAnswerPair(
+            sub_q=SubQuestion(
+                sub_question=result.sub_question, tool_name=result.tool_name
+            ),
+            answer=result.answer,
+            sources=[from_reference(node) for node in result.sources],
+        )
+        for result in request.results
+    ]
+    response = synthesize_answer(
+        get_response_synthesizer(llm=Settings.llm, use_async=False),
+        QueryBundle(query_str=request.query),
+        qa_pairs,
+    )
 
-    return response, references
+    response_text = (
+        response.response if hasattr(response, "response") else str(response)
+    )
+    if not response_text or response_text == NO_ANSWER_REFERENCE_PLACEHOLDER:
+        return NO_ANSWER_REFERENCE
+    return response_text
@@ -0,0 +1,52 @@
+import logging
+from openai import AsyncOpenAI
+
+from utils.globals import NO_ANSWER_REFERENCE_PLACEHOLDER
+
+
+async def route_question(query: str) -> str:
+    """
+    Route the incoming query to the appropriate tool.
+    Uses a lightweight LLM-based router to select between RAG and general LLM.
+
+    Returns
+    ---------
+    route : str
+        either `rag` or `general`
+    """
+    try:
+        client = AsyncOpenAI()
+        router_messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are the TogetherCrew bot which is a strict router and lightweight answerer. If the question requires specific, external, or context data "
+                    "(e.g., company/product/project/community/user/platform/etc.), return exactly one word: 'rag'. "
+                    "Do not act as a general-purpose assistant and do not answer very broad or generic questions; if the query is generic, out of scope, or not directly about helping the user's specific problem, return 'rag'. "
+                    "Otherwise, answer the question directly in one short paragraph or less, following these rules: "
+                    "rely solely on your own knowledge, do not fabricate citations or sources, provide concise and clear answers, "
+                    f"never provide suggestions or ask for clarifications, and if you don't know the answer, reply exactly with '{NO_ANSWER_REFERENCE_PLACEHOLDER}'. "
+                    "When in doubt, prefer returning 'rag'. Return only 'rag' or the answer text. No extra commentary."
+                ),
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Question: {query}\n\n"
+                    "Choose tool:"
+                ),
+            },
+        ]
+        decision = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=router_messages,
+            temperature=0.0,
+        )
+        router_output = (decision.choices[0].message.content or "rag").strip()
+    except Exception as ex:
+        logging.exception(f"Error routing question to tool. defaulting to rag. Exception: {ex}")
+        router_output = "rag"
+
+    # For any non-'rag' output, we answer via general LLM tool to ensure
+    # consistent evaluations and persistence behavior.
+    return "rag" if router_output.lower() == "rag" else "general"
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Any
-from openai import OpenAI
+from openai import AsyncOpenAI
 from tenacity import retry, stop_after_attempt, wait_exponential
 from .schema import EvaluationResult
 
@@ -21,7 +21,7 @@ class BaseEvaluation(ABC):
         """
         self.model = model
         self.temperature = temperature
-        self.client = OpenAI()
+        self.client = AsyncOpenAI()
 
     @retry(
         stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10)
@@ -41,7 +41,7 @@ class BaseEvaluation(ABC):
             The LLM's response content
         """
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model, messages=messages, temperature=self.temperature
             )
             return response.choices[0].message.content
@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from typing import Any
 from uuid import uuid1
 
 from dateutil import parser
@@ -8,7 +9,21 @@ from llama_index.core.schema import NodeWithScore
 from llama_index.core.vector_stores.types import VectorStoreQueryResult
 from llama_index.vector_stores.postgres import PGVectorStore
 from llama_index.vector_stores.postgres.base import DBEmbeddingRow
-from sqlalchemy import Date, and_, cast, func, literal, null, or_, select, text
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    and_,
+    any_,
+    cast,
+    func,
+    literal,
+    null,
+    or_,
+    select,
+    text,
+    true,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from tc_hivemind_backend.embeddings.cohere import CohereEmbedding
 
 
@@ -35,6 +50,35 @@ class RetrieveSimilarNodes:
     ) -> list[NodeWithScore]:
         """
         query database with given filters (similarity search is also done)
+        see `build_query` for the parameters
+        """
+        stmt = self.build_query(query, filters, date_interval, **kwargs)
+
+        with self._vector_store._session() as session, session.begin():
+            res = session.execute(stmt)
+
+        results = [
+            DBEmbeddingRow(
+                node_id=item.node_id,
+                text=item.text,
+                metadata=item.metadata_,
+                similarity=(1 - item.distance) if item.distance is not None else 0,
+            )
+            for item in res.all()
+        ]
+        query_result = self._vector_store._db_rows_to_query_result(results)
+        nodes = self._get_nodes_with_score(query_result)
+        return nodes
+
+    def build_query(
+        self,
+        query: str,
+        filters: list[dict[str, str | dict | None]] | None = None,
+        date_interval: int = 0,
+        **kwargs,
+    ) -> Select:
+        """
+        build the similarity search statement with the given filters
 
         Parameters
         -------------
@@ -60,6 +104,11 @@ class RetrieveSimilarNodes:
                 aggregate records and group by a given term in `group_by_metadata`
             group_by_metadata : list[str]
                 do grouping by some property of `metadata_`
+
+        Returns
+        ---------
+        stmt : Select
+            the statement to execute
         """
         ignore_sort = kwargs.get("ignore_sort", False)
         aggregate_records = kwargs.get("aggregate_records", False)
@@ -109,53 +158,7 @@ class RetrieveSimilarNodes:
             stmt = stmt.order_by(text("distance asc"))
 
         if filters is not None and filters != []:
-            conditions = []
-            for condition in filters:
-                filters_and = []
-                for key, value in condition.items():
-                    if key == "date":
-                        date: datetime
-                        if isinstance(value, str):
-                            date = parser.parse(value)
-                        else:
-                            raise ValueError(
-                                "the values for filtering dates must be string!"
-                            )
-                        date_back = (date - timedelta(days=date_interval)).strftime(
-                            "%Y-%m-%d"
-                        )
-                        date_forward = (date + timedelta(days=date_interval)).strftime(
-                            "%Y-%m-%d"
-                        )
-
-                        # Apply ::date cast when the key is 'date'
-                        filter_condition_back = cast(
-                            self._vector_store._table_class.metadata_.op("->>")(key),
-                            Date,
-                        ) >= cast(date_back, Date)
-
-                        filter_condition_forward = cast(
-                            self._vector_store._table_class.metadata_.op("->>")(key),
-                            Date,
-                        ) <= cast(date_forward, Date)
-
-                        filters_and.append(filter_condition_back)
-                        filters_and.append(filter_condition_forward)
-                    else:
-                        filter_condition = (
-                            self._vector_store._table_class.metadata_.op("->>")(key)
-                            == value
-                            if not isinstance(value, dict)
-                            else self._vector_store._table_class.metadata_.op("->>")(
-                                key
-                            )
-                            != value["ne"]
-                        )
-                        filters_and.append(filter_condition)
-
-                conditions.append(and_(*filters_and))
-
-            stmt = stmt.where(or_(*conditions))
+            stmt = stmt.where(self.compile_filters(filters, date_interval))
 
         if aggregate_records:
             group_by_terms = [
@@ -167,21 +170,101 @@ class RetrieveSimilarNodes:
         if self._similarity_top_k is not None:
             stmt = stmt.limit(self._similarity_top_k)
 
-        with self._vector_store._session() as session, session.begin():
-            res = session.execute(stmt)
+        return stmt
 
-        results = [
-            DBEmbeddingRow(
-                node_id=item.node_id,
-                text=item.text,
-                metadata=item.metadata_,
-                similarity=(1 - item.distance) if item.distance is not None else 0,
-            )
-            for item in res.all()
-        ]
-        query_result = self._vector_store._db_rows_to_query_result(results)
-        nodes = self._get_nodes_with_score(query_result)
-        return nodes
+    def compile_filters(
+        self,
+        filters: list[dict[str, str | dict | None]],
+        date_interval: int = 0,
+    ) -> ColumnElement[bool]:
+        """
+        compile the filters into a condition postgres can serve with indexes
+        (see `utils.pg_indexes`)
+
+        the equality filters are checked as a jsonb containment of the metadata
+        and the dates as ranges of the ISO formatted date strings.
+        The filters differing only in their equality values are collapsed
+        into one containment of `ANY` of their values
+
+        Parameters
+        ------------
+        filters : list[dict[str, str | dict | None]]
+            a list of filters to apply with `or` condition, see `build_query`
+        date_interval : int
+            the number of back and forth days of the dates
+
+        Returns
+        ---------
+        condition : ColumnElement[bool]
+            the condition to filter the table rows with
+        """
+        metadata_ = self._vector_store._table_class.metadata_
+        # llama-index creates the metadata column as `json` unless `use_jsonb`
+        document = (
+            metadata_ if isinstance(metadata_.type, JSONB) else cast(metadata_, JSONB)
+        )
+
+        # the filters grouped by their non-equality conditions
+        groups: dict[tuple[tuple[Any, ...], ...], list[dict[str, Any]]] = {}
+        for condition in filters:
+            containment: dict[str, Any] = {}
+            others: list[tuple[Any, ...]] = []
+            for key, value in condition.items():
+                if key == "date":
+                    others.append(("range", key, *self._date_range(value, date_interval)))
+                elif isinstance(value, dict):
+                    others.append(("ne", key, value["ne"]))
+                elif value is None:
+                    # a missing key, not a containment of json null
+                    others.append(("eq", key, None))
+                else:
+                    containment[key] = value
+
+            documents = groups.setdefault(tuple(sorted(others, key=repr)), [])
+            if containment not in documents:
+                documents.append(containment)
+
+        conditions: list[ColumnElement[bool]] = []
+        for others, documents in groups.items():
+            filters_and: list[ColumnElement[bool]] = []
+            for kind, key, *values in others:
+                # the key is inlined for the expression indexes to match
+                field = metadata_.op("->>")(literal(key, literal_execute=True))
+                if kind == "range":
+                    filters_and.append(field >= values[0])
+                    filters_and.append(field < values[1])
+                elif kind == "ne":
+                    filters_and.append(field != values[0])
+                else:
+                    filters_and.append(field == values[0])
+
+            # an empty containment would match any row of the group
+            if {} not in documents:
+                contains = document.op("@>", is_comparison=True)
+                if len(documents) == 1:
+                    filters_and.append(contains(literal(documents[0], JSONB)))
+                else:
+                    filters_and.append(
+                        contains(any_(literal(documents, ARRAY(JSONB))))
+                    )
+
+            conditions.append(and_(*filters_and) if filters_and else true())
+
+        return or_(*conditions)
+
+    def _date_range(self, value: Any, date_interval: int) -> tuple[str, str]:
+        """
+        the inclusive start and the exclusive end of the date filter's days
+        compared as strings, so the ISO dates (with or without a time) would match
+        """
+        date: datetime
+        if isinstance(value, str):
+            date = parser.parse(value)
+        else:
+            raise ValueError("the values for filtering dates must be string!")
+        date_back = date - timedelta(days=date_interval)
+        date_end = date + timedelta(days=date_interval + 1)
+        return date_back.strftime("%Y-%m-%d"), date_end.strftime("%Y-%m-%d")
 
     def _get_nodes_with_score(
         self, query_result: VectorStoreQueryResult
@@ -1,8 +1,8 @@
-from llama_index.core import VectorStoreIndex
+from llama_index.core import MockEmbedding, VectorStoreIndex
 from llama_index.core.embeddings import BaseEmbedding
 from llama_index.core.schema import NodeWithScore, QueryBundle
 from tc_hivemind_backend.embeddings.cohere import CohereEmbedding
-from tc_hivemind_backend.pg_vector_access import PGVectorAccess
+from utils.pg_engines import load_pooled_index
 
 
 class BaseSummarySearch:
@@ -71,11 +71,12 @@ class BaseSummarySearch:
         """
         setup the llama_index VectorStoreIndex
         """
-        pg_vector_access = PGVectorAccess(
+        if testing:
+            embedding_model = MockEmbedding(embed_dim=1024)
+
+        index = load_pooled_index(
             table_name=table_name,
             dbname=dbname,
             embed_model=embedding_model,
-            testing=testing,
         )
-        index = pg_vector_access.load_index()
         return index
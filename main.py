@@ -1,8 +1,23 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from routers.amqp import router as amqpRouter
+from routers.amqp import requeue_admitted, router as amqpRouter
 from routers.http import router as httpRouter
+from utils.mongo_indexes import ensure_mongo_indexes
+from utils.traceloop import init_tracing
+from worker.utils.fire_event import RabbitMQPublisher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ensure_mongo_indexes()
+    init_tracing()
+    yield
+    await requeue_admitted()
+    await RabbitMQPublisher.get_instance().close()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(httpRouter)
 app.include_router(amqpRouter)
@@ -1,15 +1,19 @@
+import asyncio
+import os
+from concurrent.futures import Future
 from datetime import datetime
 
-from faststream.rabbit.fastapi import Logger, RabbitRouter  # type: ignore
+from dotenv import load_dotenv
+from faststream.rabbit.fastapi import Logger, RabbitMessage, RabbitRouter  # type: ignore
 from faststream.rabbit.schemas.queue import RabbitQueue
 from pydantic import BaseModel
 from schema import ResponseModel, RouteModelPayload
 from tc_messageBroker.rabbit_mq.event import Event
 from tc_messageBroker.rabbit_mq.queue import Queue
 from utils.credentials import load_rabbitmq_credentials
+from utils.fair_scheduler import get_scheduler
 from utils.persist_payload import PersistPayload
 from utils.query_engine.prepare_answer_sources import PrepareAnswerSources
-from utils.traceloop import init_tracing
 from worker.tasks import query_data_sources
 from worker.utils.fire_event import job_send
 from bot.evaluations.answer_relevance import AnswerRelevanceEvaluation
@@ -21,9 +25,17 @@ from bot.evaluations.schema import (
     QuestionAnswerCoverageSuccess,
 )
 
+load_dotenv()
 rabbitmq_creds = load_rabbitmq_credentials()
 
-router = RabbitRouter(rabbitmq_creds["url"])
+# the messages delivered to this process before being acknowledged
+# should be larger than the workers so the scheduler has questions to reorder
+AMQP_PREFETCH_COUNT = int(os.getenv("AMQP_PREFETCH_COUNT", 32))
+# the questions acknowledged while waiting in the scheduler's queues,
+# the messages beyond it are acknowledged once answered
+AMQP_MAX_QUEUED = int(os.getenv("AMQP_MAX_QUEUED", 256))
+
+router = RabbitRouter(rabbitmq_creds["url"], max_consumers=AMQP_PREFETCH_COUNT)
 
 
 class Payload(BaseModel):
@@ -32,13 +44,72 @@ class Payload(BaseModel):
     content: RouteModelPayload
 
 
+# the questions acknowledged on admission and not answered yet
+_admitted: dict[Future, Payload] = {}
+
+
+async def run_scheduled(message: RabbitMessage, payload: Payload, **kwargs):
+    """
+    answer a question on the process' fair scheduler
+
+    the message is acknowledged as soon as its question is queued, so the broker
+    keeps delivering and the questions of other communities reach the scheduler
+    behind a burst of one community instead of waiting on the prefetched messages.
+    above `AMQP_MAX_QUEUED` queued questions the message is acknowledged only
+    once answered, holding its prefetch slot and pushing back on the broker.
+    the acknowledged questions not started yet are republished by
+    `requeue_admitted` on shutdown, a crashed process loses them
+
+    Parameters
+    ------------
+    message : RabbitMessage
+        the broker message of the question
+    payload : Payload
+        the question's payload
+    **kwargs
+        the arguments of `query_data_sources`
+
+    Returns
+    ---------
+    response : str | None
+        the answer to the question
+    references : list[NodeWithScore]
+        the nodes used to answer
+    """
+    scheduler = get_scheduler()
+    future = scheduler.submit(payload.content.communityId, query_data_sources, **kwargs)
+    if scheduler.queued() <= AMQP_MAX_QUEUED:
+        _admitted[future] = payload
+        await message.ack()
+
+    try:
+        return await asyncio.wrap_future(future)
+    finally:
+        # a cancelled question is left to be requeued
+        if not future.cancelled():
+            _admitted.pop(future, None)
+
+
+async def requeue_admitted() -> None:
+    """
+    republish the acknowledged questions that haven't started to the hivemind queue
+    """
+    for future, payload in list(_admitted.items()):
+        if future.cancel():
+            await job_send(
+                event=payload.event,
+                queue_name=Queue.HIVEMIND,
+                content=payload.content.model_dump(),
+            )
+        _admitted.pop(future, None)
+
+
 @router.subscriber(queue=RabbitQueue(name=Queue.HIVEMIND, durable=True))
-async def ask(payload: Payload, logger: Logger):
+async def ask(payload: Payload, message: RabbitMessage, logger: Logger):
     if payload.event == Event.HIVEMIND.QUESTION_RECEIVED:
         try:
             question = payload.content.question.message
             community_id = payload.content.communityId
-            init_tracing()
             logger.info(f"COMMUNITY_ID: {community_id} Received job")
 
             if payload.content.metadata:
@@ -48,7 +119,9 @@ async def ask(payload: Payload, logger: Logger):
             else:
                 enable_answer_skipping = False
 
-            response, references = query_data_sources(
+            response, references = await run_scheduled(
+                message,
+                payload,
                 community_id=community_id,
                 query=question,
                 enable_answer_skipping=enable_answer_skipping,
@@ -58,16 +131,16 @@ async def ask(payload: Payload, logger: Logger):
 
             logger.info(f"COMMUNITY_ID: {community_id} Job finished")
 
-            eval_result = await AnswerRelevanceEvaluation().evaluate(
-                question=question, answer=response
-            )
-
-            confidence_result = await AnswerConfidenceEvaluation().evaluate(
-                question=question, answer=response
-            )
-
-            coverage_result = await QuestionAnswerCoverageEvaluation().evaluate(
-                question=question, answer=response
+            eval_result, confidence_result, coverage_result = await asyncio.gather(
+                AnswerRelevanceEvaluation().evaluate(
+                    question=question, answer=response
+                ),
+                AnswerConfidenceEvaluation().evaluate(
+                    question=question, answer=response
+                ),
+                QuestionAnswerCoverageEvaluation().evaluate(
+                    question=question, answer=response
+                ),
             )
 
             response_payload = RouteModelPayload(
@@ -116,16 +189,18 @@ async def ask(payload: Payload, logger: Logger):
             )
             # dumping the whole payload of question & answer to db
             persister = PersistPayload()
-            persister.persist_payload(response_payload)
+            await asyncio.to_thread(persister.persist_payload, response_payload)
 
             if response is None:
                 raise ValueError("not confident in answering!")
 
-            job_send(
+            await job_send(
                 event=payload.content.route.destination.event,
                 queue_name=payload.content.route.destination.queue,
                 content=response_payload.model_dump(),
             )
+        except asyncio.CancelledError:
+            logger.info(f"COMMUNITY_ID: {community_id} Job requeued")
         except Exception as e:
             logger.exception(f"Errors While processing job! {e}")
     else:
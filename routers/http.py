@@ -9,7 +9,9 @@ from bot.evaluations.question_answered import QuestionAnswerCoverageEvaluation
 from schema import HTTPPayload, QuestionModel, ResponseModel
 from services.api_key import validate_token
 from starlette.status import HTTP_403_FORBIDDEN
+from utils.fair_scheduler import get_scheduler
 from utils.persist_payload import PersistPayload
+from worker.celery import select_queue
 from worker.tasks import ask_question_auto_search
 from bot.evaluations.schema import (
     AnswerRelevanceSuccess,
@@ -20,6 +22,8 @@ from bot.evaluations.schema import (
 
 class RequestPayload(BaseModel):
     question: QuestionModel
+    # the auto-answer questions, answered only if confident and on the background lane
+    enable_answer_skipping: bool = False
 
 
 router = APIRouter()
@@ -31,9 +35,13 @@ async def ask(
     community_id: str = Depends(validate_token),
 ):
     query = payload.question.message
-    task = ask_question_auto_search.delay(
-        community_id=community_id,
-        query=query,
+    task = ask_question_auto_search.apply_async(
+        kwargs={
+            "community_id": community_id,
+            "query": query,
+            "enable_answer_skipping": payload.enable_answer_skipping,
+        },
+        queue=select_queue(payload.enable_answer_skipping),
     )
     payload_http = HTTPPayload(
         communityId=community_id,
@@ -125,3 +133,15 @@ async def status(
         results = {"id": task.id, "status": task.status}
 
     return results
+
+
+@router.get("/scheduler/status")
+async def scheduler_status(
+    community_id: str = Depends(validate_token),
+):
+    """
+    the queue depth and wait times of the community's questions
+    within this process' fair scheduler
+    """
+    stats = get_scheduler().stats().get(community_id)
+    return {"community_id": community_id, "scheduler": stats}
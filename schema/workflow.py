@@ -0,0 +1,70 @@
+from pydantic import BaseModel
+
+
+class SubQuestionTask(BaseModel):
+    """
+    a sub-question to be answered by one platform's query engine
+    """
+
+    community_id: str
+    query: str
+    enable_answer_skipping: bool
+    platform: str
+    platform_id: str
+    tool_name: str
+    sub_question: str
+
+
+class NodeReference(BaseModel):
+    """
+    a compact form of a retrieved node, to pass between the activities
+
+    the snippet is the node's truncated text, only kept where it is needed
+    """
+
+    node_id: str
+    score: float | None = None
+    url: str | None = None
+    snippet: str | None = None
+
+
+class RetrievalPlan(BaseModel):
+    valid_query: bool = True
+    sub_questions: list[SubQuestionTask] = []
+
+
+class SubQuestionResult(BaseModel):
+    """
+    the answer of a platform to its sub-question
+    """
+
+    tool_name: str
+    sub_question: str
+    answer: str
+    sources: list[NodeReference] = []
+    summary_nodes: list[NodeReference] = []
+
+
+class SynthesisRequest(BaseModel):
+    query: str
+    results: list[SubQuestionResult]
+
+
+class EvaluationRequest(BaseModel):
+    query: str
+    response: str | None
+    results: list[SubQuestionResult] = []
+    retrieval_used: bool = True
+
+
+class AnswerEvaluation(BaseModel):
+    metadata: dict
+    coverage_score: int | None = None
+
+
+class PersistRequest(BaseModel):
+    community_id: str
+    query: str
+    response: str
+    metadata: dict
+    workflow_id: str | None = None
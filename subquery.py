@@ -5,8 +5,8 @@ from llama_index.core.schema import NodeWithScore
 from llama_index.core.tools import QueryEngineTool, ToolMetadata
 from llama_index.llms.openai import OpenAI
 from llama_index.question_gen.guidance import GuidanceQuestionGenerator
-from tc_hivemind_backend.db.utils.preprocess_text import BasePreprocessor
 from tc_hivemind_backend.embeddings.cohere import CohereEmbedding
+from utils.model_cache import CachedPreprocessor
 from utils.globals import INVALID_QUERY_RESPONSE, NO_ANSWER_REFERENCE, NO_ANSWER_REFERENCE_PLACEHOLDER
 from utils.qdrant_utils import QDrantUtils
 from utils.query_engine import (
@@ -25,6 +25,57 @@ from utils.query_engine import (
 )
 
 
+# the query engine tool of each platform, described for the sub-question generator
+PLATFORM_TOOLS_METADATA: dict[str, ToolMetadata] = {
+    "discord": ToolMetadata(
+        name="Discord",
+        description="Contains messages and summaries of conversations from the Discord platform of the community",
+    ),
+    "discourse": ToolMetadata(
+        name="Discourse",
+        description="Contains messages and summaries of discussions from the Discourse platform of the community, structured to capture key interactions and insights.",
+    ),
+    "google": ToolMetadata(
+        name="Google-Drive",
+        description=(
+            "Stores and manages documents, spreadsheets, presentations,"
+            " and other files for the community."
+        ),
+    ),
+    "notion": ToolMetadata(
+        name="Notion",
+        description=(
+            "Centralizes notes, wikis, project plans, and to-dos for the community."
+        ),
+    ),
+    "telegram": ToolMetadata(
+        name="Telegram",
+        description=(
+            "Contains messages, conversations, and media from the Telegram platform,"
+            " used for group discussions within the community."
+        ),
+    ),
+    "github": ToolMetadata(
+        name="GitHub",
+        description=(
+            "Hosts commits and conversations from Github issues and"
+            " pull requests from the selected repositories"
+        ),
+    ),
+    "mediaWiki": ToolMetadata(
+        name="WikiPedia",
+        description="Hosts articles about any information on internet",
+    ),
+    "website": ToolMetadata(
+        name="Website",
+        description=(
+            "Hosts a diverse collection of crawled data from various "
+            "online sources to facilitate community insights and analysis."
+        ),
+    ),
+}
+
+
 def query_multiple_source(
     query: str,
     community_id: str,
@@ -78,6 +129,84 @@ def query_multiple_source(
         dictionary containing metadata from query engines if return_metadata=True
         includes 'summary_nodes' and other metadata from individual platforms
     """
+    query_engine_tools = prepare_query_engine_tools(
+        query=query,
+        community_id=community_id,
+        enable_answer_skipping=enable_answer_skipping,
+        **kwargs,
+    )
+    if not CachedPreprocessor().extract_main_content(text=query):
+        response = INVALID_QUERY_RESPONSE
+        source_nodes = []
+        return response, source_nodes
+
+    embed_model = configure_settings()
+    s_engine = CustomSubQuestionQueryEngine.from_defaults(
+        question_gen=get_question_generator(),
+        query_engine_tools=query_engine_tools,
+        use_async=False,
+        verbose=False,
+    )
+    query_embedding = embed_model.get_text_embedding(text=query)
+
+    result: tuple[RESPONSE_TYPE, list[NodeWithScore]] = s_engine.query(
+        QueryBundle(query_str=query, embedding=query_embedding)
+    )
+    response, source_nodes = result
+    # filtering out None ones
+    source_nodes = [node for node in source_nodes if node]
+
+    # Handle empty source nodes case early
+    if source_nodes == []:
+        metadata = {} if return_metadata else None
+        return (NO_ANSWER_REFERENCE, source_nodes, metadata) if return_metadata else (NO_ANSWER_REFERENCE, source_nodes)
+    
+    # Extract metadata if needed
+    metadata = {}
+    if return_metadata and hasattr(response, "metadata") and response.metadata:
+        metadata = response.metadata
+    
+    # Determine response text
+    response_text = response.response if hasattr(response, "response") else str(response)
+    if response_text == NO_ANSWER_REFERENCE_PLACEHOLDER:
+        response_text = NO_ANSWER_REFERENCE
+        # Clear source_nodes if no valid answer but keep them for metadata case
+        final_source_nodes = source_nodes if return_metadata else []
+    else:
+        final_source_nodes = source_nodes
+    
+    # Return appropriate tuple based on return_metadata flag
+    if return_metadata:
+        return response_text, final_source_nodes, metadata
+    else:
+        return response_text, final_source_nodes
+
+
+def prepare_query_engine_tools(
+    query: str,
+    community_id: str,
+    enable_answer_skipping: bool,
+    **kwargs,
+) -> list[QueryEngineTool]:
+    """
+    prepare the query engines of the given platforms having their data available
+
+    Parameters
+    ------------
+    query : str
+        the user question
+    community_id : str
+        the community id to get their data
+    enable_answer_skipping : bool
+        skip answering questions with non-relevant retrieved nodes
+    **kwargs:
+        the platforms, same as `query_multiple_source`
+
+    Returns
+    --------
+    query_engine_tools : list[QueryEngineTool]
+        the query engines of the platforms as tools
+    """
     # Get platform values - can be either boolean or platform IDs
     discord = kwargs.get("discord", False)
     discourse = kwargs.get("discourse", False)
@@ -89,7 +218,6 @@ def query_multiple_source(
     website = kwargs.get("website", False)
 
     query_engine_tools: list[QueryEngineTool] = []
-    tools: list[ToolMetadata] = []
     qdrant_utils = QDrantUtils(community_id)
 
     # wrapper for more clarity
@@ -101,7 +229,7 @@ def query_multiple_source(
         if check_collection(discord):
             if check_collection(discord + "_summary"):
                 discord_query_engine = prepare_discord_engine_auto_filter(
-                community_id=community_id,
+                    community_id=community_id,
                     platform_id=discord,
                     enable_answer_skipping=enable_answer_skipping,
                 )
@@ -111,12 +239,8 @@ def query_multiple_source(
                     platform_id=discord,
                     enable_answer_skipping=enable_answer_skipping,
                 )
-            tool_metadata = ToolMetadata(
-                name="Discord",
-                description="Contains messages and summaries of conversations from the Discord platform of the community",
-            )
+            tool_metadata = PLATFORM_TOOLS_METADATA["discord"]
 
-            tools.append(tool_metadata)
             query_engine_tools.append(
                 QueryEngineTool(
                     query_engine=discord_query_engine,
@@ -130,11 +254,7 @@ def query_multiple_source(
             query,
             enable_answer_skipping=enable_answer_skipping,
         )
-        tool_metadata = ToolMetadata(
-            name="Discourse",
-            description="Contains messages and summaries of discussions from the Discourse platform of the community, structured to capture key interactions and insights.",
-        )
-        tools.append(tool_metadata)
+        tool_metadata = PLATFORM_TOOLS_METADATA["discourse"]
         query_engine_tools.append(
             QueryEngineTool(
                 query_engine=discourse_query_engine,
@@ -151,13 +271,7 @@ def query_multiple_source(
             ).prepare(
                 enable_answer_skipping=enable_answer_skipping,
             )
-            tool_metadata = ToolMetadata(
-                name="Google-Drive",
-                description=(
-                    "Stores and manages documents, spreadsheets, presentations,"
-                    " and other files for the community."
-                ),
-            )
+            tool_metadata = PLATFORM_TOOLS_METADATA["google"]
             query_engine_tools.append(
                 QueryEngineTool(
                     query_engine=google_query_engine,
@@ -174,12 +288,7 @@ def query_multiple_source(
             ).prepare(
                 enable_answer_skipping=enable_answer_skipping,
             )
-            tool_metadata = ToolMetadata(
-                name="Notion",
-                description=(
-                    "Centralizes notes, wikis, project plans, and to-dos for the community."
-                ),
-            )
+            tool_metadata = PLATFORM_TOOLS_METADATA["notion"]
             query_engine_tools.append(
                 QueryEngineTool(
                     query_engine=notion_query_engine,
@@ -203,13 +312,7 @@ def query_multiple_source(
                     community_id=community_id, platform_id=platform_id
                 ).prepare(enable_answer_skipping=enable_answer_skipping)
 
-            tool_metadata = ToolMetadata(
-                name="Telegram",
-                description=(
-                    "Contains messages, conversations, and media from the Telegram platform,"
-                    " used for group discussions within the community."
-                ),
-            )
+            tool_metadata = PLATFORM_TOOLS_METADATA["telegram"]
             query_engine_tools.append(
                 QueryEngineTool(
                     query_engine=telegram_query_engine,
@@ -227,13 +330,7 @@ def query_multiple_source(
             ).prepare(
                 enable_answer_skipping=enable_answer_skipping,
             )
-            tool_metadata = ToolMetadata(
-                name="GitHub",
-                description=(
-                    "Hosts commits and conversations from Github issues and"
-                    " pull requests from the selected repositories"
-                ),
-            )
+            tool_metadata = PLATFORM_TOOLS_METADATA["github"]
             query_engine_tools.append(
                 QueryEngineTool(
                     query_engine=github_query_engine,
@@ -248,10 +345,7 @@ def query_multiple_source(
             mediawiki_query_engine = MediaWikiQueryEngine(
                 community_id=community_id, platform_id=platform_id
             ).prepare(enable_answer_skipping=enable_answer_skipping)
-            tool_metadata = ToolMetadata(
-                name="WikiPedia",
-                description="Hosts articles about any information on internet",
-            )
+            tool_metadata = PLATFORM_TOOLS_METADATA["mediaWiki"]
             query_engine_tools.append(
                 QueryEngineTool(
                     query_engine=mediawiki_query_engine,
@@ -269,70 +363,35 @@ def query_multiple_source(
             ).prepare(
                 enable_answer_skipping=enable_answer_skipping,
             )
-            tool_metadata = ToolMetadata(
-                name="Website",
-                description=(
-                    "Hosts a diverse collection of crawled data from various "
-                    "online sources to facilitate community insights and analysis."
-                ),
-            )
+            tool_metadata = PLATFORM_TOOLS_METADATA["website"]
             query_engine_tools.append(
                 QueryEngineTool(
                     query_engine=website_query_engine,
                     metadata=tool_metadata,
                 )
             )
-    if not BasePreprocessor().extract_main_content(text=query):
-        response = INVALID_QUERY_RESPONSE
-        source_nodes = []
-        return response, source_nodes
 
+    return query_engine_tools
+
+
+def configure_settings() -> CohereEmbedding:
+    """
+    set the embedding model and the llm used by the query engines
+
+    Returns
+    --------
+    embed_model : CohereEmbedding
+        the embedding model set
+    """
     embed_model = CohereEmbedding()
-    llm = OpenAI("gpt-4o-mini")
     Settings.embed_model = embed_model
-    Settings.llm = llm
+    Settings.llm = OpenAI("gpt-4o-mini")
+    return embed_model
+
 
-    question_gen = GuidanceQuestionGenerator.from_defaults(
+def get_question_generator() -> GuidanceQuestionGenerator:
+    return GuidanceQuestionGenerator.from_defaults(
         guidance_llm=OpenAIChat("gpt-4o-mini"),
         verbose=False,
         prompt_template_str=DEFAULT_GUIDANCE_SUB_QUESTION_PROMPT_TMPL,
     )
-    s_engine = CustomSubQuestionQueryEngine.from_defaults(
-        question_gen=question_gen,
-        query_engine_tools=query_engine_tools,
-        use_async=False,
-        verbose=False,
-    )
-    query_embedding = embed_model.get_text_embedding(text=query)
-
-    result: tuple[RESPONSE_TYPE, list[NodeWithScore]] = s_engine.query(
-        QueryBundle(query_str=query, embedding=query_embedding)
-    )
-    response, source_nodes = result
-    # filtering out None ones
-    source_nodes = [node for node in source_nodes if node]
-
-    # Handle empty source nodes case early
-    if source_nodes == []:
-        metadata = {} if return_metadata else None
-        return (NO_ANSWER_REFERENCE, source_nodes, metadata) if return_metadata else (NO_ANSWER_REFERENCE, source_nodes)
-    
-    # Extract metadata if needed
-    metadata = {}
-    if return_metadata and hasattr(response, "metadata") and response.metadata:
-        metadata = response.metadata
-    
-    # Determine response text
-    response_text = response.response if hasattr(response, "response") else str(response)
-    if response_text == NO_ANSWER_REFERENCE_PLACEHOLDER:
-        response_text = NO_ANSWER_REFERENCE
-        # Clear source_nodes if no valid answer but keep them for metadata case
-        final_source_nodes = source_nodes if return_metadata else []
-    else:
-        final_source_nodes = source_nodes
-    
-    # Return appropriate tuple based on return_metadata flag
-    if return_metadata:
-        return response_text, final_source_nodes, metadata
-    else:
-        return response_text, final_source_nodes
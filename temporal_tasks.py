@@ -1,74 +1,301 @@
+import asyncio
+import logging
+import os
 from datetime import timedelta
+from typing import Any, Awaitable
 
+from bot.agent.tools import (
+    QueryEngineUnavailableError,
+    aanswer_sub_question,
+    evaluate_answer,
+    general_llm_answer,
+    plan_sub_questions,
+    route_question,
+    synthesize_sub_answers,
+)
+from bot.agent.tools.rag import to_reference
 from llama_index.core.query_engine import SubQuestionAnswerPair
 from llama_index.core.schema import NodeWithScore, TextNode
+from schema import QuestionModel, ResponseModel, RouteModel, RouteModelPayload
+from schema.workflow import (
+    AnswerEvaluation,
+    EvaluationRequest,
+    PersistRequest,
+    RetrievalPlan,
+    SubQuestionResult,
+    SubQuestionTask,
+    SynthesisRequest,
+)
+from tc_temporal_backend.schema.hivemind import HivemindQueryPayload
 from temporalio import activity, workflow
-from openai import OpenAI
 from temporalio.common import RetryPolicy
-from utils.globals import NO_ANSWER_REFERENCE, NO_ANSWER_REFERENCE_PLACEHOLDER
+from temporalio.exceptions import ActivityError
+from utils.globals import (
+    INVALID_QUERY_RESPONSE,
+    NO_ANSWER_REFERENCE,
+    NO_DATA_SOURCE_SELECTED,
+)
+from utils.persist_payload import PersistPayload
 from utils.query_engine.prepare_answer_sources import PrepareAnswerSources
-from tc_temporal_backend.schema.hivemind import HivemindQueryPayload
-from bot.agent.tools import rag_tool, general_llm_tool
-import logging
+from worker.tasks import query_data_sources, select_data_sources
+
+# activities heartbeat this often while the pipeline is running
+# and are considered lost after `HEARTBEAT_TIMEOUT` without one
+HEARTBEAT_INTERVAL = timedelta(seconds=10)
+HEARTBEAT_TIMEOUT = timedelta(seconds=30)
+
+# llm calls are cheap to retry, each retry repeating only its own step
+LLM_RETRY_POLICY = RetryPolicy(
+    initial_interval=timedelta(seconds=2),
+    maximum_interval=timedelta(seconds=30),
+    maximum_attempts=3,
+)
+RETRIEVAL_RETRY_POLICY = RetryPolicy(
+    initial_interval=timedelta(seconds=5),
+    maximum_interval=timedelta(seconds=30),
+    maximum_attempts=2,
+    # the platform has no data, retrying wouldn't change it
+    non_retryable_error_types=[QueryEngineUnavailableError.__name__],
+)
+LOCAL_RETRY_POLICY = RetryPolicy(
+    initial_interval=timedelta(seconds=1),
+    maximum_interval=timedelta(seconds=10),
+    maximum_attempts=3,
+)
 
+# the workflows started before it ran a single `hivemind_temporal_activity`
+FINE_GRAINED_ACTIVITIES_PATCH = "fine-grained-activities"
 
 
-async def hivemind_activity(payload: HivemindQueryPayload):
+def select_task_queue(enable_answer_skipping: bool) -> str | None:
     """
-    Route the incoming query to the appropriate tool.
-    Uses a lightweight LLM-based router to select between RAG and general LLM.
+    select the lane to run the question's activities on
+
+    Parameters
+    ------------
+    enable_answer_skipping : bool
+        auto-answer questions go to the background lane,
+        explicit user questions stay on the workflow's task queue
+
+    Returns
+    ---------
+    task_queue : str | None
+        the activity task queue, None meaning the workflow's own task queue
+        (also the case for background questions if no background lane is set)
     """
-    # If answer skipping is enabled, always route to RAG directly
-    if payload.enable_answer_skipping:
-        return await rag_tool(payload)
+    if not enable_answer_skipping:
+        return None
+    return os.getenv("TEMPORAL_BACKGROUND_TASK_QUEUE") or None
+
+
+async def heartbeat_while(
+    awaitable: Awaitable[Any], interval: timedelta = HEARTBEAT_INTERVAL
+) -> Any:
+    """
+    await the given job while heartbeating the running activity
 
-    # else, try to answer using the general knowledge as well
+    Parameters
+    ------------
+    awaitable : Awaitable[Any]
+        the activity's job
+    interval : timedelta
+        the time between two heartbeats
+
+    Returns
+    ---------
+    result : Any
+        the job's result
+    """
+    task = asyncio.ensure_future(awaitable)
     try:
-        client = OpenAI()
-        router_messages = [
-            {
-                "role": "system",
-                "content": (
-                    "You are the TogetherCrew bot which is a strict router and lightweight answerer. If the question requires specific, external, or context data "
-                    "(e.g., company/product/project/community/user/platform/etc.), return exactly one word: 'rag'. "
-                    "Do not act as a general-purpose assistant and do not answer very broad or generic questions; if the query is generic, out of scope, or not directly about helping the user's specific problem, return 'rag'. "
-                    "Otherwise, answer the question directly in one short paragraph or less, following these rules: "
-                    "rely solely on your own knowledge, do not fabricate citations or sources, provide concise and clear answers, "
-                    f"never provide suggestions or ask for clarifications, and if you don't know the answer, reply exactly with '{NO_ANSWER_REFERENCE_PLACEHOLDER}'. "
-                    "When in doubt, prefer returning 'rag'. Return only 'rag' or the answer text. No extra commentary."
-                ),
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Question: {payload.query}\n\n"
-                    "Choose tool:"
-                ),
-            },
-        ]
-        decision = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=router_messages,
-            temperature=0.0,
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=interval.total_seconds())
+            if done:
+                return task.result()
+            activity.heartbeat()
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+@activity.defn
+async def select_task_queue_activity(enable_answer_skipping: bool) -> str | None:
+    # reading the environment, kept out of the workflow code
+    return select_task_queue(enable_answer_skipping)
+
+
+@activity.defn
+async def route_activity(query: str) -> str:
+    return await route_question(query)
+
+
+@activity.defn
+async def select_data_sources_activity(community_id: str) -> dict[str, str]:
+    return await asyncio.to_thread(select_data_sources, community_id)
+
+
+@activity.defn
+async def plan_activity(
+    community_id: str,
+    query: str,
+    enable_answer_skipping: bool,
+    data_sources: dict[str, str],
+) -> RetrievalPlan:
+    return await heartbeat_while(
+        asyncio.to_thread(
+            plan_sub_questions,
+            community_id,
+            query,
+            enable_answer_skipping,
+            data_sources,
         )
-        router_output = (decision.choices[0].message.content or "rag").strip()
-    except Exception as ex:
-        logging.exception(f"Error routing question to tool. defaulting to rag. Exception: {ex}")
-        router_output = "rag"
+    )
+
+
+@activity.defn
+async def retrieve_activity(task: SubQuestionTask) -> SubQuestionResult:
+    return await heartbeat_while(aanswer_sub_question(task))
+
+
+@activity.defn
+async def synthesize_activity(request: SynthesisRequest) -> str:
+    return await heartbeat_while(asyncio.to_thread(synthesize_sub_answers, request))
+
 
-    if router_output.lower() == "rag":
-        return await rag_tool(payload)
-    # For any non-'rag' output, we answer via general LLM tool to ensure
-    # consistent evaluations and persistence behavior.
-    return await general_llm_tool(payload)
+@activity.defn
+async def general_answer_activity(query: str) -> str | None:
+    # the llm errors are raised for the activity to be retried
+    return await general_llm_answer(query)
+
+
+@activity.defn
+async def evaluate_activity(request: EvaluationRequest) -> AnswerEvaluation:
+    return await heartbeat_while(evaluate_answer(request))
+
+
+@activity.defn
+async def persist_activity(request: PersistRequest) -> None:
+    response_payload = RouteModelPayload(
+        communityId=request.community_id,
+        route=RouteModel(source="temporal", destination=None),
+        question=QuestionModel(message=request.query),
+        response=ResponseModel(message=request.response),
+        metadata=request.metadata,
+    )
+    # If workflow_id is None, insert new data
+    # else update existing document with evaluation results and response
+    await asyncio.to_thread(
+        PersistPayload().persist_payload,
+        response_payload,
+        workflow_id=request.workflow_id,
+    )
 
 
 @activity.defn
 async def hivemind_temporal_activity(payload: HivemindQueryPayload):
     """
-    wrapping the hivemind job as a temporal activity
+    the single activity of the workflows started before the fine-grained ones,
+    kept registered until they are drained
+
+    it runs the same steps within one attempt and returns
+    the answer with its references the way those workflows read them
     """
-    return await hivemind_activity(payload)
+    return await heartbeat_while(hivemind_activity(payload))
+
+
+async def hivemind_activity(
+    payload: HivemindQueryPayload,
+) -> tuple[str | None, list[SubQuestionAnswerPair]]:
+    # If answer skipping is enabled, always route to RAG directly
+    route = "rag"
+    if not payload.enable_answer_skipping:
+        route = await route_question(payload.query)
+
+    references: list[SubQuestionAnswerPair] = []
+    metadata: dict = {}
+    if route == "rag":
+        response, references, metadata = await asyncio.to_thread(
+            query_data_sources,
+            community_id=payload.community_id,
+            query=payload.query,
+            enable_answer_skipping=payload.enable_answer_skipping,
+            return_metadata=True,
+        )
+        references = [ref for ref in references if ref]
+    else:
+        try:
+            response = await general_llm_answer(payload.query)
+        except Exception as exp:
+            logging.exception(f"LLM generation failed. Exception: {exp}")
+            response = None
+
+    results = [
+        SubQuestionResult(
+            tool_name=ref.sub_q.tool_name,
+            sub_question=ref.sub_q.sub_question,
+            answer=ref.answer or "",
+            sources=[to_reference(node) for node in ref.sources or []],
+        )
+        for ref in references
+    ]
+    if results:
+        # the evaluation reads the summary nodes of all results alike
+        results[0].summary_nodes = [
+            to_reference(node)
+            for platform_metadata in metadata.values()
+            for node in platform_metadata.get("summary_nodes") or []
+            if node
+        ]
+    evaluation = await evaluate_answer(
+        EvaluationRequest(
+            query=payload.query,
+            response=response,
+            results=results,
+            retrieval_used=route == "rag",
+        )
+    )
+
+    answer_reference = ""
+    if references and response != NO_ANSWER_REFERENCE:
+        answer_reference = PrepareAnswerSources().prepare_answer_sources(
+            nodes=references  # type: ignore
+        )
+    await persist_activity(
+        PersistRequest(
+            community_id=payload.community_id,
+            query=payload.query,
+            response=(
+                f"{response or ''}\n\n{answer_reference}"
+                if route == "rag"
+                else response or ""
+            ),
+            metadata=evaluation.metadata,
+            workflow_id=payload.workflow_id,
+        )
+    )
+
+    if (
+        evaluation.coverage_score is not None
+        and evaluation.coverage_score < 3
+        and payload.enable_answer_skipping
+    ):
+        return None, []
+
+    return response, references
+
+
+HIVEMIND_ACTIVITIES = [
+    select_task_queue_activity,
+    hivemind_temporal_activity,
+    route_activity,
+    select_data_sources_activity,
+    plan_activity,
+    retrieve_activity,
+    synthesize_activity,
+    general_answer_activity,
+    evaluate_activity,
+    persist_activity,
+]
 
 
 @workflow.defn
@@ -79,17 +306,219 @@ class HivemindWorkflow:
 
     @workflow.run
     async def run(self, payload: HivemindQueryPayload):
-        response_tuple = await workflow.execute_activity(
+        if not workflow.patched(FINE_GRAINED_ACTIVITIES_PATCH):
+            return await self.run_single_activity(payload)
+
+        task_queue = await workflow.execute_local_activity(
+            select_task_queue_activity,
+            payload.enable_answer_skipping,
+            start_to_close_timeout=timedelta(seconds=10),
+            retry_policy=LOCAL_RETRY_POLICY,
+        )
+
+        # If answer skipping is enabled, always route to RAG directly
+        # else, try to answer using the general knowledge as well
+        route = "rag"
+        if not payload.enable_answer_skipping:
+            route = await workflow.execute_activity(
+                route_activity,
+                payload.query,
+                task_queue=task_queue,
+                start_to_close_timeout=timedelta(seconds=30),
+                retry_policy=LLM_RETRY_POLICY,
+            )
+
+        if route == "rag":
+            response, results = await self.answer_with_rag(payload, task_queue)
+        else:
+            try:
+                response = await workflow.execute_activity(
+                    general_answer_activity,
+                    payload.query,
+                    task_queue=task_queue,
+                    start_to_close_timeout=timedelta(minutes=1),
+                    retry_policy=LLM_RETRY_POLICY,
+                )
+            except ActivityError as exp:
+                # all the retries failed, the same as having no answer
+                workflow.logger.error(f"Failed to answer from the LLM! exp: {exp}")
+                response = None
+            results = []
+
+        answer_reference = ""
+        if results and response != NO_ANSWER_REFERENCE:
+            answer_reference = PrepareAnswerSources().prepare_reference_sources(
+                references=[ref for result in results for ref in result.sources]
+            )
+
+        try:
+            evaluation = await workflow.execute_activity(
+                evaluate_activity,
+                EvaluationRequest(
+                    query=payload.query,
+                    response=response,
+                    results=results,
+                    retrieval_used=route == "rag",
+                ),
+                task_queue=task_queue,
+                start_to_close_timeout=timedelta(minutes=3),
+                heartbeat_timeout=HEARTBEAT_TIMEOUT,
+                retry_policy=LLM_RETRY_POLICY,
+            )
+        except ActivityError as exp:
+            # the evaluations are informative, not a reason to lose the answer
+            workflow.logger.error(f"Failed to evaluate the answer! exp: {exp}")
+            evaluation = AnswerEvaluation(metadata={})
+
+        await workflow.execute_local_activity(
+            persist_activity,
+            PersistRequest(
+                community_id=payload.community_id,
+                query=payload.query,
+                response=(
+                    f"{response or ''}\n\n{answer_reference}"
+                    if route == "rag"
+                    else response or ""
+                ),
+                metadata=evaluation.metadata,
+                workflow_id=payload.workflow_id,
+            ),
+            start_to_close_timeout=timedelta(seconds=30),
+            retry_policy=LOCAL_RETRY_POLICY,
+        )
+
+        # Hardcoded threshold for answer coverage
+        # if the score is less than 3, we do not return the answer
+        # and in case of enable_answer_skipping is True (auto-answering questions)
+        if (
+            evaluation.coverage_score is not None
+            and evaluation.coverage_score < 3
+            and payload.enable_answer_skipping
+        ):
+            workflow.logger.warning(
+                f"Answer coverage score is less than 3, skipping answer: {evaluation.coverage_score}"
+            )
+            return None
+
+        if response:
+            return f"{response}\n\n{answer_reference}"
+        else:
+            return None
+
+    async def answer_with_rag(
+        self, payload: HivemindQueryPayload, task_queue: str | None
+    ) -> tuple[str | None, list[SubQuestionResult]]:
+        """
+        answer the question from the community's platforms
+        retrieving from all platforms in parallel
+
+        Returns
+        ---------
+        response : str | None
+            the answer, `None` if answer skipping is enabled
+            and there was no relevant information
+        results : list[SubQuestionResult]
+            the platforms' answers to their sub-questions
+        """
+        data_sources = await workflow.execute_local_activity(
+            select_data_sources_activity,
+            payload.community_id,
+            start_to_close_timeout=timedelta(seconds=10),
+            retry_policy=LOCAL_RETRY_POLICY,
+        )
+        workflow.logger.info(f"Data sources selected: {data_sources}")
+
+        results: list[SubQuestionResult] = []
+        if not data_sources:
+            response = NO_DATA_SOURCE_SELECTED
+        else:
+            plan = await workflow.execute_activity(
+                plan_activity,
+                args=[
+                    payload.community_id,
+                    payload.query,
+                    payload.enable_answer_skipping,
+                    data_sources,
+                ],
+                task_queue=task_queue,
+                start_to_close_timeout=timedelta(minutes=1),
+                heartbeat_timeout=HEARTBEAT_TIMEOUT,
+                retry_policy=LLM_RETRY_POLICY,
+            )
+            if not plan.valid_query:
+                response = INVALID_QUERY_RESPONSE
+            else:
+                outcomes = await asyncio.gather(
+                    *(
+                        workflow.execute_activity(
+                            retrieve_activity,
+                            task,
+                            task_queue=task_queue,
+                            start_to_close_timeout=timedelta(minutes=2),
+                            heartbeat_timeout=HEARTBEAT_TIMEOUT,
+                            retry_policy=RETRIEVAL_RETRY_POLICY,
+                        )
+                        for task in plan.sub_questions
+                    ),
+                    return_exceptions=True,
+                )
+                # a failed platform shouldn't fail the others
+                for task, outcome in zip(plan.sub_questions, outcomes):
+                    if isinstance(outcome, ActivityError):
+                        workflow.logger.warning(
+                            f"[{task.tool_name}] Failed to run {task.sub_question}: {outcome}"
+                        )
+                    elif isinstance(outcome, BaseException):
+                        raise outcome
+                    else:
+                        results.append(outcome)
+
+                if results:
+                    response = await workflow.execute_activity(
+                        synthesize_activity,
+                        SynthesisRequest(
+                            query=payload.query,
+                            # the synthesis only needs the platforms' answers
+                            results=[
+                                result.model_copy(
+                                    update={"sources": [], "summary_nodes": []}
+                                )
+                                for result in results
+                            ],
+                        ),
+                        task_queue=task_queue,
+                        start_to_close_timeout=timedelta(minutes=2),
+                        heartbeat_timeout=HEARTBEAT_TIMEOUT,
+                        retry_policy=LLM_RETRY_POLICY,
+                    )
+                else:
+                    response = NO_ANSWER_REFERENCE
+
+        if payload.enable_answer_skipping and (
+            not results or response == NO_ANSWER_REFERENCE
+        ):
+            return None, results
+
+        return response, results
+
+    async def run_single_activity(self, payload: HivemindQueryPayload) -> str | None:
+        """
+        the workflow as it was before the fine-grained activities,
+        for the ones started then to replay deterministically
+        """
+        # its activity is already scheduled in the replayed history,
+        # so the lane isn't chosen again
+        response, references = await workflow.execute_activity(
             hivemind_temporal_activity,
             payload,
             start_to_close_timeout=timedelta(minutes=5),
+            heartbeat_timeout=HEARTBEAT_TIMEOUT,
             retry_policy=RetryPolicy(
                 initial_interval=timedelta(seconds=10),
                 maximum_interval=timedelta(minutes=5),
                 maximum_attempts=1,
             ),
         )
-        response, references = response_tuple
 
         references_nodes = self.serialize_references(references=references)
         answer_reference = ""
@@ -1,11 +1,13 @@
 import asyncio
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import load_dotenv
 from tc_temporal_backend.client import TemporalClient
-from temporal_tasks import HivemindWorkflow, hivemind_temporal_activity
+from temporal_tasks import HIVEMIND_ACTIVITIES, HivemindWorkflow
 from temporalio.worker import UnsandboxedWorkflowRunner, Worker
+from utils.mongo_indexes import ensure_mongo_indexes
 
 
 async def main():
@@ -17,18 +19,54 @@ async def main():
         raise ValueError("`TEMPORAL_TASK_QUEUE` is not properly set!")
 
     logging.info(f"Using task queue: {task_queue}")
+    ensure_mongo_indexes()
     client = await TemporalClient().get_client()
 
-    worker = Worker(
-        client,
-        task_queue=task_queue,
-        workflows=[HivemindWorkflow],
-        activities=[hivemind_temporal_activity],
-        workflow_runner=UnsandboxedWorkflowRunner(),
+    max_activities = int(os.getenv("TEMPORAL_MAX_CONCURRENT_ACTIVITIES", 8))
+    logging.info(f"Running {max_activities} concurrent activities")
+    workers = [
+        Worker(
+            client,
+            task_queue=task_queue,
+            workflows=[HivemindWorkflow],
+            activities=HIVEMIND_ACTIVITIES,
+            workflow_runner=UnsandboxedWorkflowRunner(),
+            max_concurrent_activities=max_activities,
+        )
+    ]
+    executor_threads = max_activities
+
+    # the auto-answer lane, having its own activity slots
+    # so background volume doesn't take the interactive questions' slots
+    background_task_queue = os.getenv("TEMPORAL_BACKGROUND_TASK_QUEUE")
+    if background_task_queue:
+        max_background_activities = int(
+            os.getenv("TEMPORAL_BACKGROUND_MAX_CONCURRENT_ACTIVITIES", 2)
+        )
+        logging.info(
+            f"Using background task queue: {background_task_queue} "
+            f"with {max_background_activities} concurrent activities"
+        )
+        workers.append(
+            Worker(
+                client,
+                task_queue=background_task_queue,
+                activities=HIVEMIND_ACTIVITIES,
+                max_concurrent_activities=max_background_activities,
+            )
+        )
+        executor_threads += max_background_activities
+
+    # the activities run their blocking pipeline on the loop's default executor
+    # having a thread for each activity slot, the slots wouldn't wait on threads
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(
+            max_workers=executor_threads, thread_name_prefix="hivemind-activity"
+        )
     )
 
     logging.info("Starting worker...")
-    await worker.run()
+    await asyncio.gather(*(worker.run() for worker in workers))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from utils.mongo import MongoSingleton
+from utils.mongo_indexes import (
+    MONGO_QUERY_PATHS,
+    ensure_mongo_indexes,
+    find_collection_scans,
+    plan_stages,
+)
+
+
+class TestMongoIndexes(TestCase):
+    def setUp(self) -> None:
+        self.client = MongoSingleton.get_instance().get_client()
+        for path in MONGO_QUERY_PATHS:
+            self.client[path["db"]].drop_collection(path["collection"])
+            # explain needs the collection to exist
+            self.client[path["db"]][path["collection"]].insert_one({"sample": True})
+
+    def test_collection_scans_without_indexes(self):
+        slow_paths = find_collection_scans(self.client)
+
+        # `_id` is always indexed
+        self.assertNotIn("hivemind.internal_messages", slow_paths)
+        self.assertIn("hivemind.tokens", slow_paths)
+        self.assertIn("hivemind.external_messages", slow_paths)
+        self.assertIn("Core.modules", slow_paths)
+        self.assertIn("Core.platforms", slow_paths)
+
+    def test_query_plans_use_indexes(self):
+        slow_paths = ensure_mongo_indexes(self.client)
+        self.assertEqual(slow_paths, [])
+
+        for path in MONGO_QUERY_PATHS:
+            explain = (
+                self.client[path["db"]][path["collection"]]
+                .find(path["filter"])
+                .explain()
+            )
+            stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+            self.assertNotIn("COLLSCAN", stages)
+            self.assertTrue(
+                any("IXSCAN" in stage or "IDHACK" in stage for stage in stages),
+                f"{path['db']}.{path['collection']} plan stages: {stages}",
+            )
+
+    def test_idempotent(self):
+        ensure_mongo_indexes(self.client)
+        indexes_before = self.client["Core"]["modules"].index_information()
+
+        ensure_mongo_indexes(self.client)
+        indexes_after = self.client["Core"]["modules"].index_information()
+
+        self.assertEqual(indexes_before, indexes_after)
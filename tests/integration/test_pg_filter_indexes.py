@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from bot.retrievers.retrieve_similar_nodes import RetrieveSimilarNodes
+from llama_index.core import MockEmbedding
+from llama_index.core.schema import TextNode
+from llama_index.vector_stores.postgres import PGVectorStore
+from sqlalchemy import text
+from tc_hivemind_backend.db.credentials import load_postgres_credentials
+from utils.pg_indexes import ensure_filter_indexes, explain_plan
+
+
+class TestPGFilterIndexes(TestCase):
+    def setUp(self) -> None:
+        credentials = load_postgres_credentials()
+        self.vector_store = PGVectorStore.from_params(
+            database="postgres",
+            host=credentials["host"],
+            password=credentials["password"],
+            port=credentials["port"],
+            user=credentials["user"],
+            table_name="test_filter_indexes",
+            embed_dim=4,
+        )
+        self.vector_store._initialize()
+        # starting with an empty table, no indexes of the previous runs
+        self._drop_table()
+        self.vector_store._create_tables_if_not_exists()
+
+        start = datetime(2024, 1, 1)
+        nodes = []
+        for i in range(200):
+            node = TextNode(
+                text=f"message {i}",
+                metadata={
+                    "category": f"category{i % 5}",
+                    "topic": f"topic{i % 20}",
+                    "type": "thread" if i % 2 else "channel",
+                    # the raw data has times, the summaries only the day
+                    "date": (start + timedelta(days=i // 10, hours=i % 10)).isoformat(),
+                },
+            )
+            node.embedding = [1.0, float(i), 0.5, 0.1]
+            nodes.append(node)
+        self.vector_store.add(nodes)
+
+        self.retriever = RetrieveSimilarNodes(
+            self.vector_store,
+            similarity_top_k=None,
+            embed_model=MockEmbedding(embed_dim=4),
+        )
+        self.filters = [
+            {"category": "category1", "topic": "topic1", "date": "2024-01-02"},
+            {"category": "category3", "topic": "topic3", "date": "2024-01-02"},
+            {"category": "category1", "topic": "topic1", "date": "2024-01-02"},
+            {"type": "thread"},
+        ]
+
+    def tearDown(self) -> None:
+        self._drop_table()
+
+    def _drop_table(self) -> None:
+        table_name = self.vector_store._table_class.__tablename__
+        with self.vector_store._session() as session, session.begin():
+            session.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+
+    def _metadata_indexes(self, filters) -> list[str]:
+        stmt = self.retriever.build_query("question", filters, date_interval=1)
+        plan = explain_plan(self.vector_store, stmt, disable_seqscan=True)
+        self.assertNotIn("Seq Scan", [node.split(" using ")[0] for node in plan])
+        # a full scan of the primary key index is not serving the filters
+        return [node for node in plan if "_metadata_" in node]
+
+    def test_filtered_rows(self):
+        nodes = self.retriever.query_db(
+            "question",
+            [{"category": "category1", "topic": "topic1", "date": "2024-01-02"}],
+            date_interval=1,
+        )
+        # the days 2024-01-01 to 2024-01-03, their times included
+        self.assertEqual(
+            sorted(node.node.get_content() for node in nodes),
+            ["message 1", "message 21"],
+        )
+
+        nodes = self.retriever.query_db(
+            "question", [{"topic": {"ne": "topic1"}, "type": "channel"}]
+        )
+        self.assertEqual(len(nodes), 100)
+
+    def test_indexes_serve_filters(self):
+        stmt = self.retriever.build_query("question", self.filters, date_interval=1)
+        plan = explain_plan(self.vector_store, stmt, disable_seqscan=True)
+        self.assertFalse(any("_metadata_" in node for node in plan))
+
+        index_names = ensure_filter_indexes(self.vector_store)
+        self.assertEqual(len(index_names), 2)
+
+        table_name = self.vector_store._table_class.__tablename__
+        self.assertIn(
+            f"Bitmap Index Scan using {table_name}_metadata_containment",
+            self._metadata_indexes(self.filters),
+        )
+        self.assertIn(
+            f"Bitmap Index Scan using {table_name}_metadata_containment",
+            self._metadata_indexes([{"type": "thread"}]),
+        )
+        self.assertTrue(
+            any(
+                node.endswith(f"using {table_name}_metadata_date")
+                for node in self._metadata_indexes([{"date": "2024-01-05"}])
+            )
+        )
+
+    def test_idempotent(self):
+        self.assertEqual(
+            ensure_filter_indexes(self.vector_store),
+            ensure_filter_indexes(self.vector_store),
+        )
@@ -0,0 +1,36 @@
+import unittest
+from unittest.mock import patch
+
+from worker.utils.memory import AdaptiveGarbageCollector, current_rss_mb
+
+
+class TestAdaptiveGarbageCollector(unittest.TestCase):
+    def setUp(self) -> None:
+        self.collector = AdaptiveGarbageCollector(
+            rss_threshold_mb=float("inf"),
+            gen2_threshold=1000,
+            max_tasks_between_collections=3,
+        )
+
+    def test_rss_is_positive(self):
+        self.assertGreater(current_rss_mb(), 0)
+
+    @patch("worker.utils.memory.gc.collect", return_value=0)
+    def test_collect_after_max_tasks(self, mock_collect):
+        results = [self.collector.maybe_collect() for _ in range(6)]
+
+        self.assertEqual(results, [False, False, True, False, False, True])
+        self.assertEqual(mock_collect.call_count, 2)
+
+    @patch("worker.utils.memory.gc.collect", return_value=0)
+    def test_collect_on_rss_threshold(self, mock_collect):
+        self.collector.rss_threshold_mb = 0
+
+        self.assertTrue(self.collector.maybe_collect())
+        mock_collect.assert_called_once()
+
+    @patch("worker.utils.memory.gc.collect", return_value=0)
+    @patch("worker.utils.memory.gc.get_count", return_value=(0, 0, 1000))
+    def test_collect_on_generation_threshold(self, _, mock_collect):
+        self.assertTrue(self.collector.maybe_collect())
+        mock_collect.assert_called_once()
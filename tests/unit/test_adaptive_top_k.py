@@ -0,0 +1,113 @@
+import unittest
+from unittest.mock import patch
+
+from llama_index.core import MockEmbedding, VectorStoreIndex
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from pydantic import ValidationError
+from qdrant_client import QdrantClient
+from utils.qdrant_utils import AdaptiveTopK, load_adaptive_top_k
+from utils.query_engine.batch_qdrant_retrieval import batch_search
+from utils.query_engine.combined_qdrant_retriever import CombinedQdrantRetriever
+
+ADAPTIVE_TOP_K_CONFIG = (
+    '{"discord": {"min_k": 2, "max_k": 20, "score_threshold": 0.3}, '
+    '"discord_summary": {"max_k": 40, "score_gap": 0.1}}'
+)
+
+
+def scored_nodes(scores: list[float]) -> list[NodeWithScore]:
+    return [
+        NodeWithScore(node=TextNode(text=f"node {i}"), score=score)
+        for i, score in enumerate(scores)
+    ]
+
+
+class TestAdaptiveTopK(unittest.TestCase):
+    def test_cut_at_score_gap(self):
+        adaptive_top_k = AdaptiveTopK(min_k=1, max_k=10, score_gap=0.1)
+        nodes = adaptive_top_k.cut(scored_nodes([0.9, 0.85, 0.82, 0.5, 0.48]))
+        self.assertEqual([node.score for node in nodes], [0.9, 0.85, 0.82])
+
+    def test_min_k_kept(self):
+        adaptive_top_k = AdaptiveTopK(min_k=3, max_k=10, score_gap=0.1)
+        nodes = adaptive_top_k.cut(scored_nodes([0.9, 0.5, 0.48, 0.2]))
+        self.assertEqual([node.score for node in nodes], [0.9, 0.5, 0.48])
+
+    def test_threshold_and_max_k(self):
+        adaptive_top_k = AdaptiveTopK(max_k=3, score_threshold=0.5)
+        nodes = adaptive_top_k.cut(scored_nodes([0.9, 0.8, 0.4, 0.3]))
+        self.assertEqual([node.score for node in nodes], [0.9, 0.8])
+        nodes = adaptive_top_k.cut(scored_nodes([0.9, 0.8, 0.7, 0.6]))
+        self.assertEqual(len(nodes), 3)
+
+    def test_invalid_bounds(self):
+        with self.assertRaises(ValidationError):
+            AdaptiveTopK(min_k=10, max_k=5)
+
+    def test_load_config(self):
+        with patch.dict("os.environ", {"QDRANT_ADAPTIVE_TOP_K": ADAPTIVE_TOP_K_CONFIG}):
+            raw = load_adaptive_top_k("discord")
+            summary = load_adaptive_top_k("discord", summary=True)
+            missing = load_adaptive_top_k("telegram")
+
+        self.assertEqual(raw, AdaptiveTopK(min_k=2, max_k=20, score_threshold=0.3))
+        self.assertEqual(summary.max_k, 40)
+        self.assertEqual(summary.score_gap, 0.1)
+        self.assertIsNone(missing)
+
+    def test_not_configured(self):
+        with patch.dict("os.environ", {"QDRANT_ADAPTIVE_TOP_K": ""}):
+            self.assertIsNone(load_adaptive_top_k("discord"))
+        with patch.dict("os.environ", {"QDRANT_ADAPTIVE_TOP_K": '{"discord": {}}'}):
+            # `max_k` is required
+            self.assertIsNone(load_adaptive_top_k("discord"))
+
+
+class TestRetrieverAdaptiveTopK(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = QdrantClient(":memory:")
+        self.raw_index = VectorStoreIndex.from_vector_store(
+            QdrantVectorStore(client=self.client, collection_name="raw"),
+            embed_model=MockEmbedding(embed_dim=8),
+        )
+        self.raw_index.insert_nodes(
+            [TextNode(text=f"message {i}") for i in range(10)]
+        )
+        self.adaptive_top_k = AdaptiveTopK(min_k=1, max_k=4, score_threshold=0.5)
+        self.retriever = CombinedQdrantRetriever(
+            raw_index=self.raw_index,
+            raw_top_k=50,
+            adaptive_top_k=self.adaptive_top_k,
+        )
+
+    def test_search_limits_passed(self):
+        with patch.object(self.client, "search", wraps=self.client.search) as search:
+            nodes = self.retriever.retrieve("question")
+
+        self.assertEqual(search.call_args.kwargs["limit"], 4)
+        self.assertEqual(search.call_args.kwargs["score_threshold"], 0.5)
+        self.assertLessEqual(len(nodes), 4)
+
+    def test_fixed_top_k(self):
+        retriever = CombinedQdrantRetriever(raw_index=self.raw_index, raw_top_k=50)
+        with patch.object(self.client, "search", wraps=self.client.search) as search:
+            nodes = retriever.retrieve("question")
+
+        self.assertEqual(search.call_args.kwargs["limit"], 50)
+        self.assertIsNone(search.call_args.kwargs["score_threshold"])
+        self.assertEqual(len(nodes), 10)
+
+    def test_batch_search_limits(self):
+        embedding = self.raw_index._embed_model.get_query_embedding("question")
+        with patch.object(
+            self.client, "search_batch", wraps=self.client.search_batch
+        ) as search_batch:
+            (nodes,) = batch_search(
+                [(self.retriever, self.raw_index, embedding, 50, None)]
+            )
+
+        request = search_batch.call_args.kwargs["requests"][0]
+        self.assertEqual(request.limit, 4)
+        self.assertEqual(request.score_threshold, 0.5)
+        self.assertLessEqual(len(nodes), 4)
@@ -0,0 +1,106 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bot.agent.tools import (
+    QueryEngineUnavailableError,
+    aanswer_sub_question,
+    general_llm_answer,
+    plan_sub_questions,
+)
+from llama_index.core.question_gen.types import SubQuestion
+from llama_index.core.schema import NodeWithScore, TextNode
+from schema.workflow import SubQuestionTask
+
+
+class TestPlanSubQuestions(unittest.TestCase):
+    def setUp(self) -> None:
+        for target in [
+            "bot.agent.tools.rag.configure_settings",
+            "bot.agent.tools.rag.get_question_generator",
+            "bot.agent.tools.rag.CachedPreprocessor",
+        ]:
+            patcher = patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @patch("bot.agent.tools.rag.prepare_query_engine_tools")
+    @patch("bot.agent.tools.rag.generate_sub_questions")
+    def test_engines_not_prepared(self, generate_sub_questions, prepare_tools):
+        generate_sub_questions.return_value = [
+            SubQuestion(sub_question="discord question", tool_name="Discord"),
+            SubQuestion(sub_question="github question", tool_name="GitHub"),
+            SubQuestion(sub_question="other", tool_name="Unknown"),
+        ]
+        plan = plan_sub_questions(
+            "community",
+            "question",
+            False,
+            {"discord": "discord_id", "github": "github_id", "unknown": "id"},
+        )
+
+        prepare_tools.assert_not_called()
+        (_, tools, _), _ = generate_sub_questions.call_args
+        self.assertEqual([tool.name for tool in tools], ["Discord", "GitHub"])
+        self.assertEqual(
+            [(task.platform, task.platform_id) for task in plan.sub_questions],
+            [("discord", "discord_id"), ("github", "github_id")],
+        )
+
+
+class TestGeneralLLM(unittest.IsolatedAsyncioTestCase):
+    @patch("bot.agent.tools.general_llm.AsyncOpenAI")
+    async def test_errors(self, client):
+        client.return_value.chat.completions.create = AsyncMock(
+            side_effect=RuntimeError("rate limited")
+        )
+        # raised for the temporal activity to retry
+        with self.assertRaises(RuntimeError):
+            await general_llm_answer("question")
+
+    @patch("bot.agent.tools.general_llm.AsyncOpenAI")
+    async def test_answer(self, client):
+        completion = MagicMock()
+        completion.choices[0].message.content = "answer"
+        client.return_value.chat.completions.create = AsyncMock(
+            return_value=completion
+        )
+        self.assertEqual(await general_llm_answer("question"), "answer")
+
+
+class TestAnswerSubQuestion(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.task = SubQuestionTask(
+            community_id="community",
+            query="question",
+            enable_answer_skipping=False,
+            platform="github",
+            platform_id="github_id",
+            tool_name="GitHub",
+            sub_question="github question",
+        )
+        patcher = patch("bot.agent.tools.rag.configure_settings")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("bot.agent.tools.rag.prepare_query_engine_tools")
+    async def test_answer(self, prepare_tools):
+        response = MagicMock(
+            source_nodes=[NodeWithScore(node=TextNode(id_="n1", text="text"), score=1)],
+            metadata=None,
+        )
+        response.__str__.return_value = "answer"
+        tool = MagicMock()
+        tool.metadata.name = "GitHub"
+        tool.query_engine.query.return_value = response
+        prepare_tools.return_value = [tool]
+
+        result = await aanswer_sub_question(self.task)
+
+        tool.query_engine.query.assert_called_once_with("github question")
+        self.assertEqual(result.answer, "answer")
+        self.assertEqual([node.node_id for node in result.sources], ["n1"])
+
+    @patch("bot.agent.tools.rag.prepare_query_engine_tools", return_value=[])
+    async def test_engine_unavailable(self, _):
+        with self.assertRaises(QueryEngineUnavailableError):
+            await aanswer_sub_question(self.task)
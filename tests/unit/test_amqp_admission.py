@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from routers import amqp
+from routers.amqp import Payload, requeue_admitted, run_scheduled
+from tc_messageBroker.rabbit_mq.event import Event
+from tc_messageBroker.rabbit_mq.queue import Queue
+from utils.fair_scheduler import FairScheduler
+
+
+class TestAmqpAdmission(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.scheduler = FairScheduler(max_workers=1, per_community_limit=1)
+        self.addCleanup(self.scheduler.shutdown)
+        self.blocker = threading.Event()
+        self.addCleanup(self.blocker.set)
+        self.addCleanup(amqp._admitted.clear)
+
+        patcher = patch("routers.amqp.get_scheduler", return_value=self.scheduler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.payload = Payload(
+            event=Event.HIVEMIND.QUESTION_RECEIVED,
+            date="2024-01-01T00:00:00",
+            content={
+                "communityId": "community1",
+                "route": {"source": "discord", "destination": None},
+                "question": {"message": "question"},
+                "metadata": None,
+            },
+        )
+        self.message = MagicMock(ack=AsyncMock())
+
+    async def _wait_acked(self) -> None:
+        for _ in range(100):
+            if self.message.ack.await_count:
+                return
+            await asyncio.sleep(0.01)
+
+    @patch("routers.amqp.query_data_sources")
+    async def test_acked_on_admission(self, query_data_sources):
+        query_data_sources.side_effect = lambda **kwargs: self.blocker.wait(5)
+        task = asyncio.create_task(
+            run_scheduled(self.message, self.payload, query="question")
+        )
+
+        await self._wait_acked()
+        self.message.ack.assert_awaited_once()
+        self.assertFalse(task.done())
+
+        self.blocker.set()
+        self.assertTrue(await task)
+        query_data_sources.assert_called_once_with(query="question")
+        self.assertEqual(amqp._admitted, {})
+
+    @patch("routers.amqp.AMQP_MAX_QUEUED", 0)
+    @patch("routers.amqp.query_data_sources", return_value="answer")
+    async def test_acked_when_answered_above_max_queued(self, _):
+        self.scheduler.submit("blocker", self.blocker.wait, 5)
+        task = asyncio.create_task(run_scheduled(self.message, self.payload))
+
+        await asyncio.sleep(0.05)
+        self.message.ack.assert_not_awaited()
+
+        self.blocker.set()
+        self.assertEqual(await task, "answer")
+        self.assertEqual(amqp._admitted, {})
+
+    @patch("routers.amqp.job_send", new_callable=AsyncMock)
+    @patch("routers.amqp.query_data_sources")
+    async def test_requeue_admitted(self, query_data_sources, job_send):
+        self.scheduler.submit("blocker", self.blocker.wait, 5)
+        task = asyncio.create_task(run_scheduled(self.message, self.payload))
+        await self._wait_acked()
+
+        await requeue_admitted()
+
+        job_send.assert_awaited_once_with(
+            event=Event.HIVEMIND.QUESTION_RECEIVED,
+            queue_name=Queue.HIVEMIND,
+            content=self.payload.content.model_dump(),
+        )
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        query_data_sources.assert_not_called()
+        self.assertEqual(amqp._admitted, {})
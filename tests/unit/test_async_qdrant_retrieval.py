@@ -0,0 +1,136 @@
+from datetime import datetime, timezone
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock
+
+from llama_index.core import MockEmbedding, VectorStoreIndex
+from llama_index.core.base.response.schema import Response
+from llama_index.core.schema import TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from schema.type import DataType
+from utils.query_engine.combined_qdrant_retriever import CombinedQdrantRetriever
+from utils.query_engine.dual_qdrant_retrieval_engine import DualQdrantRetrievalEngine
+
+
+class TestAsyncQdrantRetrieval(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.client = QdrantClient(":memory:")
+        self.embed_model = MockEmbedding(embed_dim=8)
+
+        self.summary_index = self._create_index(
+            "community_platform_summary",
+            [
+                TextNode(text=f"summary of {day}", metadata={"date": day})
+                for day in ["2024-05-10", "2024-06-20"]
+            ],
+        )
+        self.raw_index = self._create_index(
+            "community_platform",
+            [
+                TextNode(
+                    text=f"message of {day}",
+                    metadata={
+                        "date": datetime.strptime(day, "%Y-%m-%d")
+                        .replace(tzinfo=timezone.utc)
+                        .timestamp()
+                    },
+                )
+                for day in [
+                    "2024-05-09",
+                    "2024-05-10",
+                    "2024-06-01",
+                    "2024-06-20",
+                    "2024-06-21",
+                ]
+            ],
+        )
+
+        # the async client searches the same in-memory collections
+        self.async_client = MagicMock()
+        self.async_client.search = AsyncMock(
+            side_effect=lambda **kwargs: self.client.search(**kwargs)
+        )
+
+    def _create_index(
+        self, collection_name: str, nodes: list[TextNode]
+    ) -> VectorStoreIndex:
+        vector_store = QdrantVectorStore(
+            client=self.client, collection_name=collection_name
+        )
+        index = VectorStoreIndex.from_vector_store(
+            vector_store, embed_model=self.embed_model
+        )
+        index.insert_nodes(nodes)
+        return index
+
+    def _create_engine(self, with_summary: bool = True) -> DualQdrantRetrievalEngine:
+        retriever = CombinedQdrantRetriever(
+            raw_index=self.raw_index,
+            raw_top_k=10,
+            summary_index=self.summary_index if with_summary else None,
+            summary_top_k=10 if with_summary else None,
+            metadata_date_key="date",
+            metadata_date_format=DataType.FLOAT,
+            metadata_date_summary_key="date" if with_summary else None,
+            metadata_date_summary_format=DataType.STRING if with_summary else None,
+            date_margin=1,
+            async_client=self.async_client,
+        )
+        llm = MagicMock()
+        llm.complete.return_value = "answer"
+        llm.acomplete = AsyncMock(return_value="answer")
+        return DualQdrantRetrievalEngine.construct(
+            retriever=retriever,
+            response_synthesizer=MagicMock(),
+            llm=llm,
+            qa_prompt=MagicMock(),
+            enable_reranking=False,
+            cross_encoder=None,
+            prefetched_nodes={},
+        )
+
+    def _texts(self, nodes) -> list[str]:
+        return sorted(node.node.get_content() for node in nodes)
+
+    async def test_aretrieve_matches_retrieve(self):
+        retriever = self._create_engine().retriever
+
+        self.assertEqual(
+            self._texts(await retriever.aretrieve("question")),
+            self._texts(retriever.retrieve("question")),
+        )
+        self.assertEqual(
+            self._texts(await retriever.aretrieve_summary("question")),
+            self._texts(retriever.retrieve_summary("question")),
+        )
+        dates = ["2024-05-10"]
+        self.assertEqual(
+            self._texts(await retriever.aretrieve_raw_with_dates("question", dates)),
+            self._texts(retriever.retrieve_raw_with_dates("question", dates)),
+        )
+
+    async def test_summary_query(self):
+        engine = self._create_engine()
+        response = await engine.acustom_query("question")
+
+        self.assertIsInstance(response, Response)
+        self.assertEqual(response.response, "answer")
+        # the messages within the date margin are retrieved,
+        # but only the summaries' days are rendered under them
+        self.assertEqual(
+            self._texts(response.source_nodes),
+            ["message of 2024-05-10", "message of 2024-06-20"],
+        )
+        self.assertEqual(len(response.metadata["summary_nodes"]), 2)
+        engine.llm.acomplete.assert_awaited_once()
+        engine.llm.complete.assert_not_called()
+        # the summary and the raw searches
+        self.assertEqual(self.async_client.search.await_count, 2)
+
+    async def test_basic_query(self):
+        engine = self._create_engine(with_summary=False)
+        response = await engine.acustom_query("question")
+
+        self.assertEqual(len(response.source_nodes), 5)
+        engine.llm.acomplete.assert_awaited_once()
+        self.assertEqual(self.async_client.search.await_count, 1)
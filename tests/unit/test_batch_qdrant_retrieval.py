@@ -0,0 +1,149 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from llama_index.core import MockEmbedding, VectorStoreIndex
+from llama_index.core.base.response.schema import Response
+from llama_index.core.schema import TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from schema.type import DataType
+from utils.query_engine.batch_qdrant_retrieval import prefetch_nodes
+from utils.query_engine.combined_qdrant_retriever import CombinedQdrantRetriever
+from utils.query_engine.dual_qdrant_retrieval_engine import DualQdrantRetrievalEngine
+
+
+class TestBatchQdrantRetrieval(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = QdrantClient(":memory:")
+        self.embed_model = MockEmbedding(embed_dim=8)
+
+        summary_days = ["2024-05-10", "2024-06-20"]
+        raw_days = ["2024-05-09", "2024-05-10", "2024-06-01", "2024-06-21"]
+        self.summary_index = self._create_index(
+            "community_platform_summary",
+            [
+                TextNode(text=f"summary of {day}", metadata={"date": day})
+                for day in summary_days
+            ],
+        )
+        self.raw_index = self._create_index(
+            "community_platform",
+            [
+                TextNode(
+                    text=f"message of {day}",
+                    metadata={"date": self._timestamp(day)},
+                )
+                for day in raw_days
+            ],
+        )
+
+    def _timestamp(self, day: str) -> float:
+        return (
+            datetime.strptime(day, "%Y-%m-%d")
+            .replace(tzinfo=timezone.utc)
+            .timestamp()
+        )
+
+    def _create_index(
+        self, collection_name: str, nodes: list[TextNode]
+    ) -> VectorStoreIndex:
+        vector_store = QdrantVectorStore(
+            client=self.client, collection_name=collection_name
+        )
+        index = VectorStoreIndex.from_vector_store(
+            vector_store, embed_model=self.embed_model
+        )
+        index.insert_nodes(nodes)
+        return index
+
+    def _create_engine(self, with_summary: bool = True) -> DualQdrantRetrievalEngine:
+        retriever = CombinedQdrantRetriever(
+            raw_index=self.raw_index,
+            raw_top_k=10,
+            summary_index=self.summary_index if with_summary else None,
+            summary_top_k=10 if with_summary else None,
+            metadata_date_key="date",
+            metadata_date_format=DataType.FLOAT,
+            metadata_date_summary_key="date" if with_summary else None,
+            metadata_date_summary_format=DataType.STRING if with_summary else None,
+            date_margin=1,
+        )
+        llm = MagicMock()
+        llm.complete.return_value = "answer"
+        return DualQdrantRetrievalEngine.construct(
+            retriever=retriever,
+            response_synthesizer=MagicMock(),
+            llm=llm,
+            qa_prompt=MagicMock(),
+            enable_reranking=False,
+            cross_encoder=None,
+            prefetched_nodes={},
+        )
+
+    def _texts(self, nodes) -> list[str]:
+        return sorted(node.node.get_content() for node in nodes)
+
+    def test_one_batch_per_collection(self):
+        engines = [self._create_engine(), self._create_engine()]
+
+        with patch.object(
+            self.client, "search_batch", wraps=self.client.search_batch
+        ) as search_batch:
+            prefetched = prefetch_nodes(
+                [(engines[0], "first question"), (engines[1], "second question")]
+            )
+
+        self.assertEqual(prefetched, 2)
+        # one summary and one raw request, each having both searches
+        self.assertEqual(search_batch.call_count, 2)
+        collections = sorted(
+            call.kwargs["collection_name"] for call in search_batch.call_args_list
+        )
+        self.assertEqual(
+            collections, ["community_platform", "community_platform_summary"]
+        )
+        for call in search_batch.call_args_list:
+            self.assertEqual(len(call.kwargs["requests"]), 2)
+
+    def test_same_nodes_as_engine_retrieval(self):
+        engine = self._create_engine()
+        prefetch_nodes([(engine, "question")])
+
+        summary_nodes, raw_nodes = engine.prefetched_nodes["question"]
+        retriever = engine.retriever
+        expected_summaries = retriever.retrieve_summary("question")
+        expected_raw = retriever.retrieve_raw_with_dates(
+            "question", engine.summary_dates(expected_summaries)
+        )
+        self.assertEqual(self._texts(summary_nodes), self._texts(expected_summaries))
+        self.assertEqual(self._texts(raw_nodes), self._texts(expected_raw))
+        # 2024-06-01 is out of the summaries' date ranges
+        self.assertNotIn("message of 2024-06-01", self._texts(raw_nodes))
+
+    def test_basic_engine_prefetched(self):
+        engine = self._create_engine(with_summary=False)
+        prefetch_nodes([(engine, "question")])
+
+        summary_nodes, raw_nodes = engine.prefetched_nodes["question"]
+        self.assertIsNone(summary_nodes)
+        self.assertEqual(
+            self._texts(raw_nodes), self._texts(engine.retriever.retrieve("question"))
+        )
+
+    def test_query_consumes_prefetched_nodes(self):
+        engine = self._create_engine()
+        prefetch_nodes([(engine, "question")])
+
+        with patch.object(
+            CombinedQdrantRetriever, "retrieve_summary"
+        ) as retrieve_summary:
+            response = engine.custom_query("question")
+
+        retrieve_summary.assert_not_called()
+        self.assertIsInstance(response, Response)
+        self.assertEqual(len(response.metadata["summary_nodes"]), 2)
+        self.assertNotIn("question", engine.prefetched_nodes)
+
+    def test_other_engines_skipped(self):
+        self.assertEqual(prefetch_nodes([(MagicMock(), "question")]), 0)
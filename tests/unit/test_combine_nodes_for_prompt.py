@@ -0,0 +1,115 @@
+import os
+import time
+import unittest
+from datetime import datetime, timezone
+
+from llama_index.core.schema import NodeWithScore, TextNode
+from schema.type import DataType
+from utils.query_engine.qdrant_query_engine_utils import QdrantEngineUtils
+
+
+def utc_timestamp(value: str) -> float:
+    return (
+        datetime.strptime(value, "%Y-%m-%d %H:%M")
+        .replace(tzinfo=timezone.utc)
+        .timestamp()
+    )
+
+
+class TestCombineNodesForPrompt(unittest.TestCase):
+    def setUp(self) -> None:
+        self.utils = QdrantEngineUtils(
+            metadata_date_key="createdAt",
+            metadata_date_format=DataType.FLOAT,
+            date_margin=1,
+        )
+
+    def _summary(self, date, text: str) -> NodeWithScore:
+        return NodeWithScore(node=TextNode(text=text, metadata={"date": date}))
+
+    def _raw(self, timestamp, text: str) -> NodeWithScore:
+        return NodeWithScore(node=TextNode(text=text, metadata={"createdAt": timestamp}))
+
+    def test_combined_prompt(self):
+        prompt = self.utils.combine_nodes_for_prompt(
+            [
+                self._summary("2024-05-10", "first\nsecond"),
+                self._summary("2024-05-11", "third"),
+            ],
+            [
+                self._raw(utc_timestamp("2024-05-10 10:00"), "hello\nthere"),
+                self._raw(utc_timestamp("2024-05-10 11:00"), "hi"),
+                self._raw(utc_timestamp("2024-05-12 11:00"), "not paired"),
+            ],
+        )
+
+        self.assertEqual(
+            prompt,
+            "Date: 2024-05-10\nContext Summary:\nfirst\nsecond\n\n"
+            "Raw Messages:\nhello there\nhi\n\n"
+            "Date: 2024-05-11\nContext Summary:\nthird\n\n",
+        )
+
+    def test_bullets_order_kept(self):
+        prompt = self.utils.combine_nodes_for_prompt(
+            [
+                self._summary("2024-05-10", "c\na\n\nb"),
+                self._summary("2024-05-10", "a\nd\nc"),
+            ],
+            [],
+        )
+        self.assertEqual(prompt, "Date: 2024-05-10\nContext Summary:\nc\na\nb\nd\n\n")
+
+    def test_utc_days_regardless_of_local_timezone(self):
+        previous_tz = os.environ.get("TZ")
+        os.environ["TZ"] = "America/Los_Angeles"
+        time.tzset()
+        try:
+            prompt = self.utils.combine_nodes_for_prompt(
+                [self._summary("2024-05-10", "summary")],
+                [
+                    # the local date is still 2024-05-09
+                    self._raw(utc_timestamp("2024-05-10 01:00"), "early"),
+                    self._raw(utc_timestamp("2024-05-09 23:59"), "the day before"),
+                ],
+            )
+        finally:
+            if previous_tz is None:
+                os.environ.pop("TZ")
+            else:
+                os.environ["TZ"] = previous_tz
+            time.tzset()
+
+        self.assertIn("Raw Messages:\nearly", prompt)
+        self.assertNotIn("the day before", prompt)
+
+    def test_timestamp_summary_dates(self):
+        prompt = self.utils.combine_nodes_for_prompt(
+            [self._summary(utc_timestamp("2024-05-10 00:00"), "summary")],
+            [
+                self._raw(int(utc_timestamp("2024-05-10 08:00")), "message"),
+                self._raw(None, "no date"),
+            ],
+        )
+        self.assertEqual(
+            prompt,
+            "Date: 2024-05-10\nContext Summary:\nsummary\n\n"
+            "Raw Messages:\nmessage",
+        )
+
+    def test_no_summaries(self):
+        self.assertEqual(
+            self.utils.combine_nodes_for_prompt(
+                [], [self._raw(utc_timestamp("2024-05-10 08:00"), "message")]
+            ),
+            "",
+        )
+
+    def test_to_utc_day_strings(self):
+        self.assertEqual(
+            self.utils.to_utc_day_strings(
+                [utc_timestamp("1999-12-31 23:59"), 0, "2024-05-10", float("nan")]
+            ),
+            ["1999-12-31", "1970-01-01", None, None],
+        )
+        self.assertEqual(self.utils.to_utc_day_strings([]), [])
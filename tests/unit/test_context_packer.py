@@ -0,0 +1,278 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from bot.retrievers.retrieve_similar_nodes import RetrieveSimilarNodes
+from llama_index.core.schema import NodeWithScore, TextNode
+from utils.globals import CONTEXT_TOKEN_BUDGET
+from utils.query_engine.context_packer import ContextPacker, load_token_budget
+from utils.query_engine.dual_qdrant_retrieval_engine import (
+    CombinedQdrantRetriever,
+    DualQdrantRetrievalEngine,
+)
+from utils.query_engine.level_based_platform_query_engine import (
+    LevelBasedPlatformQueryEngine,
+)
+from utils.query_engine.level_based_platforms_util import LevelBasedPlatformUtils
+
+
+class WordEncoding:
+    """
+    an encoding counting the words as the tokens
+    the tiktoken encodings are downloaded on their first use
+    """
+
+    def encode_ordinary_batch(self, texts: list[str]) -> list[list[str]]:
+        return [text.split() for text in texts]
+
+    def decode(self, tokens: list[str]) -> str:
+        return " ".join(tokens)
+
+
+def words_node(count: int, score: float = 1.0) -> NodeWithScore:
+    return NodeWithScore(
+        node=TextNode(text=" ".join(["word"] * count), metadata={"url": "link"}),
+        score=score,
+    )
+
+
+class TestContextPacker(unittest.TestCase):
+    def _packer(self, token_budget: int, **kwargs) -> ContextPacker:
+        return ContextPacker(
+            token_budget, min_node_tokens=5, encoding=WordEncoding(), **kwargs
+        )
+
+    def test_fits_budget(self):
+        packer = self._packer(100)
+        nodes = [words_node(30), words_node(30)]
+        prompt_nodes, kept_nodes = packer.pack(nodes)
+
+        self.assertEqual(prompt_nodes, nodes)
+        self.assertEqual(kept_nodes, nodes)
+        self.assertEqual(packer.metadata()["packed_tokens"], 60)
+        self.assertEqual(packer.metadata()["dropped_tokens"], 0)
+
+    def test_less_relevant_dropped(self):
+        packer = self._packer(50)
+        nodes = [words_node(30, 0.9), words_node(19, 0.8), words_node(30, 0.7)]
+        prompt_nodes, kept_nodes = packer.pack(nodes)
+
+        self.assertEqual(kept_nodes, nodes[:2])
+        self.assertEqual(
+            packer.metadata(),
+            {
+                "token_budget": 50,
+                "packed_tokens": 49,
+                "dropped_tokens": 30,
+                "dropped_nodes": 1,
+                "truncated_nodes": 0,
+            },
+        )
+
+    def test_long_nodes_cut(self):
+        packer = self._packer(100, max_node_tokens=40)
+        nodes = [words_node(60), words_node(80)]
+        prompt_nodes, kept_nodes = packer.pack(nodes)
+
+        self.assertEqual(kept_nodes, nodes)
+        self.assertEqual(
+            [len(node.node.get_content().split()) for node in prompt_nodes], [40, 40]
+        )
+        # the cut nodes are copies, keeping the metadata
+        self.assertEqual(len(nodes[0].node.get_content().split()), 60)
+        self.assertEqual(prompt_nodes[0].node.metadata, {"url": "link"})
+        self.assertEqual(packer.metadata()["truncated_nodes"], 2)
+        self.assertEqual(packer.metadata()["dropped_tokens"], 60)
+
+    def test_budget_shared_between_packs(self):
+        packer = self._packer(100)
+        packer.pack([words_node(30)], max_tokens=40)
+        _, summary_kept = packer.pack([words_node(30)], max_tokens=3)
+        _, raw_kept = packer.pack([words_node(60), words_node(20)])
+
+        self.assertEqual(summary_kept, [])
+        self.assertEqual(len(raw_kept), 2)
+        self.assertEqual(packer.remaining_tokens, 0)
+
+    def test_node_overhead_counted(self):
+        packer = self._packer(30)
+        nodes = [words_node(20), words_node(20)]
+        _, kept_nodes = packer.pack(
+            nodes, node_overhead=lambda node: "author: someone message:"
+        )
+        # 23 tokens each, the second would be cut to its 4 remaining tokens
+        self.assertEqual(kept_nodes, nodes[:1])
+        self.assertEqual(packer.metadata()["packed_tokens"], 23)
+
+    def test_encoding_unavailable(self):
+        packer = ContextPacker(10)
+        nodes = [words_node(30)]
+        with patch(
+            "utils.query_engine.context_packer.get_token_encoding",
+            side_effect=OSError("offline"),
+        ):
+            prompt_nodes, kept_nodes = packer.pack(nodes)
+
+        self.assertEqual(prompt_nodes, nodes)
+        self.assertEqual(kept_nodes, nodes)
+
+
+class TestLoadTokenBudget(unittest.TestCase):
+    def test_platform_budget(self):
+        with patch.dict("os.environ", {"CONTEXT_TOKEN_BUDGETS": '{"discord": 6000}'}):
+            self.assertEqual(load_token_budget("discord"), 6000)
+            self.assertEqual(load_token_budget("github"), CONTEXT_TOKEN_BUDGET)
+
+    def test_not_configured(self):
+        with patch.dict("os.environ", {"CONTEXT_TOKEN_BUDGETS": "not json"}):
+            self.assertEqual(load_token_budget("discord"), CONTEXT_TOKEN_BUDGET)
+        self.assertEqual(load_token_budget(None), CONTEXT_TOKEN_BUDGET)
+
+
+class TestEngineContextPacking(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = patch(
+            "utils.query_engine.context_packer.get_token_encoding",
+            return_value=WordEncoding(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.llm = MagicMock()
+        self.llm.complete.return_value = "answer"
+        qa_prompt = MagicMock()
+        qa_prompt.format.side_effect = lambda context_str, query_str: context_str
+        self.engine = DualQdrantRetrievalEngine.construct(
+            retriever=MagicMock(),
+            response_synthesizer=MagicMock(),
+            llm=self.llm,
+            qa_prompt=qa_prompt,
+            enable_reranking=False,
+            cross_encoder=None,
+            prefetched_nodes={},
+            token_budget=50,
+            # the test nodes are duplicates of each other
+            near_duplicate_pruning=False,
+        )
+
+    def test_basic_query_packed(self):
+        nodes = [words_node(40, 0.9), words_node(40, 0.8)]
+        response = self.engine._process_basic_query("question", nodes=nodes)
+
+        prompt = self.llm.complete.call_args.args[0]
+        self.assertEqual(len(prompt.split()), 40)
+        self.assertEqual(response.source_nodes, nodes[:1])
+        self.assertEqual(response.metadata["context_packing"]["dropped_nodes"], 1)
+
+    def test_summary_prompt_packed(self):
+        self.engine.retriever = MagicMock(
+            spec=CombinedQdrantRetriever,
+            metadata_date_key="date",
+            metadata_date_format="float",
+            date_margin=0,
+        )
+        summary_nodes = [
+            NodeWithScore(
+                node=TextNode(text=" ".join(["summary"] * 10), metadata={"date": day})
+            )
+            for day in ["2024-01-01", "2024-01-02"]
+        ]
+        # 2024-01-02 and 2024-01-01 in UTC
+        raw_nodes = [
+            NodeWithScore(
+                node=TextNode(text=" ".join(["word"] * 10), metadata={"date": date}),
+                score=score,
+            )
+            for date, score in [(1704153600.0, 0.9), (1704067200.0, 0.8)]
+        ]
+
+        prompt, source_nodes, packing = self.engine._prepare_summary_prompt(
+            "question", summary_nodes, raw_nodes
+        )
+
+        # the second day's header and summary are over the summaries' share
+        # so its raw node isn't rendered, nor packed or returned as a source
+        self.assertNotIn("2024-01-02", prompt)
+        self.assertEqual(source_nodes, raw_nodes[1:])
+        # the summary, its 6 header words and the raw node
+        self.assertEqual(packing["packed_tokens"], 26)
+        self.assertEqual(packing["packed_tokens"], len(prompt.split()))
+
+
+def message_node(text: str, thread: str, score: float = 1.0) -> NodeWithScore:
+    return NodeWithScore(
+        node=TextNode(
+            text=text,
+            metadata={
+                "author_username": "user",
+                "channel": "general",
+                "thread": thread,
+                "date": "2024-01-01",
+            },
+        ),
+        score=score,
+    )
+
+
+class TestLevelBasedContextPacking(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = patch(
+            "utils.query_engine.context_packer.get_token_encoding",
+            return_value=WordEncoding(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        for name, value in {
+            "_utils_class": LevelBasedPlatformUtils("channel", "thread", "date"),
+            "_raw_vector_store": MagicMock(),
+            "_summary_vector_store": MagicMock(),
+            "_similarity_top_k": 10,
+            "_filters": [],
+            "_summary_nodes_filters": [],
+            "_summary_scores": [],
+            "_enable_answer_skipping": False,
+            "_level1_key": "channel",
+            "_level2_key": "thread",
+            "_date_key": "date",
+            "_d": 0,
+            "_token_budget": 60,
+        }.items():
+            patcher = patch.object(
+                LevelBasedPlatformQueryEngine, name, value, create=True
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.llm = MagicMock()
+        self.llm.complete.return_value = "answer"
+        self.engine = LevelBasedPlatformQueryEngine.construct(
+            retriever=MagicMock(),
+            response_synthesizer=MagicMock(),
+            llm=self.llm,
+            qa_prompt=MagicMock(),
+        )
+
+    @patch("utils.query_engine.level_based_platform_query_engine.qa_prompt")
+    @patch.object(RetrieveSimilarNodes, "query_db")
+    def test_prompt_within_budget(self, query_db, qa_prompt):
+        qa_prompt.format.side_effect = lambda context_str, query_str: context_str
+        raw_nodes = [
+            message_node(" ".join(["word"] * 10), "thread1", 0.9),
+            message_node(" ".join(["word"] * 10), "thread2", 0.8),
+            message_node(" ".join(["word"] * 10), "thread1", 0.7),
+        ]
+        summary_nodes = [
+            message_node(" ".join(["summary"] * 15), thread)
+            for thread in ["thread1", "thread2"]
+        ]
+        query_db.side_effect = [raw_nodes, summary_nodes]
+
+        response = self.engine.custom_query("question")
+
+        prompt = self.llm.complete.call_args.args[0]
+        self.assertLessEqual(len(prompt.split()), 60)
+        self.assertLessEqual(response.metadata["context_packing"]["packed_tokens"], 60)
+        # the first summary and its raw nodes fit, the second summary is over its share
+        self.assertEqual(response.source_nodes, [raw_nodes[0], raw_nodes[2]])
+        self.assertIn("thread: thread1", prompt)
+        self.assertNotIn("thread: thread2", prompt)
@@ -0,0 +1,134 @@
+import unittest
+from unittest.mock import patch
+
+import mongomock
+from bson import ObjectId
+from utils.data_source_selector import DataSourceCache
+
+
+class TestDataSourceCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = mongomock.MongoClient()
+        patcher = patch("utils.data_source_selector.MongoSingleton.get_instance")
+        mock_instance = patcher.start()
+        mock_instance.return_value.get_client.return_value = self.client
+        self.addCleanup(patcher.stop)
+
+        self.community_id = "6579c364f1120850414e0dc4"
+        self.platform_id = "6579c364f1120850414e0da1"
+
+    def _insert_module(self, platforms: dict[str, str]) -> None:
+        self.client["Core"]["modules"].insert_one(
+            {
+                "name": "hivemind",
+                "community": ObjectId(self.community_id),
+                "options": {
+                    "platforms": [
+                        {"name": name, "platform": ObjectId(platform_id)}
+                        for name, platform_id in platforms.items()
+                    ]
+                },
+            }
+        )
+
+    def test_cached_within_ttl(self):
+        cache = DataSourceCache(ttl=60, watch_changes=False)
+        self._insert_module({"discord": self.platform_id})
+
+        data_sources = cache.select_data_source(self.community_id)
+        self.assertEqual(data_sources, {"discord": self.platform_id})
+
+        # the change isn't seen as the entry is still fresh
+        self.client["Core"].drop_collection("modules")
+        data_sources = cache.select_data_source(self.community_id)
+        self.assertEqual(data_sources, {"discord": self.platform_id})
+
+    def test_expired_entry_queried_again(self):
+        cache = DataSourceCache(ttl=0, watch_changes=False)
+        self._insert_module({"discord": self.platform_id})
+        self.assertEqual(
+            cache.select_data_source(self.community_id),
+            {"discord": self.platform_id},
+        )
+
+        self.client["Core"].drop_collection("modules")
+        self.assertEqual(cache.select_data_source(self.community_id), {})
+
+    def test_invalidate_community(self):
+        cache = DataSourceCache(ttl=60, watch_changes=False)
+        self.assertEqual(cache.select_data_source(self.community_id), {})
+
+        self._insert_module({"discord": self.platform_id})
+        cache.invalidate(self.community_id)
+        self.assertEqual(
+            cache.select_data_source(self.community_id),
+            {"discord": self.platform_id},
+        )
+
+    def test_returned_value_not_shared(self):
+        cache = DataSourceCache(ttl=60, watch_changes=False)
+        self._insert_module({"discord": self.platform_id})
+
+        data_sources = cache.select_data_source(self.community_id)
+        data_sources["github"] = "some_id"
+
+        self.assertEqual(
+            cache.select_data_source(self.community_id),
+            {"discord": self.platform_id},
+        )
+
+    def test_watcher_unavailable_falls_back_to_ttl(self):
+        """
+        mongomock doesn't support change streams, the same as a standalone mongo
+        """
+        cache = DataSourceCache(ttl=60, watch_changes=False)
+        self._insert_module({"discord": self.platform_id})
+
+        with self.assertLogs(level="WARNING"):
+            cache._watch_modules()
+
+        self.assertEqual(
+            cache.select_data_source(self.community_id),
+            {"discord": self.platform_id},
+        )
+
+    def test_invalidated_while_querying_not_cached(self):
+        cache = DataSourceCache(ttl=60, watch_changes=False)
+        self._insert_module({"discord": self.platform_id})
+
+        query_modules = cache.selector._query_modules_db
+
+        def invalidated_meanwhile(community_id: str) -> list[dict]:
+            platforms = query_modules(community_id)
+            cache.invalidate(community_id)
+            return platforms
+
+        with patch.object(
+            cache.selector, "_query_modules_db", side_effect=invalidated_meanwhile
+        ):
+            cache.select_data_source(self.community_id)
+
+        # the stale result wasn't kept, the change is seen
+        self.client["Core"].drop_collection("modules")
+        self.assertEqual(cache.select_data_source(self.community_id), {})
+
+    def test_failed_watcher_restarted_after_backoff(self):
+        cache = DataSourceCache(ttl=60)
+        with patch.object(cache, "_watch_modules") as watch_modules:
+            cache.select_data_source(self.community_id)
+            cache.select_data_source(self.community_id)
+        self.assertEqual(watch_modules.call_count, 1)
+
+        with self.assertLogs(level="WARNING"):
+            cache._watch_modules()
+        self.assertIsNone(cache._watcher_pid)
+        self.assertEqual(cache._watcher_backoff, 2.0)
+
+        with patch.object(cache, "_watch_modules") as watch_modules:
+            # still within the backoff
+            cache.select_data_source(self.community_id)
+            self.assertEqual(watch_modules.call_count, 0)
+
+            cache._watcher_retry_at = 0.0
+            cache.select_data_source(self.community_id)
+            self.assertEqual(watch_modules.call_count, 1)
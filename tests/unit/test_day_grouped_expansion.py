@@ -0,0 +1,205 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from llama_index.core import MockEmbedding, VectorStoreIndex
+from llama_index.core.schema import TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from schema.type import DataType
+from utils.query_engine.batch_qdrant_retrieval import prefetch_nodes
+from utils.query_engine.combined_qdrant_retriever import CombinedQdrantRetriever
+from utils.query_engine.dual_qdrant_retrieval_engine import DualQdrantRetrievalEngine
+from utils.query_engine.qdrant_query_engine_utils import QdrantEngineUtils
+
+
+def day_timestamp(day: str, hours: int = 0) -> float:
+    return (
+        datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        + timedelta(hours=hours)
+    ).timestamp()
+
+
+class TestDefineDayFilters(unittest.TestCase):
+    def setUp(self) -> None:
+        self.utils = QdrantEngineUtils(
+            metadata_date_key="date",
+            metadata_date_format=DataType.FLOAT,
+            date_margin=7,
+        )
+
+    def _ranges(self, filters) -> list[tuple[float, float]]:
+        return [
+            (filter.must[0].range.gte, filter.must[0].range.lt) for filter in filters
+        ]
+
+    def test_day_per_filter(self):
+        filters = self.utils.define_day_filters(
+            ["2024-05-10", day_timestamp("2024-05-10", hours=5), "2024-05-01"]
+        )
+
+        # the same day given twice, the order kept and no date margin applied
+        self.assertEqual(
+            self._ranges(filters),
+            [
+                (day_timestamp("2024-05-10"), day_timestamp("2024-05-11")),
+                (day_timestamp("2024-05-01"), day_timestamp("2024-05-02")),
+            ],
+        )
+
+    def test_max_days(self):
+        filters = self.utils.define_day_filters(
+            ["2024-05-10", "2024-05-11", "2024-05-12"], max_days=2
+        )
+        self.assertEqual(len(filters), 2)
+
+    def test_recent_days_skipped(self):
+        tomorrow = (datetime.now(tz=timezone.utc) + timedelta(days=1)).strftime(
+            "%Y-%m-%d"
+        )
+        today = datetime.now(tz=timezone.utc).strftime("%Y-%m-%d")
+        filters = self.utils.define_day_filters([tomorrow, today])
+
+        self.assertEqual(len(filters), 1)
+        # today's messages before the cutoff
+        self.assertLess(
+            filters[0].must[0].range.lt, datetime.now(tz=timezone.utc).timestamp()
+        )
+
+    def test_integer_format(self):
+        utils = QdrantEngineUtils(
+            metadata_date_key="createdAt",
+            metadata_date_format=DataType.INTEGER,
+            date_margin=1,
+        )
+        (filter,) = utils.define_day_filters(["2024-05-10"])
+        self.assertEqual(filter.must[0].key, "createdAt")
+        self.assertEqual(filter.must[0].range.gte, int(day_timestamp("2024-05-10")))
+
+
+class DayGroupedExpansionSetup:
+    raw_days = ["2024-05-09", "2024-05-10", "2024-05-11", "2024-06-01"]
+
+    def setUp(self) -> None:
+        self.client = QdrantClient(":memory:")
+        self.embed_model = MockEmbedding(embed_dim=8)
+        self.summary_index = self._create_index(
+            "community_platform_summary",
+            [
+                TextNode(text=f"summary of {day}", metadata={"date": day})
+                for day in ["2024-05-10", "2024-06-01"]
+            ],
+        )
+        self.raw_index = self._create_index(
+            "community_platform",
+            [
+                TextNode(
+                    text=f"message {i} of {day}",
+                    metadata={"date": day_timestamp(day, hours=i)},
+                )
+                for day in self.raw_days
+                for i in range(6)
+            ],
+        )
+
+    def _create_index(
+        self, collection_name: str, nodes: list[TextNode]
+    ) -> VectorStoreIndex:
+        index = VectorStoreIndex.from_vector_store(
+            QdrantVectorStore(client=self.client, collection_name=collection_name),
+            embed_model=self.embed_model,
+        )
+        index.insert_nodes(nodes)
+        return index
+
+    def _create_retriever(self, **kwargs) -> CombinedQdrantRetriever:
+        return CombinedQdrantRetriever(
+            raw_index=self.raw_index,
+            raw_top_k=50,
+            summary_index=self.summary_index,
+            summary_top_k=10,
+            metadata_date_key="date",
+            metadata_date_format=DataType.FLOAT,
+            metadata_date_summary_key="date",
+            metadata_date_summary_format=DataType.STRING,
+            date_margin=1,
+            day_grouped_expansion=True,
+            expansion_days=10,
+            expansion_group_size=2,
+            **kwargs,
+        )
+
+    def _days(self, nodes) -> list[str]:
+        return sorted(node.node.get_content().split(" of ")[1] for node in nodes)
+
+
+class TestDayGroupedExpansion(DayGroupedExpansionSetup, unittest.TestCase):
+    def test_bounded_groups_in_one_request(self):
+        retriever = self._create_retriever()
+        with patch.object(
+            self.client, "search_batch", wraps=self.client.search_batch
+        ) as search_batch:
+            nodes = retriever.retrieve_raw_with_dates(
+                "question", ["2024-05-10", "2024-06-01"]
+            )
+
+        search_batch.assert_called_once()
+        self.assertEqual(len(search_batch.call_args.kwargs["requests"]), 2)
+        # the summary days only, not their date margin
+        self.assertEqual(
+            self._days(nodes),
+            ["2024-05-10", "2024-05-10", "2024-06-01", "2024-06-01"],
+        )
+
+    def test_disabled(self):
+        retriever = self._create_retriever()
+        retriever.day_grouped_expansion = False
+        with patch.object(self.client, "search_batch") as search_batch:
+            nodes = retriever.retrieve_raw_with_dates("question", ["2024-05-10"])
+
+        search_batch.assert_not_called()
+        # the date margin days, up to the raw top k
+        self.assertEqual(len(nodes), 18)
+
+    def test_batched_prefetch(self):
+        llm = MagicMock()
+        engine = DualQdrantRetrievalEngine.construct(
+            retriever=self._create_retriever(),
+            response_synthesizer=MagicMock(),
+            llm=llm,
+            qa_prompt=MagicMock(),
+            enable_reranking=False,
+            cross_encoder=None,
+            prefetched_nodes={},
+        )
+        with patch.object(
+            self.client, "search_batch", wraps=self.client.search_batch
+        ) as search_batch:
+            prefetch_nodes([(engine, "question")])
+
+        # the summary request, then a single raw request of both days
+        self.assertEqual(search_batch.call_count, 2)
+        _, raw_nodes = engine.prefetched_nodes["question"]
+        self.assertEqual(
+            self._days(raw_nodes),
+            ["2024-05-10", "2024-05-10", "2024-06-01", "2024-06-01"],
+        )
+
+
+class TestAsyncDayGroupedExpansion(DayGroupedExpansionSetup, IsolatedAsyncioTestCase):
+    async def test_async_matches_sync(self):
+        async_client = MagicMock()
+        async_client.search_batch = AsyncMock(
+            side_effect=lambda **kwargs: self.client.search_batch(**kwargs)
+        )
+        retriever = self._create_retriever(async_client=async_client)
+        dates = ["2024-05-10", "2024-06-01"]
+
+        nodes = await retriever.aretrieve_raw_with_dates("question", dates)
+
+        async_client.search_batch.assert_awaited_once()
+        self.assertEqual(
+            self._days(nodes),
+            self._days(retriever.retrieve_raw_with_dates("question", dates)),
+        )
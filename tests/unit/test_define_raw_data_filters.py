@@ -0,0 +1,105 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from qdrant_client.http import models
+from schema.type import DataType
+from utils.query_engine.qdrant_query_engine_utils import QdrantEngineUtils
+
+
+class TestDefineRawDataFilters(unittest.TestCase):
+    def setUp(self) -> None:
+        self.utils = QdrantEngineUtils(
+            metadata_date_key="date",
+            metadata_date_format=DataType.FLOAT,
+            date_margin=1,
+        )
+
+    def _ranges(self, filter: models.Filter) -> list[tuple[float, float]]:
+        return sorted((cond.range.gte, cond.range.lte) for cond in filter.should or [])
+
+    def _day(self, value: str) -> float:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+
+    def test_single_date(self):
+        filter = self.utils.define_raw_data_filters(["2024-05-10"])
+
+        self.assertEqual(
+            self._ranges(filter), [(self._day("2024-05-09"), self._day("2024-05-12"))]
+        )
+        self.assertEqual(len(filter.must), 1)
+
+    def test_overlapping_dates_merged(self):
+        filter = self.utils.define_raw_data_filters(
+            ["2024-05-10", "2024-05-11", "2024-05-10"]
+        )
+        self.assertEqual(
+            self._ranges(filter), [(self._day("2024-05-09"), self._day("2024-05-13"))]
+        )
+
+    def test_adjacent_dates_merged(self):
+        # 05-09..05-11 and 05-12..05-14 leave no gap
+        filter = self.utils.define_raw_data_filters(["2024-05-10", "2024-05-13"])
+        self.assertEqual(
+            self._ranges(filter), [(self._day("2024-05-09"), self._day("2024-05-15"))]
+        )
+
+    def test_disjoint_dates(self):
+        filter = self.utils.define_raw_data_filters(["2024-05-20", "2024-05-10"])
+        self.assertEqual(
+            self._ranges(filter),
+            [
+                (self._day("2024-05-09"), self._day("2024-05-12")),
+                (self._day("2024-05-19"), self._day("2024-05-22")),
+            ],
+        )
+
+    def test_timestamp_dates(self):
+        timestamp = datetime(2024, 5, 10, 15, 30, tzinfo=timezone.utc).timestamp()
+        filter = self.utils.define_raw_data_filters([timestamp, "2024-05-10"])
+        self.assertEqual(
+            self._ranges(filter), [(self._day("2024-05-09"), self._day("2024-05-12"))]
+        )
+
+    def test_cutoff_applied(self):
+        today = datetime.now(tz=timezone.utc)
+        tomorrow = (today + timedelta(days=1)).strftime("%Y-%m-%d")
+        far_future = (today + timedelta(days=30)).strftime("%Y-%m-%d")
+
+        filter = self.utils.define_raw_data_filters([tomorrow, far_future])
+
+        ranges = self._ranges(filter)
+        # the far future interval is dropped, the other one ends at the cutoff
+        self.assertEqual(len(ranges), 1)
+        self.assertEqual(ranges[0][1], filter.must[0].range.lte)
+        self.assertLess(ranges[0][1], today.timestamp())
+
+    def test_integer_format(self):
+        utils = QdrantEngineUtils(
+            metadata_date_key="date",
+            metadata_date_format=DataType.INTEGER,
+            date_margin=0,
+        )
+        filter = utils.define_raw_data_filters(["2024-05-10"])
+
+        self.assertEqual(
+            self._ranges(filter),
+            [(int(self._day("2024-05-10")), int(self._day("2024-05-11")))],
+        )
+
+    def test_no_dates(self):
+        filter = self.utils.define_raw_data_filters([])
+
+        self.assertIsNone(filter.should)
+        self.assertEqual(len(filter.must), 1)
+
+    def test_many_dates_single_interval(self):
+        start = datetime(2024, 1, 1)
+        dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(100)]
+
+        filter = QdrantEngineUtils(
+            metadata_date_key="date",
+            metadata_date_format=DataType.FLOAT,
+            date_margin=7,
+        ).define_raw_data_filters(dates)
+
+        self.assertEqual(len(filter.should), 1)
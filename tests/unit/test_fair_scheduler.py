@@ -0,0 +1,157 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from utils.fair_scheduler import FairScheduler, get_scheduler
+
+
+class TestFairScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.started: list[str] = []
+        self.gate = threading.Event()
+
+    def _job(self, name: str) -> str:
+        self.started.append(name)
+        self.gate.wait(timeout=5)
+        return name
+
+    def test_result_returned(self):
+        scheduler = FairScheduler(max_workers=2, per_community_limit=1)
+        future = scheduler.submit("community1", lambda x, y: x + y, 1, y=2)
+
+        self.assertEqual(future.result(timeout=5), 3)
+        scheduler.shutdown()
+
+    def test_exception_propagated(self):
+        scheduler = FairScheduler(max_workers=1, per_community_limit=1)
+
+        def failing():
+            raise ValueError("failed")
+
+        future = scheduler.submit("community1", failing)
+        with self.assertRaises(ValueError):
+            future.result(timeout=5)
+        scheduler.shutdown()
+
+    def test_round_robin_across_communities(self):
+        """
+        a burst of one community shouldn't delay the others
+        """
+        scheduler = FairScheduler(max_workers=1, per_community_limit=1)
+        # keeping the single worker busy while queueing
+        blocker = threading.Event()
+        scheduler.submit("blocker", blocker.wait, 5)
+
+        futures = [
+            scheduler.submit("community1", self._job, f"c1-{i}") for i in range(3)
+        ]
+        futures.append(scheduler.submit("community2", self._job, "c2-0"))
+        self.gate.set()
+        blocker.set()
+
+        for future in futures:
+            future.result(timeout=5)
+        scheduler.shutdown()
+
+        self.assertEqual(self.started, ["c1-0", "c2-0", "c1-1", "c1-2"])
+
+    def test_weighted_round_robin(self):
+        scheduler = FairScheduler(
+            max_workers=1, per_community_limit=1, weights={"community1": 2}
+        )
+        blocker = threading.Event()
+        scheduler.submit("blocker", blocker.wait, 5)
+
+        futures = [
+            scheduler.submit("community1", self._job, f"c1-{i}") for i in range(4)
+        ]
+        futures += [
+            scheduler.submit("community2", self._job, f"c2-{i}") for i in range(2)
+        ]
+        self.gate.set()
+        blocker.set()
+
+        for future in futures:
+            future.result(timeout=5)
+        scheduler.shutdown()
+
+        self.assertEqual(
+            self.started, ["c1-0", "c1-1", "c2-0", "c1-2", "c1-3", "c2-1"]
+        )
+
+    def test_per_community_limit(self):
+        scheduler = FairScheduler(max_workers=2, per_community_limit=1)
+        blocker = threading.Event()
+        scheduler.submit("blocker", blocker.wait, 5)
+
+        futures = [
+            scheduler.submit("community1", self._job, f"c1-{i}") for i in range(3)
+        ]
+        futures.append(scheduler.submit("community2", self._job, "c2-0"))
+
+        # community1 is at its limit while community2 has queued work
+        stats = scheduler.stats()
+        self.assertEqual(stats["community1"]["running"], 1)
+        self.assertEqual(stats["community1"]["queue_depth"], 2)
+        self.assertEqual(stats["community2"]["queue_depth"], 1)
+
+        self.gate.set()
+        blocker.set()
+        for future in futures:
+            future.result(timeout=5)
+        scheduler.shutdown()
+
+        self.assertLess(self.started.index("c2-0"), self.started.index("c1-2"))
+        stats = scheduler.stats()["community1"]
+        self.assertEqual(stats["running"], 0)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["dispatched"], 3)
+        self.assertGreaterEqual(stats["max_wait_seconds"], stats["avg_wait_seconds"])
+
+    def test_work_conserving_burst(self):
+        """
+        a burst of one community takes all the workers,
+        a later community is served on the next free worker
+        """
+        scheduler = FairScheduler(max_workers=4, per_community_limit=2)
+        releases = {f"c1-{i}": threading.Event() for i in range(32)}
+        started = threading.Event()
+
+        def job(name: str) -> str:
+            self.started.append(name)
+            if name == "c2-0":
+                started.set()
+            else:
+                releases[name].wait(timeout=5)
+            return name
+
+        futures = [scheduler.submit("community1", job, name) for name in releases]
+        self.assertEqual(scheduler.stats()["community1"]["running"], 4)
+        self.assertEqual(scheduler.queued(), 28)
+
+        futures.append(scheduler.submit("community2", job, "c2-0"))
+        releases["c1-0"].set()
+        self.assertTrue(started.wait(timeout=5))
+        self.assertEqual(self.started[4], "c2-0")
+
+        for release in releases.values():
+            release.set()
+        for future in futures:
+            future.result(timeout=5)
+        scheduler.shutdown()
+
+        self.assertEqual(scheduler.queued(), 0)
+        self.assertEqual(len(self.started), 33)
+
+    def test_get_scheduler_shared(self):
+        get_scheduler.cache_clear()
+        self.addCleanup(get_scheduler.cache_clear)
+        with patch.dict(
+            "os.environ", {"AMQP_MAX_WORKERS": "3", "AMQP_COMMUNITY_MAX_WORKERS": "1"}
+        ):
+            scheduler = get_scheduler()
+        self.addCleanup(scheduler.shutdown)
+
+        self.assertIs(get_scheduler(), scheduler)
+        self.assertEqual(scheduler.max_workers, 3)
+        self.assertEqual(scheduler.per_community_limit, 1)
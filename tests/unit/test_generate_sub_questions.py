@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import MagicMock
+
+from llama_index.core import QueryBundle
+from llama_index.core.question_gen.types import SubQuestion
+from llama_index.core.tools.types import ToolMetadata
+from utils.query_engine.subquestion_engine import generate_sub_questions
+
+
+class TestGenerateSubQuestions(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tools = [
+            ToolMetadata(name="Discord", description="discord messages"),
+            ToolMetadata(name="Telegram", description="telegram messages"),
+        ]
+        self.query = QueryBundle(query_str="what happened last week?")
+
+    def test_generated_sub_questions(self):
+        generated = [SubQuestion(sub_question="discord question", tool_name="Discord")]
+        question_gen = MagicMock()
+        question_gen.generate.return_value = generated
+
+        sub_questions = generate_sub_questions(question_gen, self.tools, self.query)
+
+        self.assertEqual(sub_questions, generated)
+        question_gen.generate.assert_called_once_with(self.tools, self.query)
+
+    def test_generation_failed(self):
+        question_gen = MagicMock()
+        question_gen.generate.side_effect = ValueError("could not parse")
+
+        sub_questions = generate_sub_questions(question_gen, self.tools, self.query)
+
+        self.assertEqual(
+            [(sub_q.tool_name, sub_q.sub_question) for sub_q in sub_questions],
+            [
+                ("Discord", "what happened last week?"),
+                ("Telegram", "what happened last week?"),
+            ],
+        )
+
+    def test_nothing_generated(self):
+        question_gen = MagicMock()
+        question_gen.generate.return_value = []
+
+        sub_questions = generate_sub_questions(question_gen, self.tools, self.query)
+
+        self.assertEqual([sub_q.tool_name for sub_q in sub_questions], ["Discord", "Telegram"])
@@ -0,0 +1,198 @@
+import unittest
+import uuid
+from unittest.mock import AsyncMock, patch
+
+from schema.workflow import (
+    AnswerEvaluation,
+    EvaluationRequest,
+    PersistRequest,
+    RetrievalPlan,
+    SubQuestionResult,
+    SubQuestionTask,
+    SynthesisRequest,
+)
+from tc_temporal_backend.schema.hivemind import HivemindQueryPayload
+from temporal_tasks import HivemindWorkflow, hivemind_activity
+from temporalio import activity
+from temporalio.exceptions import ApplicationError
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import UnsandboxedWorkflowRunner, Worker
+
+
+class TestHivemindWorkflow(unittest.IsolatedAsyncioTestCase):
+    """
+    the workflow's orchestration with the activities mocked
+    """
+
+    async def asyncSetUp(self) -> None:
+        try:
+            self.env = await WorkflowEnvironment.start_time_skipping()
+        except RuntimeError as exp:
+            # the test server is downloaded on its first use
+            raise unittest.SkipTest(f"Temporal test server unavailable: {exp}")
+
+        self.route = "rag"
+        self.persisted: list[PersistRequest] = []
+        self.synthesized: list[SynthesisRequest] = []
+        self.evaluated: list[EvaluationRequest] = []
+
+    async def asyncTearDown(self) -> None:
+        await self.env.shutdown()
+
+    def _activities(self) -> list:
+        @activity.defn(name="select_task_queue_activity")
+        async def select_task_queue_activity(enable_answer_skipping: bool) -> None:
+            return None
+
+        @activity.defn(name="route_activity")
+        async def route_activity(query: str) -> str:
+            return self.route
+
+        @activity.defn(name="select_data_sources_activity")
+        async def select_data_sources_activity(community_id: str) -> dict[str, str]:
+            return {"discord": "discord_id", "notion": "notion_id"}
+
+        @activity.defn(name="plan_activity")
+        async def plan_activity(
+            community_id: str,
+            query: str,
+            enable_answer_skipping: bool,
+            data_sources: dict[str, str],
+        ) -> RetrievalPlan:
+            return RetrievalPlan(
+                sub_questions=[
+                    SubQuestionTask(
+                        community_id=community_id,
+                        query=query,
+                        enable_answer_skipping=enable_answer_skipping,
+                        platform=platform,
+                        platform_id=platform_id,
+                        tool_name=platform,
+                        sub_question=f"{platform} question",
+                    )
+                    for platform, platform_id in data_sources.items()
+                ]
+            )
+
+        @activity.defn(name="retrieve_activity")
+        async def retrieve_activity(task: SubQuestionTask) -> SubQuestionResult:
+            if task.platform == "notion":
+                raise ApplicationError("no data", non_retryable=True)
+            return SubQuestionResult(
+                tool_name=task.tool_name,
+                sub_question=task.sub_question,
+                answer=f"{task.platform} answer",
+            )
+
+        @activity.defn(name="synthesize_activity")
+        async def synthesize_activity(request: SynthesisRequest) -> str:
+            self.synthesized.append(request)
+            return "rag answer"
+
+        @activity.defn(name="general_answer_activity")
+        async def general_answer_activity(query: str) -> str | None:
+            return "general answer"
+
+        @activity.defn(name="evaluate_activity")
+        async def evaluate_activity(request: EvaluationRequest) -> AnswerEvaluation:
+            self.evaluated.append(request)
+            return AnswerEvaluation(metadata={"evaluated": True}, coverage_score=5)
+
+        @activity.defn(name="persist_activity")
+        async def persist_activity(request: PersistRequest) -> None:
+            self.persisted.append(request)
+
+        return [
+            select_task_queue_activity,
+            route_activity,
+            select_data_sources_activity,
+            plan_activity,
+            retrieve_activity,
+            synthesize_activity,
+            general_answer_activity,
+            evaluate_activity,
+            persist_activity,
+        ]
+
+    async def _run(self) -> str | None:
+        task_queue = f"test-{uuid.uuid4()}"
+        async with Worker(
+            self.env.client,
+            task_queue=task_queue,
+            workflows=[HivemindWorkflow],
+            activities=self._activities(),
+            workflow_runner=UnsandboxedWorkflowRunner(),
+        ):
+            return await self.env.client.execute_workflow(
+                HivemindWorkflow.run,
+                HivemindQueryPayload(community_id="community", query="question"),
+                id=f"workflow-{uuid.uuid4()}",
+                task_queue=task_queue,
+            )
+
+    async def test_rag_route(self):
+        result = await self._run()
+
+        self.assertTrue(result.startswith("rag answer"))
+        self.assertEqual(len(self.persisted), 1)
+        self.assertEqual(self.persisted[0].metadata, {"evaluated": True})
+        self.assertTrue(self.evaluated[0].retrieval_used)
+
+    async def test_general_route(self):
+        self.route = "general"
+
+        result = await self._run()
+
+        self.assertTrue(result.startswith("general answer"))
+        self.assertEqual(self.synthesized, [])
+        self.assertFalse(self.evaluated[0].retrieval_used)
+        self.assertEqual(self.persisted[0].response, "general answer")
+
+    async def test_failed_retrieval_left_out(self):
+        await self._run()
+
+        # the notion retrieval failed, the answer is made of discord's only
+        results = self.synthesized[0].results
+        self.assertEqual([result.tool_name for result in results], ["discord"])
+        self.assertEqual(
+            [result.tool_name for result in self.evaluated[0].results], ["discord"]
+        )
+
+
+class TestHivemindActivity(unittest.IsolatedAsyncioTestCase):
+    """
+    the single activity kept for the workflows started before the fine-grained ones
+    """
+
+    @patch("temporal_tasks.persist_activity", new_callable=AsyncMock)
+    @patch("temporal_tasks.evaluate_answer", new_callable=AsyncMock)
+    @patch("temporal_tasks.general_llm_answer", new_callable=AsyncMock)
+    @patch("temporal_tasks.route_question", new_callable=AsyncMock)
+    async def test_general_route(self, route, general_llm, evaluate, persist):
+        route.return_value = "general"
+        general_llm.return_value = "general answer"
+        evaluate.return_value = AnswerEvaluation(metadata={}, coverage_score=5)
+
+        response, references = await hivemind_activity(
+            HivemindQueryPayload(community_id="community", query="question")
+        )
+
+        self.assertEqual(response, "general answer")
+        self.assertEqual(references, [])
+        self.assertFalse(evaluate.call_args.args[0].retrieval_used)
+        self.assertEqual(persist.call_args.args[0].response, "general answer")
+
+    @patch("temporal_tasks.persist_activity", new_callable=AsyncMock)
+    @patch("temporal_tasks.evaluate_answer", new_callable=AsyncMock)
+    @patch("temporal_tasks.query_data_sources")
+    async def test_low_coverage_skipped(self, query_data_sources, evaluate, _):
+        query_data_sources.return_value = ("answer", [], {})
+        evaluate.return_value = AnswerEvaluation(metadata={}, coverage_score=1)
+
+        result = await hivemind_activity(
+            HivemindQueryPayload(
+                community_id="community", query="question", enable_answer_skipping=True
+            )
+        )
+
+        self.assertEqual(result, (None, []))
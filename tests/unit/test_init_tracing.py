@@ -0,0 +1,32 @@
+import os
+import unittest
+from unittest.mock import patch
+
+import utils.traceloop
+from utils.traceloop import init_tracing
+
+
+class TestInitTracing(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.traceloop._initialized_pid = None
+
+    @patch.dict(os.environ, {"TRACELOOP_BASE_URL": "some_url"})
+    @patch("utils.traceloop.Traceloop.init")
+    def test_initialized_once_per_process(self, mock_init):
+        init_tracing()
+        init_tracing()
+        init_tracing()
+
+        mock_init.assert_called_once()
+
+    @patch.dict(
+        os.environ, {"TRACELOOP_BASE_URL": "some_url", "TRACELOOP_SAMPLING_RATE": "0.1"}
+    )
+    @patch("utils.traceloop.Traceloop.init")
+    def test_sampling_rate(self, mock_init):
+        os.environ.pop("OTEL_TRACES_SAMPLER", None)
+        init_tracing()
+
+        self.assertEqual(os.environ["OTEL_TRACES_SAMPLER"], "parentbased_traceidratio")
+        self.assertEqual(os.environ["OTEL_TRACES_SAMPLER_ARG"], "0.1")
+        mock_init.assert_called_once()
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from tc_hivemind_backend.db.utils import preprocess_text
+from utils.model_cache import CachedPreprocessor, get_spacy_pipeline
+
+
+class TestCachedPreprocessor(unittest.TestCase):
+    def setUp(self) -> None:
+        get_spacy_pipeline.cache_clear()
+        self.addCleanup(get_spacy_pipeline.cache_clear)
+
+    def _token(self, lemma: str, **flags) -> MagicMock:
+        token = MagicMock(lemma_=lemma, is_ascii=True)
+        for flag in ["is_punct", "is_space", "is_stop", "like_url", "like_num"]:
+            setattr(token, flag, flags.get(flag, False))
+        return token
+
+    def test_pipeline_loaded_once(self):
+        pipeline = MagicMock(return_value=[])
+        with patch("utils.model_cache.spacy.load", return_value=pipeline) as load:
+            for _ in range(3):
+                self.assertEqual(
+                    CachedPreprocessor().extract_main_content(text="hi"), ""
+                )
+
+        load.assert_called_once_with("en_core_web_sm")
+        self.assertEqual(pipeline.call_count, 3)
+
+    def test_main_content_extracted(self):
+        pipeline = MagicMock(
+            return_value=[
+                self._token("run"),
+                self._token(",", is_punct=True),
+                self._token("the", is_stop=True),
+                self._token("2", like_num=True),
+                self._token("https://x.com", like_url=True),
+                self._token("test"),
+            ]
+        )
+        with patch("utils.model_cache.spacy.load", return_value=pipeline):
+            cleaned = CachedPreprocessor().extract_main_content(text="text")
+
+        self.assertEqual(cleaned, "run test")
+
+    def test_library_module_untouched(self):
+        spacy_module = preprocess_text.spacy
+        with patch("utils.model_cache.spacy.load", return_value=MagicMock()):
+            CachedPreprocessor().extract_main_content(text="text")
+
+        self.assertIs(preprocess_text.spacy, spacy_module)
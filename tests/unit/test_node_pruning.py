@@ -0,0 +1,138 @@
+import unittest
+from unittest.mock import MagicMock
+
+from llama_index.core import MockEmbedding, VectorStoreIndex
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from utils.query_engine.combined_qdrant_retriever import CombinedQdrantRetriever
+from utils.query_engine.dual_qdrant_retrieval_engine import DualQdrantRetrievalEngine
+from utils.query_engine.node_pruning import (
+    dedupe_nodes,
+    drop_near_duplicates,
+    mmr_select,
+    prune_nodes,
+    simhash_fingerprints,
+)
+
+
+def scored_node(
+    text: str,
+    score: float = 1.0,
+    node_id: str | None = None,
+    embedding: list[float] | None = None,
+) -> NodeWithScore:
+    node = TextNode(text=text, embedding=embedding)
+    if node_id is not None:
+        node.id_ = node_id
+    return NodeWithScore(node=node, score=score)
+
+
+MESSAGE = (
+    "the release of the new staking contract is planned for next week "
+    "after the audit is finished and the community call is held on friday"
+)
+
+
+class TestNodePruning(unittest.TestCase):
+    def test_dedupe_nodes(self):
+        nodes = [
+            scored_node("a", 0.9, node_id="1"),
+            scored_node("b", 0.8, node_id="2"),
+            scored_node("a", 0.7, node_id="1"),
+        ]
+        self.assertEqual(
+            [(node.node.node_id, node.score) for node in dedupe_nodes(nodes)],
+            [("1", 0.9), ("2", 0.8)],
+        )
+
+    def test_simhash_fingerprints(self):
+        fingerprints = simhash_fingerprints(
+            [MESSAGE, MESSAGE.upper() + "!", "something else entirely different"]
+        )
+        self.assertEqual(fingerprints.shape, (3,))
+        # the case and punctuation are ignored
+        self.assertEqual(fingerprints[0], fingerprints[1])
+        self.assertNotEqual(fingerprints[0], fingerprints[2])
+
+    def test_drop_near_duplicates(self):
+        nodes = [
+            scored_node(MESSAGE, 0.9),
+            scored_node("gm everyone, how is the governance vote going so far?", 0.8),
+            scored_node(MESSAGE + " again", 0.7),
+            scored_node(MESSAGE, 0.6),
+        ]
+        pruned = drop_near_duplicates(nodes, max_distance=10)
+        self.assertEqual([node.score for node in pruned], [0.9, 0.8])
+
+    def test_drop_near_duplicates_keeps_distinct(self):
+        nodes = [scored_node(f"message number {i} about topic {i * 7}") for i in range(5)]
+        self.assertEqual(len(drop_near_duplicates(nodes, max_distance=0)), 5)
+
+    def test_mmr_select(self):
+        nodes = [
+            scored_node("a", 0.90, embedding=[1.0, 0.0]),
+            scored_node("b", 0.89, embedding=[0.99, 0.01]),
+            scored_node("c", 0.70, embedding=[0.0, 1.0]),
+        ]
+        selected = mmr_select(nodes, top_k=2, mmr_lambda=0.5)
+        # the second most relevant is a duplicate of the first one
+        self.assertEqual([node.node.get_content() for node in selected], ["a", "c"])
+
+    def test_mmr_select_without_embeddings(self):
+        nodes = [scored_node(text) for text in "abc"]
+        self.assertEqual(mmr_select(nodes, top_k=2), nodes)
+
+    def test_prune_nodes_disabled(self):
+        nodes = [scored_node(MESSAGE, 0.9), scored_node(MESSAGE, 0.8)]
+        self.assertEqual(len(prune_nodes(nodes, near_duplicates=False)), 2)
+        self.assertEqual(len(prune_nodes(nodes)), 1)
+
+
+class TestPruningWithinEngine(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = QdrantClient(":memory:")
+        self.index = VectorStoreIndex.from_vector_store(
+            QdrantVectorStore(client=self.client, collection_name="community_platform"),
+            embed_model=MockEmbedding(embed_dim=8),
+        )
+        self.index.insert_nodes(
+            [
+                TextNode(text=MESSAGE),
+                # a quoted repost
+                TextNode(text=f"> {MESSAGE}"),
+                TextNode(text="other"),
+            ]
+        )
+
+    def test_fetch_vectors(self):
+        retriever = CombinedQdrantRetriever(
+            raw_index=self.index, raw_top_k=5, fetch_vectors=True
+        )
+        nodes = retriever.retrieve("question")
+        self.assertEqual(len(nodes), 3)
+        self.assertTrue(all(len(node.node.embedding) == 8 for node in nodes))
+
+        retriever.fetch_vectors = False
+        self.assertTrue(
+            all(node.node.embedding is None for node in retriever.retrieve("question"))
+        )
+
+    def test_pruned_before_reranking(self):
+        cross_encoder = MagicMock()
+        cross_encoder.predict.side_effect = lambda pairs: [1.0] * len(pairs)
+        engine = DualQdrantRetrievalEngine.construct(
+            retriever=CombinedQdrantRetriever(raw_index=self.index, raw_top_k=5),
+            response_synthesizer=MagicMock(),
+            llm=MagicMock(),
+            qa_prompt=MagicMock(),
+            enable_reranking=True,
+            cross_encoder=cross_encoder,
+            near_duplicate_pruning=True,
+            mmr_top_k=None,
+        )
+        nodes = engine._rerank_nodes("question", engine.retriever.retrieve("question"))
+
+        self.assertEqual(len(nodes), 2)
+        (pairs,), _ = cross_encoder.predict.call_args
+        self.assertEqual(len(pairs), 2)
@@ -0,0 +1,43 @@
+import unittest
+
+from bot.agent.tools.rag import from_reference, to_reference
+from llama_index.core.schema import NodeWithScore, TextNode
+
+
+class TestNodeReference(unittest.TestCase):
+    def setUp(self) -> None:
+        self.node = NodeWithScore(
+            node=TextNode(
+                id_="node1",
+                text="a" * 600,
+                metadata={"url": "https://discord.com/1", "author_id": "user1"},
+            ),
+            score=0.75,
+        )
+
+    def test_to_reference(self):
+        reference = to_reference(self.node, snippet_chars=100)
+
+        self.assertEqual(reference.node_id, "node1")
+        self.assertEqual(reference.score, 0.75)
+        self.assertEqual(reference.url, "https://discord.com/1")
+        self.assertEqual(reference.snippet, "a" * 100 + "...")
+
+    def test_to_reference_short_text(self):
+        node = NodeWithScore(node=TextNode(id_="node2", text="short"), score=0.5)
+        reference = to_reference(node)
+
+        self.assertIsNone(reference.url)
+        self.assertEqual(reference.snippet, "short")
+
+    def test_to_reference_no_snippet(self):
+        reference = to_reference(self.node, snippet_chars=None)
+        self.assertIsNone(reference.snippet)
+
+    def test_from_reference(self):
+        node = from_reference(to_reference(self.node, snippet_chars=10))
+
+        self.assertEqual(node.node.node_id, "node1")
+        self.assertEqual(node.score, 0.75)
+        self.assertEqual(node.node.get_content(), "a" * 10 + "...")
+        self.assertEqual(node.metadata, {"url": "https://discord.com/1"})
@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from qdrant_client.http import models
+from schema.type import DataType
+from utils import qdrant_utils
+from utils.qdrant_utils import QDrantUtils, ensure_collection_indexes
+
+
+class TestPayloadIndexes(unittest.TestCase):
+    def setUp(self) -> None:
+        qdrant_utils._indexed_collections.clear()
+        self.addCleanup(qdrant_utils._indexed_collections.clear)
+
+        self.client = MagicMock()
+        self.payload_schema: dict = {}
+        self.client.get_collection.return_value.payload_schema = self.payload_schema
+
+    def test_missing_indexes_created(self):
+        created = ensure_collection_indexes(
+            self.client,
+            "community_discord",
+            {"date": models.PayloadSchemaType.FLOAT},
+        )
+
+        self.assertEqual(created, ["date"])
+        self.client.create_payload_index.assert_called_once_with(
+            collection_name="community_discord",
+            field_name="date",
+            field_schema=models.PayloadSchemaType.FLOAT,
+            wait=False,
+        )
+
+    def test_available_indexes_kept(self):
+        self.payload_schema["date"] = models.PayloadIndexInfo(
+            data_type=models.PayloadSchemaType.FLOAT, points=10
+        )
+        created = ensure_collection_indexes(
+            self.client,
+            "community_discord",
+            {
+                "date": models.PayloadSchemaType.FLOAT,
+                "type": models.PayloadSchemaType.KEYWORD,
+            },
+        )
+
+        self.assertEqual(created, ["type"])
+        self.client.create_payload_index.assert_called_once()
+
+    def test_checked_once_per_process(self):
+        fields = {"date": models.PayloadSchemaType.FLOAT}
+        ensure_collection_indexes(self.client, "community_discord", fields)
+        created = ensure_collection_indexes(self.client, "community_discord", fields)
+
+        self.assertEqual(created, [])
+        self.client.get_collection.assert_called_once()
+
+    def test_missing_collection(self):
+        self.client.get_collection.side_effect = ValueError("not found")
+        fields = {"date": models.PayloadSchemaType.FLOAT}
+
+        self.assertEqual(
+            ensure_collection_indexes(self.client, "community_discord", fields), []
+        )
+        self.client.create_payload_index.assert_not_called()
+        # checked again once the collection might be available
+        ensure_collection_indexes(self.client, "community_discord", fields)
+        self.assertEqual(self.client.get_collection.call_count, 2)
+
+    def test_platform_collections(self):
+        with patch("utils.qdrant_utils.QdrantSingleton") as singleton:
+            singleton.get_instance.return_value.get_client.return_value = self.client
+            created = QDrantUtils("community").ensure_payload_indexes(
+                platform_id="platform",
+                metadata_date_key="createdAt",
+                metadata_date_format=DataType.INTEGER,
+                with_summary=True,
+            )
+
+        self.assertEqual(
+            created,
+            {"community_platform": ["createdAt"], "community_platform_summary": ["type"]},
+        )
+        field_schemas = {
+            call.kwargs["field_name"]: call.kwargs["field_schema"]
+            for call in self.client.create_payload_index.call_args_list
+        }
+        self.assertEqual(
+            field_schemas,
+            {
+                "createdAt": models.PayloadSchemaType.INTEGER,
+                "type": models.PayloadSchemaType.KEYWORD,
+            },
+        )
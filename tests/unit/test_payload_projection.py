@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+
+from llama_index.core import MockEmbedding, VectorStoreIndex
+from llama_index.core.schema import TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from schema.type import DataType
+from utils.query_engine.combined_qdrant_retriever import (
+    CombinedQdrantRetriever,
+    projected_points_to_nodes,
+)
+
+
+class TestPayloadProjection(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = QdrantClient(":memory:")
+        vector_store = QdrantVectorStore(client=self.client, collection_name="raw")
+        self.index = VectorStoreIndex.from_vector_store(
+            vector_store, embed_model=MockEmbedding(embed_dim=8)
+        )
+        self.node = TextNode(
+            id_="9f2c1d4e-5b6a-4c3d-8e7f-0a1b2c3d4e5f",
+            text="the release is planned for june",
+            metadata={
+                "createdAt": 1717200000.0,
+                "url": "https://example.com/1",
+                "author": "user1",
+                "mentions": ["user2", "user3"],
+                "reactions": ["user4"],
+            },
+        )
+        self.index.insert_nodes([self.node])
+
+    def _retriever(self, payload_projection: bool) -> CombinedQdrantRetriever:
+        return CombinedQdrantRetriever(
+            raw_index=self.index,
+            raw_top_k=5,
+            metadata_date_key="createdAt",
+            metadata_date_format=DataType.FLOAT,
+            payload_projection=payload_projection,
+        )
+
+    def test_projected_nodes(self):
+        with patch.object(self.client, "search", wraps=self.client.search) as search:
+            nodes = self._retriever(payload_projection=True).retrieve("release")
+
+        self.assertEqual(len(nodes), 1)
+        node = nodes[0].node
+        self.assertEqual(node.node_id, "9f2c1d4e-5b6a-4c3d-8e7f-0a1b2c3d4e5f")
+        self.assertEqual(node.get_content(), self.node.text)
+        self.assertEqual(
+            node.metadata,
+            {
+                "createdAt": 1717200000.0,
+                "url": "https://example.com/1",
+                "author": "user1",
+            },
+        )
+
+        kwargs = search.call_args.kwargs
+        self.assertFalse(kwargs["with_vectors"])
+        self.assertIsInstance(kwargs["with_payload"], models.PayloadSelectorInclude)
+
+    def test_full_payload_without_projection(self):
+        nodes = self._retriever(payload_projection=False).retrieve("release")
+
+        self.assertEqual(nodes[0].node.metadata, self.node.metadata)
+        self.assertEqual(nodes[0].node.get_content(), self.node.text)
+
+    def test_top_level_text_payload(self):
+        point = models.ScoredPoint(
+            id=1,
+            version=0,
+            score=0.5,
+            payload={"text": "message", "url": "https://example.com/2", "extra": 1},
+        )
+        nodes = projected_points_to_nodes([point], ["url", "date"])
+
+        self.assertEqual(nodes[0].node.get_content(), "message")
+        self.assertEqual(nodes[0].node.metadata, {"url": "https://example.com/2"})
+        self.assertEqual(nodes[0].score, 0.5)
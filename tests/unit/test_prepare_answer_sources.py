@@ -3,6 +3,7 @@ import unittest
 from llama_index.core.query_engine import SubQuestionAnswerPair
 from llama_index.core.question_gen.types import SubQuestion
 from llama_index.core.schema import NodeWithScore, TextNode
+from schema.workflow import NodeReference
 from utils.query_engine.prepare_answer_sources import PrepareAnswerSources
 
 
@@ -293,3 +294,22 @@ class TestPrepareAnswerSources(unittest.TestCase):
             "[2] https://github.com/repo3"  # Second highest (0.85)
         )
         self.assertEqual(result, expected)
+
+    def test_reference_sources(self):
+        references = [
+            NodeReference(node_id="1", score=0.8, url="https://github.com/repo1"),
+            NodeReference(node_id="2", score=0.9, url="https://github.com/repo2"),
+            NodeReference(node_id="3", score=0.95, url="https://github.com/repo2"),
+            NodeReference(node_id="4", score=0.6, url="https://github.com/repo4"),
+            NodeReference(node_id="5", score=0.99, url=None),
+        ]
+        result = self.prepare.prepare_reference_sources(references)
+        expected = (
+            "Top References:\n"
+            "[1] https://github.com/repo2\n"
+            "[2] https://github.com/repo1"
+        )
+        self.assertEqual(result, expected)
+
+    def test_reference_sources_empty(self):
+        self.assertEqual(self.prepare.prepare_reference_sources([]), "")
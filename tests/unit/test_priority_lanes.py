@@ -0,0 +1,34 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from routers.http import RequestPayload, ask
+from schema import QuestionModel
+from worker.celery import BACKGROUND_QUEUE, INTERACTIVE_QUEUE, select_queue
+
+
+class TestPriorityLanes(unittest.IsolatedAsyncioTestCase):
+    def test_select_queue(self):
+        self.assertEqual(select_queue(enable_answer_skipping=True), BACKGROUND_QUEUE)
+        self.assertEqual(select_queue(enable_answer_skipping=False), INTERACTIVE_QUEUE)
+
+    @patch("routers.http.PersistPayload")
+    @patch("routers.http.ask_question_auto_search")
+    async def test_ask_routed_by_answer_skipping(self, task, _):
+        task.apply_async.return_value = MagicMock(id="task_id")
+
+        for enable_answer_skipping, queue in [
+            (False, INTERACTIVE_QUEUE),
+            (True, BACKGROUND_QUEUE),
+        ]:
+            await ask(
+                RequestPayload(
+                    question=QuestionModel(message="question"),
+                    enable_answer_skipping=enable_answer_skipping,
+                ),
+                community_id="community",
+            )
+            _, kwargs = task.apply_async.call_args
+            self.assertEqual(kwargs["queue"], queue)
+            self.assertEqual(
+                kwargs["kwargs"]["enable_answer_skipping"], enable_answer_skipping
+            )
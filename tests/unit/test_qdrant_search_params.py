@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import patch
+
+from llama_index.core import MockEmbedding, VectorStoreIndex
+from llama_index.core.schema import TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from utils.globals import QUANTIZATION_OVERSAMPLING
+from utils.qdrant_utils import load_search_params
+from utils.query_engine.batch_qdrant_retrieval import batch_search
+from utils.query_engine.combined_qdrant_retriever import CombinedQdrantRetriever
+
+SEARCH_PARAMS_CONFIG = (
+    '{"discord": {"hnsw_ef": 128, "quantization": {"rescore": true, '
+    '"oversampling": 2.0}}, "discord_summary": {"exact": true}}'
+)
+
+
+class TestLoadSearchParams(unittest.TestCase):
+    default_params = models.SearchParams(
+        quantization=models.QuantizationSearchParams(
+            rescore=True, oversampling=QUANTIZATION_OVERSAMPLING
+        )
+    )
+
+    def test_platform_params(self):
+        with patch.dict("os.environ", {"QDRANT_SEARCH_PARAMS": SEARCH_PARAMS_CONFIG}):
+            params = load_search_params("discord")
+            summary_params = load_search_params("discord", summary=True)
+            missing = load_search_params("telegram")
+
+        self.assertEqual(params.hnsw_ef, 128)
+        self.assertTrue(params.quantization.rescore)
+        self.assertEqual(params.quantization.oversampling, 2.0)
+        self.assertTrue(summary_params.exact)
+        # the quantized collections are still re-scored
+        self.assertTrue(summary_params.quantization.rescore)
+        self.assertEqual(missing, self.default_params)
+
+    def test_not_configured(self):
+        with patch.dict("os.environ", {"QDRANT_SEARCH_PARAMS": ""}):
+            self.assertEqual(load_search_params("discord"), self.default_params)
+        self.assertEqual(load_search_params(None), self.default_params)
+
+    def test_invalid_config(self):
+        with patch.dict("os.environ", {"QDRANT_SEARCH_PARAMS": "{not json"}):
+            self.assertEqual(load_search_params("discord"), self.default_params)
+
+
+class TestRetrieverSearchParams(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = QdrantClient(":memory:")
+        self.raw_index = self._create_index("raw")
+        self.summary_index = self._create_index("raw_summary")
+        self.params = models.SearchParams(hnsw_ef=64)
+        self.summary_params = models.SearchParams(exact=True)
+        self.retriever = CombinedQdrantRetriever(
+            raw_index=self.raw_index,
+            raw_top_k=5,
+            summary_index=self.summary_index,
+            summary_top_k=5,
+            search_params=self.params,
+            summary_search_params=self.summary_params,
+        )
+
+    def _create_index(self, collection_name: str) -> VectorStoreIndex:
+        index = VectorStoreIndex.from_vector_store(
+            QdrantVectorStore(client=self.client, collection_name=collection_name),
+            embed_model=MockEmbedding(embed_dim=8),
+        )
+        index.insert_nodes([TextNode(text=f"{collection_name} text")])
+        return index
+
+    def test_search_params_passed(self):
+        with patch.object(self.client, "search", wraps=self.client.search) as search:
+            self.retriever.retrieve("question")
+            self.retriever.retrieve_summary("question")
+
+        self.assertEqual(
+            [call.kwargs["search_params"] for call in search.call_args_list],
+            [self.params, self.summary_params],
+        )
+
+    def test_batch_search_params_passed(self):
+        embedding = [0.5] * 8
+        with patch.object(
+            self.client, "search_batch", wraps=self.client.search_batch
+        ) as search_batch:
+            batch_search(
+                [
+                    (self.retriever, self.raw_index, embedding, 5, None),
+                    (self.retriever, self.summary_index, embedding, 5, None),
+                ]
+            )
+
+        params = {
+            call.kwargs["collection_name"]: call.kwargs["requests"][0].params
+            for call in search_batch.call_args_list
+        }
+        self.assertEqual(
+            params, {"raw": self.params, "raw_summary": self.summary_params}
+        )
@@ -0,0 +1,146 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from utils.qdrant_utils import QDrantUtils
+from utils.quantize_collections import quantize
+
+
+class TestQuantizeCollections(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = QdrantClient(":memory:")
+        patcher = patch("utils.qdrant_utils.QdrantSingleton")
+        singleton = patcher.start()
+        self.addCleanup(patcher.stop)
+        singleton.get_instance.return_value.get_client.return_value = self.client
+        self.utils = QDrantUtils("community")
+
+        rng = np.random.default_rng(0)
+        for name in ["community_platform", "community_platform_summary"]:
+            self.client.create_collection(
+                name,
+                vectors_config=models.VectorParams(
+                    size=16, distance=models.Distance.COSINE
+                ),
+            )
+            self.client.upsert(
+                name,
+                points=models.Batch(
+                    ids=list(range(200)), vectors=rng.normal(size=(200, 16)).tolist()
+                ),
+            )
+        self.client.create_collection(
+            "other_platform",
+            vectors_config=models.VectorParams(
+                size=16, distance=models.Distance.COSINE
+            ),
+        )
+
+    def test_list_collections(self):
+        self.assertEqual(
+            self.utils.list_collections(),
+            ["community_platform", "community_platform_summary"],
+        )
+        self.assertEqual(
+            self.utils.list_collections(["platform"]),
+            ["community_platform", "community_platform_summary"],
+        )
+        self.assertEqual(self.utils.list_collections(["unknown"]), [])
+
+    def test_estimate_vector_memory(self):
+        float_mb = self.utils.estimate_vector_memory("community_platform")
+        self.assertAlmostEqual(float_mb, 200 * 16 * 4 / 1024**2)
+        self.assertAlmostEqual(
+            self.utils.estimate_vector_memory("community_platform", "scalar"),
+            float_mb / 4,
+        )
+        self.assertAlmostEqual(
+            self.utils.estimate_vector_memory("community_platform", "binary"),
+            float_mb / 32,
+        )
+
+    def test_quantize_collection_config(self):
+        client = MagicMock()
+        client.get_collection.return_value.config.params.vectors = {
+            "text-dense": models.VectorParams(
+                size=16, distance=models.Distance.COSINE
+            )
+        }
+        self.utils.qdrant_client = client
+        self.utils.quantize_collection("community_platform", "scalar")
+
+        kwargs = client.update_collection.call_args.kwargs
+        self.assertEqual(
+            kwargs["vectors_config"],
+            {"text-dense": models.VectorParamsDiff(on_disk=True)},
+        )
+        scalar = kwargs["quantization_config"].scalar
+        self.assertEqual(scalar.type, models.ScalarType.INT8)
+        self.assertTrue(scalar.always_ram)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            self.utils.quantize_collection("community_platform", "product")
+
+    def test_quantize_report(self):
+        report = quantize(
+            self.utils,
+            "community_platform",
+            method="binary",
+            sample_size=20,
+            top_k=10,
+            oversampling=2.0,
+        )
+
+        self.assertGreater(report["vectors_memory_mb"]["saved"], 0)
+        # the local mode searches exhaustively, so the recall is kept
+        self.assertEqual(report["before"]["recall"], 1.0)
+        self.assertEqual(report["after"]["recall"], 1.0)
+        self.assertIn("mean_ms", report["change"])
+
+    def test_query_point_excluded(self):
+        """
+        a sampled point is never counted as its own neighbor
+        """
+        query_points = self.client.query_points
+        searches = []
+
+        def recording_query_points(*args, **kwargs):
+            response = query_points(*args, **kwargs)
+            (excluded,) = kwargs["query_filter"].must_not
+            searches.append((excluded.has_id, {point.id for point in response.points}))
+            return response
+
+        with patch.object(self.client, "query_points", recording_query_points):
+            quantize(
+                self.utils,
+                "community_platform",
+                method="scalar",
+                sample_size=20,
+                top_k=10,
+                oversampling=2.0,
+                dry_run=True,
+            )
+
+        # the ground truth and the measured searches
+        self.assertEqual(len(searches), 40)
+        for (point_id,), ids in searches:
+            self.assertNotIn(point_id, ids)
+            self.assertEqual(len(ids), 10)
+
+    def test_dry_run(self):
+        with patch.object(self.utils, "quantize_collection") as quantize_collection:
+            report = quantize(
+                self.utils,
+                "community_platform",
+                method="scalar",
+                sample_size=20,
+                top_k=10,
+                oversampling=2.0,
+                dry_run=True,
+            )
+
+        quantize_collection.assert_not_called()
+        self.assertNotIn("after", report)
@@ -4,6 +4,7 @@ from unittest.mock import MagicMock, patch
 from bot.retrievers.retrieve_similar_nodes import RetrieveSimilarNodes
 from llama_index.core.schema import NodeWithScore, TextNode
 from llama_index.vector_stores.postgres import PGVectorStore
+from sqlalchemy.dialects import postgresql
 
 
 class TestRetrieveSimilarNodes(TestCase):
@@ -92,3 +93,54 @@ class TestRetrieveSimilarNodes(TestCase):
 
         # Assert that the returned results are of type NodeWithScore
         self.assertTrue(isinstance(result, NodeWithScore) for result in results)
+
+    def _compiled_where(self, filters, date_interval=0) -> tuple[str, dict]:
+        condition = self.retriever.compile_filters(filters, date_interval)
+        compiled = condition.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"render_postcompile": True}
+        )
+        return str(compiled), compiled.params
+
+    def test_compile_filters_containment(self):
+        sql, params = self._compiled_where([{"type": "thread"}])
+
+        self.assertIn("metadata_ AS JSONB) @>", sql)
+        self.assertNotIn("->>", sql)
+        self.assertIn({"type": "thread"}, params.values())
+
+    def test_compile_filters_collapsed(self):
+        sql, params = self._compiled_where(
+            [
+                {"category": "a", "topic": "x", "date": "2024-04-09"},
+                {"category": "b", "topic": "y", "date": "2024-04-09"},
+                # a duplicate filter, i.e. of two nodes of the same topic
+                {"category": "a", "topic": "x", "date": "2024-04-09"},
+            ],
+            date_interval=2,
+        )
+
+        # a single containment of any of the values, within a single date range
+        self.assertEqual(sql.count("@> ANY"), 1)
+        self.assertNotIn(" OR ", sql)
+        self.assertNotIn("AS DATE", sql)
+        self.assertIn(
+            [{"category": "a", "topic": "x"}, {"category": "b", "topic": "y"}],
+            params.values(),
+        )
+        # inclusive of the interval's last day and its times
+        self.assertIn("2024-04-07", params.values())
+        self.assertIn("2024-04-12", params.values())
+        self.assertIn("->> 'date') <", sql)
+
+    def test_compile_filters_not_equal_and_null(self):
+        sql, _ = self._compiled_where(
+            [{"topic": {"ne": None}}, {"category": "a", "thread": None}]
+        )
+
+        self.assertIn("->> 'topic') IS NOT NULL", sql)
+        self.assertIn("->> 'thread') IS NULL", sql)
+        self.assertEqual(sql.count(" OR "), 1)
+
+    def test_compile_filters_invalid_date(self):
+        with self.assertRaises(ValueError):
+            self.retriever.compile_filters([{"date": 20240409}])
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from unittest import IsolatedAsyncioTestCase
+
+from temporal_tasks import heartbeat_while
+from temporalio.testing import ActivityEnvironment
+
+
+class TestHeartbeatWhile(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.heartbeats: list = []
+        self.env = ActivityEnvironment()
+        self.env.on_heartbeat = lambda *details: self.heartbeats.append(details)
+
+    async def _activity(self, seconds: float) -> str:
+        await heartbeat_while(
+            asyncio.to_thread(time.sleep, seconds),
+            interval=timedelta(seconds=0.05),
+        )
+        return "done"
+
+    async def test_result_and_heartbeats(self):
+        result = await self.env.run(self._activity, 0.3)
+
+        self.assertEqual(result, "done")
+        self.assertGreaterEqual(len(self.heartbeats), 2)
+
+    async def test_fast_job_no_heartbeat(self):
+        result = await self.env.run(self._activity, 0)
+
+        self.assertEqual(result, "done")
+        self.assertEqual(self.heartbeats, [])
+
+    async def test_loop_not_blocked(self):
+        """
+        other coroutines should run while the blocking job is in flight
+        """
+        released = threading.Event()
+
+        async def release():
+            released.set()
+
+        async def activity() -> bool:
+            # the job finishes only once the concurrent coroutine has run
+            return await heartbeat_while(
+                asyncio.to_thread(released.wait, 10),
+                interval=timedelta(seconds=0.05),
+            )
+
+        waited, _ = await asyncio.gather(self.env.run(activity), release())
+        self.assertTrue(waited)
+
+    async def test_exception_propagated(self):
+        async def failing():
+            raise ValueError("failed")
+
+        with self.assertRaises(ValueError):
+            await self.env.run(heartbeat_while, failing())
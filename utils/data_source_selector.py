@@ -1,4 +1,10 @@
+import logging
+import os
+import threading
+import time
+
 from bson import ObjectId
+from utils.globals import DATA_SOURCE_CACHE_TTL, DATA_SOURCE_WATCHER_MAX_BACKOFF
 from utils.mongo import MongoSingleton
 
 
@@ -41,3 +47,156 @@ class DataSourceSelector:
             platforms = hivemind_module["options"]["platforms"]
 
         return platforms
+
+
+class DataSourceCache:
+    """
+    per-process cache of the data sources selected by each community
+
+    entries are invalidated by a change stream on `Core.modules` and,
+    in case the change stream isn't available (i.e. standalone mongo),
+    they expire after `ttl` seconds. A failed change stream is reopened
+    on a later lookup, waiting longer after each failure
+    """
+
+    __instance = None
+
+    def __init__(
+        self, ttl: float = DATA_SOURCE_CACHE_TTL, watch_changes: bool = True
+    ) -> None:
+        """
+        Parameters
+        ------------
+        ttl : float
+            seconds after which a cached entry is queried again from database
+        watch_changes : bool
+            whether to invalidate the entries using a `Core.modules` change stream
+        """
+        self.ttl = ttl
+        self.watch_changes = watch_changes
+        self.selector = DataSourceSelector()
+
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[float, dict[str, str]]] = {}
+        # bumped on each invalidation, so a lookup running meanwhile isn't cached
+        self._generation = 0
+        # the process the watcher was started in (threads do not survive a fork)
+        self._watcher_pid: int | None = None
+        self._watcher_backoff = 1.0
+        self._watcher_retry_at = 0.0
+
+    @staticmethod
+    def get_instance() -> "DataSourceCache":
+        if DataSourceCache.__instance is None:
+            DataSourceCache.__instance = DataSourceCache()
+        return DataSourceCache.__instance
+
+    def select_data_source(self, community_id: str) -> dict[str, str]:
+        """
+        the cached version of `DataSourceSelector.select_data_source`
+
+        Parameters
+        -----------
+        community_id : str
+            id of a community
+
+        Returns
+        ----------
+        data_sources : dict[str, str]
+            platform names as keys and platform IDs as values
+        """
+        if self.watch_changes:
+            self._ensure_watcher()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(community_id)
+            generation = self._generation
+        if entry is not None and now - entry[0] < self.ttl:
+            return dict(entry[1])
+
+        data_sources = self.selector.select_data_source(community_id)
+        with self._lock:
+            # an invalidation while querying means the result may already be stale
+            if self._generation == generation:
+                self._entries[community_id] = (now, data_sources)
+
+        return dict(data_sources)
+
+    def invalidate(self, community_id: str | None = None) -> None:
+        """
+        drop the cached data sources of a community
+
+        Parameters
+        ------------
+        community_id : str | None
+            the community to drop its entry
+            if None, all the entries would be dropped
+        """
+        with self._lock:
+            self._generation += 1
+            if community_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(community_id, None)
+
+    def _ensure_watcher(self) -> None:
+        pid = os.getpid()
+        if self._watcher_pid == pid or time.monotonic() < self._watcher_retry_at:
+            return
+
+        with self._lock:
+            if self._watcher_pid == pid:
+                return
+            # a forked child inherits the parent's entries but not its watcher
+            self._generation += 1
+            self._entries.clear()
+            self._watcher_pid = pid
+
+        thread = threading.Thread(
+            target=self._watch_modules,
+            name="data-source-cache-watcher",
+            daemon=True,
+        )
+        thread.start()
+
+    def _watch_modules(self) -> None:
+        """
+        invalidate the cached entries on any change to the hivemind modules
+        """
+        client = MongoSingleton.get_instance().get_client()
+        # deleted documents have no `fullDocument`, so all entries get dropped
+        pipeline = [
+            {
+                "$match": {
+                    "$or": [
+                        {"fullDocument.name": "hivemind"},
+                        {"operationType": "delete"},
+                    ]
+                }
+            }
+        ]
+        try:
+            with client["Core"]["modules"].watch(
+                pipeline, full_document="updateLookup"
+            ) as stream:
+                # the entries cached before the stream was opened may be stale
+                self.invalidate()
+                self._watcher_backoff = 1.0
+                for change in stream:
+                    document = change.get("fullDocument") or {}
+                    community = document.get("community")
+                    self.invalidate(str(community) if community else None)
+        except Exception as exp:
+            logging.warning(
+                "Data source cache change stream is not available, "
+                f"falling back to {self.ttl} seconds TTL, "
+                f"retrying in {self._watcher_backoff:.0f} seconds. exp: {exp}"
+            )
+            # i.e. a primary stepdown, the next lookup after the backoff reopens it
+            with self._lock:
+                self._watcher_retry_at = time.monotonic() + self._watcher_backoff
+                self._watcher_backoff = min(
+                    self._watcher_backoff * 2, DATA_SOURCE_WATCHER_MAX_BACKOFF
+                )
+                self._watcher_pid = None
@@ -0,0 +1,214 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable
+
+
+class FairScheduler:
+    """
+    run jobs on a bounded thread pool, fair across communities
+
+    each community has its own FIFO queue, the queues are served
+    with a weighted round-robin and every community can have at most
+    `per_community_limit` jobs running at the same time, unless no other
+    community has queued jobs so the workers are never left idle
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        per_community_limit: int,
+        weights: dict[str, int] | None = None,
+        thread_name_prefix: str = "fair-scheduler",
+    ) -> None:
+        """
+        Parameters
+        ------------
+        max_workers : int
+            the number of jobs to run concurrently
+        per_community_limit : int
+            the maximum number of jobs a community can have running at once
+        weights : dict[str, int] | None
+            the number of consecutive turns of each community within a round
+            communities not given would have the weight of 1
+        thread_name_prefix : str
+            the prefix of the worker threads names
+        """
+        self.max_workers = max_workers
+        self.per_community_limit = per_community_limit
+        self.weights = weights or {}
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=thread_name_prefix
+        )
+        self._lock = threading.Lock()
+        self._active = 0
+        # pending jobs of each community as (enqueue time, future, callable)
+        self._queues: dict[str, deque[tuple[float, Future, Callable[[], Any]]]] = {}
+        # communities having pending jobs, in their round-robin order
+        self._ring: deque[str] = deque()
+        # the turns a community has left in the current round
+        self._credits: dict[str, int] = {}
+        self._running: dict[str, int] = defaultdict(int)
+
+        self._dispatched: dict[str, int] = defaultdict(int)
+        self._total_wait: dict[str, float] = defaultdict(float)
+        self._max_wait: dict[str, float] = defaultdict(float)
+
+    def submit(
+        self, community_id: str, fn: Callable[..., Any], *args, **kwargs
+    ) -> Future:
+        """
+        schedule `fn(*args, **kwargs)` for a community
+
+        Parameters
+        ------------
+        community_id : str
+            the community the job is for
+        fn : Callable[..., Any]
+            the function to run
+
+        Returns
+        ---------
+        future : concurrent.futures.Future
+            would hold the function's result
+        """
+        future: Future = Future()
+        with self._lock:
+            if community_id not in self._queues:
+                self._queues[community_id] = deque()
+                self._ring.append(community_id)
+            self._queues[community_id].append(
+                (time.monotonic(), future, lambda: fn(*args, **kwargs))
+            )
+            self._dispatch()
+        return future
+
+    def queued(self) -> int:
+        """
+        the number of jobs waiting for a worker, across all communities
+        """
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> dict[str, dict[str, float | int]]:
+        """
+        per-community scheduling metrics
+
+        Returns
+        ---------
+        stats : dict[str, dict[str, float | int]]
+            community ids as keys and values having
+            `queue_depth`, `running`, `dispatched`,
+            `avg_wait_seconds` and `max_wait_seconds`
+        """
+        with self._lock:
+            communities = set(self._queues) | set(self._dispatched)
+            return {
+                community_id: {
+                    "queue_depth": len(self._queues.get(community_id, ())),
+                    "running": self._running[community_id],
+                    "dispatched": self._dispatched[community_id],
+                    "avg_wait_seconds": (
+                        self._total_wait[community_id] / self._dispatched[community_id]
+                        if self._dispatched[community_id]
+                        else 0.0
+                    ),
+                    "max_wait_seconds": self._max_wait[community_id],
+                }
+                for community_id in communities
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _dispatch(self) -> None:
+        """
+        start as many pending jobs as the free workers allow
+        should be called while holding the lock
+        """
+        while self._active < self.max_workers:
+            community_id = self._next_community()
+            if community_id is None:
+                return
+
+            enqueued_at, future, job = self._queues[community_id].popleft()
+            if not self._queues[community_id]:
+                del self._queues[community_id]
+                self._ring.remove(community_id)
+                self._credits.pop(community_id, None)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            wait = time.monotonic() - enqueued_at
+            self._dispatched[community_id] += 1
+            self._total_wait[community_id] += wait
+            self._max_wait[community_id] = max(self._max_wait[community_id], wait)
+
+            self._active += 1
+            self._running[community_id] += 1
+            self._executor.submit(self._run, community_id, future, job)
+
+    def _next_community(self) -> str | None:
+        """
+        weighted round-robin over the communities under their concurrency limit
+
+        if every community with queued jobs is at its limit, the next one
+        in the ring is served anyway, keeping the free workers busy
+        """
+        for _ in range(len(self._ring)):
+            community_id = self._ring[0]
+            if self._running[community_id] < self.per_community_limit:
+                weight = self.weights.get(community_id, 1)
+                credits = self._credits.get(community_id, weight) - 1
+                if credits <= 0:
+                    # turns are used, next community in the following call
+                    self._credits[community_id] = weight
+                    self._ring.rotate(-1)
+                else:
+                    self._credits[community_id] = credits
+                return community_id
+            self._ring.rotate(-1)
+
+        if not self._ring:
+            return None
+
+        community_id = self._ring[0]
+        self._ring.rotate(-1)
+        return community_id
+
+    def _run(self, community_id: str, future: Future, job: Callable[[], Any]) -> None:
+        try:
+            future.set_result(job())
+        except BaseException as exp:
+            future.set_exception(exp)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._running[community_id] -= 1
+                try:
+                    self._dispatch()
+                except Exception as exp:
+                    logging.error(f"Failed to dispatch the scheduled jobs! exp: {exp}")
+
+
+@lru_cache(maxsize=None)
+def get_scheduler() -> FairScheduler:
+    """
+    the scheduler of the process' AMQP questions, configured by the env variables
+
+    the pipeline is synchronous, running it on threads keeps the event loop consuming
+    and a burst of questions from one community doesn't delay the others
+    """
+    return FairScheduler(
+        # the questions processed concurrently by the blocking pipeline
+        max_workers=int(os.getenv("AMQP_MAX_WORKERS", 4)),
+        # the questions of a single community processed concurrently
+        per_community_limit=int(os.getenv("AMQP_COMMUNITY_MAX_WORKERS", 2)),
+        thread_name_prefix="hivemind-amqp",
+    )
@@ -18,4 +18,46 @@ K1_RETRIEVER_SEARCH=100  # summary retrieval
 K2_RETRIEVER_SEARCH=50  # raw data retrieval
 D_RETRIEVER_SEARCH=7   # days
 
-RERANK_TOP_K=10
\ No newline at end of file
+RERANK_TOP_K=10
+# batch the qdrant searches of all sub-questions instead of one search per engine
+QDRANT_BATCH_RETRIEVAL = True
+# fetch only the payload fields used to answer, never the vectors
+QDRANT_PAYLOAD_PROJECTION = True
+# the candidates pre-selected by the quantized vectors, re-scored by the originals
+QUANTIZATION_OVERSAMPLING = 2.0
+# fetch the raw messages of each top summary day within one batched request
+# instead of a single search over the summary days' date ranges
+QDRANT_DAY_GROUPED_EXPANSION = False
+DAY_GROUPED_EXPANSION_DAYS = 10  # the top summary days expanded
+DAY_GROUPED_EXPANSION_SIZE = 5  # raw messages per day
+
+# the prompt context size, overridden per platform by `CONTEXT_TOKEN_BUDGETS`
+CONTEXT_TOKEN_BUDGET = 8000  # tokens
+CONTEXT_MAX_NODE_TOKENS = 1000  # tokens, the longer nodes are cut
+# the budget share the summaries can take, the rest is left for the raw messages
+SUMMARY_CONTEXT_SHARE = 0.4
+# the encoding of the answering model (gpt-4o-mini)
+CONTEXT_TOKEN_ENCODING = "o200k_base"
+
+# drop the reposted and near-identical nodes before reranking
+NODE_NEAR_DUPLICATE_PRUNING = True
+SIMHASH_MAX_DISTANCE = 8  # the differing bits of two near-duplicates' 64-bit simhashes
+# diversify the candidates with MMR, fetching the nodes' vectors from qdrant
+NODE_MMR_PRUNING = False
+NODE_MMR_TOP_K = 30
+NODE_MMR_LAMBDA = 0.7  # 1 is the relevance only, 0 the diversity only
+
+# per-process cache of community data sources (fallback when change streams are unavailable)
+DATA_SOURCE_CACHE_TTL = 300  # seconds
+# the most seconds to wait before reopening a failed change stream
+DATA_SOURCE_WATCHER_MAX_BACKOFF = 60
+
+# the characters of a node's text kept within the references passed between activities
+REFERENCE_SNIPPET_CHARS = 500
+
+# the pooled postgres engines shared by the queries of a process
+PG_POOL_SIZE = 2
+PG_MAX_OVERFLOW = 3
+PG_POOL_RECYCLE_SECONDS = 1800
+# the community databases having a pool at once, the least recently used idle ones are disposed
+PG_MAX_POOLED_DATABASES = 8
@@ -0,0 +1,118 @@
+import logging
+import time
+from functools import lru_cache
+
+import spacy
+import tiktoken
+from sentence_transformers import CrossEncoder
+from tc_hivemind_backend.db.utils.preprocess_text import BasePreprocessor
+
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+SPACY_PIPELINE = "en_core_web_sm"
+# the encodings used by llama-index's tokenizer and the openai models
+TIKTOKEN_ENCODINGS = ["cl100k_base", "o200k_base"]
+
+
+@lru_cache(maxsize=None)
+def get_cross_encoder(model_name: str = DEFAULT_RERANKER_MODEL) -> CrossEncoder:
+    """
+    load a CrossEncoder once per process and share it between the engines
+    """
+    logging.info(f"Loading CrossEncoder model `{model_name}`")
+    return CrossEncoder(model_name)
+
+
+@lru_cache(maxsize=None)
+def get_token_encoding(name: str) -> tiktoken.Encoding:
+    """
+    load a tiktoken encoding once per process
+    """
+    return tiktoken.get_encoding(name)
+
+
+@lru_cache(maxsize=None)
+def get_spacy_pipeline(name: str = SPACY_PIPELINE) -> spacy.language.Language:
+    """
+    load a spaCy pipeline once per process
+    """
+    try:
+        return spacy.load(name)
+    except OSError as exp:
+        raise OSError(f"Model spacy `{name}` is not installed!") from exp
+
+
+class CachedPreprocessor(BasePreprocessor):
+    """
+    `BasePreprocessor` loads the spaCy pipeline on every call,
+    this one reuses the process-wide pipeline
+    """
+
+    def extract_main_content(self, text: str) -> str:
+        """
+        the lemmas of a text's main tokens, as `BasePreprocessor` extracts them
+
+        Parameters
+        ------------
+        text : str
+            a message text
+
+        Returns
+        --------
+        cleaned_text : str
+        """
+        doc = get_spacy_pipeline()(text)
+        return " ".join(
+            token.lemma_
+            for token in doc
+            if not token.is_punct
+            and not token.is_space
+            and not token.is_stop
+            and not token.like_url
+            and not token.like_num
+            and token.is_ascii
+        )
+
+
+def preload_models(reranker_model: str = DEFAULT_RERANKER_MODEL) -> dict[str, float]:
+    """
+    load the heavy models used while answering a question
+
+    it is meant to run in the parent process before forking the workers
+    so the children share the loaded weights through copy-on-write
+
+    Parameters
+    ------------
+    reranker_model : str
+        the CrossEncoder model to load
+
+    Returns
+    ---------
+    timings : dict[str, float]
+        the seconds took to load each model
+    """
+    timings: dict[str, float] = {}
+
+    start = time.perf_counter()
+    get_cross_encoder(reranker_model)
+    timings["cross_encoder"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_spacy_pipeline()
+    timings["spacy"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for encoding in TIKTOKEN_ENCODINGS:
+        get_token_encoding(encoding)
+    timings["tiktoken"] = time.perf_counter() - start
+
+    logging.info(f"Preloaded models, seconds: {timings}")
+    return timings
+
+
+def warm_up_models(reranker_model: str = DEFAULT_RERANKER_MODEL) -> None:
+    """
+    run the preloaded models once so the lazy initializations
+    (i.e. torch threads, spaCy lookups) don't happen within the first question
+    """
+    get_cross_encoder(reranker_model).predict([("warm up", "warm up")])
+    get_spacy_pipeline()("warm up")
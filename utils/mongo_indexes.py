@@ -0,0 +1,148 @@
+import logging
+from typing import Any
+
+from pymongo import ASCENDING, MongoClient
+
+from .mongo import MongoSingleton
+
+# the indexes backing every lookup the bot does on mongo
+# `hivemind.internal_messages` is queried by `_id` which mongo always indexes
+MONGO_INDEXES: list[dict[str, Any]] = [
+    {
+        "db": "hivemind",
+        "collection": "tokens",
+        "keys": [("token", ASCENDING)],
+    },
+    {
+        "db": "hivemind",
+        "collection": "external_messages",
+        "keys": [("taskId", ASCENDING)],
+    },
+    {
+        "db": "Core",
+        "collection": "modules",
+        "keys": [("community", ASCENDING), ("name", ASCENDING)],
+    },
+    {
+        "db": "Core",
+        "collection": "platforms",
+        "keys": [("metadata.id", ASCENDING), ("name", ASCENDING)],
+    },
+]
+
+# sample filters of the queries the bot runs, used to check their query plans
+MONGO_QUERY_PATHS: list[dict[str, Any]] = [
+    {"db": "hivemind", "collection": "tokens", "filter": {"token": ""}},
+    {"db": "hivemind", "collection": "external_messages", "filter": {"taskId": ""}},
+    {"db": "hivemind", "collection": "internal_messages", "filter": {"_id": ""}},
+    {
+        "db": "Core",
+        "collection": "modules",
+        "filter": {"community": "", "name": "hivemind"},
+    },
+    {
+        "db": "Core",
+        "collection": "platforms",
+        "filter": {"metadata.id": "", "name": "discord"},
+    },
+]
+
+
+def ensure_mongo_indexes(client: MongoClient | None = None) -> list[str]:
+    """
+    create the indexes the bot queries rely on, if not already available
+    creating an index that already exists is a no-op on mongo
+
+    Parameters
+    ------------
+    client : MongoClient | None
+        the client to create the indexes with
+        if None, the `MongoSingleton` client would be used
+
+    Returns
+    ---------
+    slow_paths : list[str]
+        the `db.collection` query paths still doing a collection scan
+    """
+    if client is None:
+        client = MongoSingleton.get_instance().get_client()
+
+    for index in MONGO_INDEXES:
+        collection = client[index["db"]][index["collection"]]
+        try:
+            name = collection.create_index(index["keys"])
+            logging.info(
+                f"Mongo index `{name}` ensured on {index['db']}.{index['collection']}"
+            )
+        except Exception as exp:
+            logging.error(
+                f"Failed to create index on {index['db']}.{index['collection']}! "
+                f"exp: {exp}"
+            )
+
+    slow_paths = find_collection_scans(client)
+    for path in slow_paths:
+        logging.warning(f"Query on `{path}` is doing a collection scan!")
+
+    return slow_paths
+
+
+def find_collection_scans(client: MongoClient) -> list[str]:
+    """
+    explain the bot's queries and find the ones doing a collection scan
+
+    Parameters
+    ------------
+    client : MongoClient
+        the client to run the explain commands with
+
+    Returns
+    ---------
+    slow_paths : list[str]
+        the `db.collection` query paths having a `COLLSCAN` winning plan
+    """
+    slow_paths: list[str] = []
+    for path in MONGO_QUERY_PATHS:
+        path_name = f"{path['db']}.{path['collection']}"
+        try:
+            explain = (
+                client[path["db"]][path["collection"]]
+                .find(path["filter"])
+                .explain()
+            )
+        except Exception as exp:
+            logging.error(f"Failed to explain the query on {path_name}! exp: {exp}")
+            continue
+
+        if "COLLSCAN" in plan_stages(explain["queryPlanner"]["winningPlan"]):
+            slow_paths.append(path_name)
+
+    return slow_paths
+
+
+def plan_stages(plan: dict[str, Any]) -> list[str]:
+    """
+    flatten the stages of a mongo query plan
+
+    Parameters
+    ------------
+    plan : dict[str, Any]
+        the `winningPlan` of an explain output
+
+    Returns
+    ---------
+    stages : list[str]
+        all the stage names within the plan tree
+    """
+    stages: list[str] = []
+    if "stage" in plan:
+        stages.append(plan["stage"])
+    # mongo >= 7 nests the classic plan under `queryPlan`
+    if "queryPlan" in plan:
+        stages.extend(plan_stages(plan["queryPlan"]))
+    if "inputStage" in plan:
+        stages.extend(plan_stages(plan["inputStage"]))
+    for input_stage in plan.get("inputStages", []):
+        stages.extend(plan_stages(input_stage))
+
+    return stages
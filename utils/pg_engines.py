@@ -0,0 +1,281 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.legacy.vector_stores import PGVectorStore
+from sqlalchemy import Engine, create_engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from tc_hivemind_backend.db.credentials import load_postgres_credentials
+from tc_hivemind_backend.db.utils.model_hyperparams import load_model_hyperparams
+from utils.globals import (
+    PG_MAX_OVERFLOW,
+    PG_MAX_POOLED_DATABASES,
+    PG_POOL_RECYCLE_SECONDS,
+    PG_POOL_SIZE,
+)
+
+
+class PGEngineRegistry:
+    """
+    the pooled sqlalchemy engines of a process, one per database
+
+    the engines are kept in the least recently used order and once more than
+    `max_databases` are pooled, the least recently used idle ones are disposed
+    so the many community databases wouldn't exhaust the postgres connections
+    """
+
+    def __init__(
+        self,
+        max_databases: int = PG_MAX_POOLED_DATABASES,
+        pool_size: int = PG_POOL_SIZE,
+        max_overflow: int = PG_MAX_OVERFLOW,
+        pool_recycle: int = PG_POOL_RECYCLE_SECONDS,
+    ) -> None:
+        """
+        Parameters
+        ------------
+        max_databases : int
+            the databases to keep a pool for
+            more are pooled while the least recently used ones are in use
+        pool_size : int
+            the connections kept open per database
+        max_overflow : int
+            the connections opened beyond `pool_size` under load, closed once returned
+        pool_recycle : int
+            the seconds after which a connection is reopened
+        """
+        self.max_databases = max_databases
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_recycle = pool_recycle
+
+        self._lock = threading.Lock()
+        self._engines: OrderedDict[str, Engine] = OrderedDict()
+        # the tables whose vector store setup already ran, per database
+        self._setup_tables: dict[str, set[str]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        # the pooled connections must not be shared with a forked worker
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def get_engine(self, connection_string: str) -> Engine:
+        """
+        the pooled engine of a database, created on its first use
+
+        Parameters
+        ------------
+        connection_string : str
+            the connection string of the database, its database name is the key
+
+        Returns
+        ---------
+        engine : Engine
+            the engine shared by all the queries on the database
+        """
+        dbname = make_url(connection_string).database or ""
+        with self._lock:
+            engine = self._engines.get(dbname)
+            if engine is not None:
+                self._engines.move_to_end(dbname)
+                self._hits += 1
+                return engine
+
+            self._misses += 1
+            engine = create_engine(
+                connection_string,
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_recycle=self.pool_recycle,
+                pool_pre_ping=True,
+            )
+            self._engines[dbname] = engine
+            self._evict_idle()
+            return engine
+
+    def needs_setup(self, dbname: str, table_name: str) -> bool:
+        """
+        whether a table's vector store setup is yet to be run within the process
+        """
+        with self._lock:
+            return table_name not in self._setup_tables.get(dbname, set())
+
+    def mark_setup(self, dbname: str, table_name: str) -> None:
+        """
+        mark a table's vector store setup as done, to be called once it succeeded
+        """
+        with self._lock:
+            self._setup_tables.setdefault(dbname, set()).add(table_name)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        the pools' connection metrics
+
+        Returns
+        ---------
+        stats : dict[str, dict[str, int]]
+            the database names as keys and values having `size`, `checked_in`,
+            `checked_out` and `overflow` connections. The `registry` key holds
+            the `databases` pooled and the `hits`, `misses` and `evictions` counts
+        """
+        with self._lock:
+            stats: dict[str, dict[str, int]] = {
+                dbname: {
+                    "size": engine.pool.size(),
+                    "checked_in": engine.pool.checkedin(),
+                    "checked_out": engine.pool.checkedout(),
+                    # negative while the pool is not yet filled
+                    "overflow": max(engine.pool.overflow(), 0),
+                }
+                for dbname, engine in self._engines.items()
+            }
+            stats["registry"] = {
+                "databases": len(self._engines),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+            return stats
+
+    def dispose(self) -> None:
+        """
+        close all the pooled connections
+        """
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._setup_tables.clear()
+
+    def _evict_idle(self) -> None:
+        # the lock must be held, the most recently used one is never evicted
+        for dbname in list(self._engines)[:-1]:
+            if len(self._engines) <= self.max_databases:
+                return
+            engine = self._engines[dbname]
+            if engine.pool.checkedout():
+                continue
+            # the vector stores fetch their engine on every session,
+            # so the disposed one isn't used again
+            engine.dispose()
+            del self._engines[dbname]
+            self._setup_tables.pop(dbname, None)
+            self._evictions += 1
+            logging.info(f"Disposed the idle postgres pool of `{dbname}`")
+
+        if len(self._engines) > self.max_databases:
+            logging.warning(
+                f"{len(self._engines)} postgres pools are in use, "
+                f"more than the {self.max_databases} configured!"
+            )
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        for engine in self._engines.values():
+            # leave the parent's connections open for the parent
+            engine.dispose(close=False)
+
+
+@lru_cache(maxsize=None)
+def get_pg_engine_registry() -> PGEngineRegistry:
+    """
+    the engine registry shared within the process
+    """
+    return PGEngineRegistry()
+
+
+class PooledPGVectorStore(PGVectorStore):
+    """
+    a `PGVectorStore` using the process-wide pooled engine of its database
+    instead of creating its own, with its setup (extension, schema and table)
+    run once per process
+    """
+
+    def _connect(self) -> None:
+        self._engine = get_pg_engine_registry().get_engine(self.connection_string)
+        self._session = self._pooled_session
+
+        # the async engines are bound to their event loop, not shared
+        self._async_engine = create_async_engine(self.async_connection_string)
+        self._async_session = sessionmaker(self._async_engine, class_=AsyncSession)  # type: ignore
+
+    def _pooled_session(self) -> Session:
+        """
+        a session on the database's engine within the registry
+
+        the engine is fetched on every session, so a store outliving the
+        eviction of its engine uses the registry's new one, not the disposed one
+        """
+        self._engine = get_pg_engine_registry().get_engine(self.connection_string)
+        return Session(self._engine)
+
+    def _initialize(self) -> None:
+        if not self._is_initialized:
+            self._connect()
+            dbname = make_url(self.connection_string).database or ""
+            registry = get_pg_engine_registry()
+            if self.perform_setup and registry.needs_setup(dbname, self.table_name):
+                # the setup statements are idempotent, concurrent first runs are fine
+                self._create_extension()
+                self._create_schema_if_not_exists()
+                self._create_tables_if_not_exists()
+                registry.mark_setup(dbname, self.table_name)
+            self._is_initialized = True
+
+    async def close(self) -> None:
+        if not self._is_initialized:
+            return
+        # the pooled engine is shared with the other vector stores
+        await self._async_engine.dispose()
+
+
+def load_pooled_index(
+    table_name: str,
+    dbname: str,
+    embed_model: BaseEmbedding,
+    embed_dim: int | None = None,
+) -> VectorStoreIndex:
+    """
+    load the VectorStoreIndex of a postgres table over the pooled engines,
+    the same as `PGVectorAccess.load_index`
+
+    Parameters
+    ------------
+    table_name : str
+        the table to load, without its `data_` prefix
+    dbname : str
+        the database of the table
+    embed_model : BaseEmbedding
+        the embedding model of the index
+    embed_dim : int | None
+        the embedding dimension
+        if None, the one configured within the `.env` would be used
+
+    Returns
+    ---------
+    index : VectorStoreIndex
+        the index to query the table with
+    """
+    if embed_dim is None:
+        _, embed_dim = load_model_hyperparams()
+
+    postgres_creds = load_postgres_credentials()
+    vector_store = PooledPGVectorStore.from_params(
+        database=dbname,
+        host=postgres_creds["host"],
+        password=postgres_creds["password"],
+        port=postgres_creds["port"],
+        user=postgres_creds["user"],
+        table_name=table_name,
+        embed_dim=embed_dim,
+    )
+    return VectorStoreIndex.from_vector_store(
+        vector_store=vector_store,
+        embed_model=embed_model,
+    )
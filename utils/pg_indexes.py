@@ -0,0 +1,195 @@
+"""
+create the postgres indexes serving the `RetrieveSimilarNodes` metadata filters
+
+usage:
+    python -m utils.pg_indexes --community <id> --platform discourse --platform discourse_summary
+"""
+
+import argparse
+import json
+import logging
+from typing import Any
+
+from llama_index.vector_stores.postgres import PGVectorStore
+from sqlalchemy import ClauseElement, Executable, Select, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from tc_hivemind_backend.pg_vector_access import PGVectorAccess
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, stmt: Select) -> None:
+        self.stmt = stmt
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler, **kwargs) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kwargs)
+
+
+def filter_index_statements(
+    vector_store: PGVectorStore, date_key: str = "date"
+) -> dict[str, str]:
+    """
+    the statements creating the metadata filter indexes of a vector store's table
+
+    Parameters
+    ------------
+    vector_store : PGVectorStore
+        the initialized vector store of the table
+    date_key : str
+        the metadata key of the ISO formatted dates
+
+    Returns
+    ---------
+    statements : dict[str, str]
+        the `CREATE INDEX` statements keyed by the index name
+    """
+    table_class = vector_store._table_class
+    table_name = table_class.__tablename__
+    table = f'"{vector_store.schema_name}"."{table_name}"'
+    # the expressions must be the ones `RetrieveSimilarNodes.compile_filters` emits
+    document = (
+        "metadata_"
+        if isinstance(table_class.metadata_.type, JSONB)
+        else "(metadata_::jsonb)"
+    )
+    date_field = "metadata_ ->> '" + date_key.replace("'", "''") + "'"
+
+    containment_index = f"{table_name}_metadata_containment"
+    date_index = f"{table_name}_metadata_{date_key}"
+    return {
+        # `jsonb_path_ops` is smaller than the default, serving `@>` only
+        containment_index: (
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{containment_index}" '
+            f"ON {table} USING gin ({document} jsonb_path_ops)"
+        ),
+        date_index: (
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{date_index}" '
+            f"ON {table} (({date_field}))"
+        ),
+    }
+
+
+def ensure_filter_indexes(
+    vector_store: PGVectorStore, date_key: str = "date"
+) -> list[str]:
+    """
+    create the metadata filter indexes of a vector store's table, if not already available
+    the indexes are built concurrently, not blocking the table writes
+
+    Parameters
+    ------------
+    vector_store : PGVectorStore
+        the vector store of the table
+    date_key : str
+        the metadata key of the ISO formatted dates
+
+    Returns
+    ---------
+    index_names : list[str]
+        the indexes ensured
+    """
+    vector_store._initialize()
+
+    index_names: list[str] = []
+    statements = filter_index_statements(vector_store, date_key)
+    # `CREATE INDEX CONCURRENTLY` cannot run within a transaction
+    with vector_store._engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as connection:
+        for index_name, statement in statements.items():
+            try:
+                connection.execute(text(statement))
+                index_names.append(index_name)
+                logging.info(f"Postgres index `{index_name}` ensured")
+            except Exception as exp:
+                # a failed concurrent build leaves an invalid index to be dropped
+                logging.error(f"Failed to create index `{index_name}`! exp: {exp}")
+
+    return index_names
+
+
+def explain_plan(
+    vector_store: PGVectorStore, stmt: Select, disable_seqscan: bool = False
+) -> list[str]:
+    """
+    explain a statement and list the nodes of its query plan
+
+    Parameters
+    ------------
+    vector_store : PGVectorStore
+        the vector store to run the explain command with
+    stmt : Select
+        the statement to explain, i.e. a `RetrieveSimilarNodes.build_query`
+    disable_seqscan : bool
+        plan as if the sequential scans were too costly,
+        checking the indexes can serve the query on the small tables too
+
+    Returns
+    ---------
+    nodes : list[str]
+        the plan node types, with the index used if any
+        i.e. `Bitmap Index Scan using data_discord_metadata_date`
+    """
+    vector_store._initialize()
+    with vector_store._session() as session, session.begin():
+        if disable_seqscan:
+            session.execute(text("SET LOCAL enable_seqscan = off"))
+        explain = session.execute(_Explain(stmt)).scalar()
+
+    return plan_nodes(explain[0]["Plan"])
+
+
+def plan_nodes(plan: dict[str, Any]) -> list[str]:
+    """
+    flatten the nodes of a postgres query plan
+
+    Parameters
+    ------------
+    plan : dict[str, Any]
+        the `Plan` of an `EXPLAIN (FORMAT JSON)` output
+
+    Returns
+    ---------
+    nodes : list[str]
+        all the node types within the plan tree
+    """
+    node = plan["Node Type"]
+    if "Index Name" in plan:
+        node += f" using {plan['Index Name']}"
+
+    nodes = [node]
+    for sub_plan in plan.get("Plans", []):
+        nodes.extend(plan_nodes(sub_plan))
+    return nodes
+
+
+def main(args: argparse.Namespace) -> dict[str, list[str]]:
+    return {
+        platform: ensure_filter_indexes(
+            PGVectorAccess(
+                table_name=platform, dbname=f"community_{args.community}"
+            ).setup_pgvector_index(),
+            date_key=args.date_key,
+        )
+        for platform in args.platform
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--community", required=True)
+    parser.add_argument(
+        "--platform",
+        action="append",
+        required=True,
+        help="the platform tables to index, i.e. `discourse` and `discourse_summary`",
+    )
+    parser.add_argument("--date-key", default="date")
+    args = parser.parse_args()
+
+    print(json.dumps(main(args), indent=2))
@@ -1,4 +1,275 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import weakref
+from functools import lru_cache
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, model_validator
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+from schema.type import DataType
+from tc_hivemind_backend.db.credentials import load_qdrant_credentials
 from tc_hivemind_backend.db.qdrant import QdrantSingleton
+from utils.globals import QUANTIZATION_OVERSAMPLING
+
+# an async client's connections are bound to the event loop they were opened within
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, AsyncQdrantClient
+] = weakref.WeakKeyDictionary()
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """
+    the async qdrant client shared by the coroutines of the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        creds = load_qdrant_credentials()
+        if creds["api_key"] == "":
+            client = AsyncQdrantClient(host=creds["host"], port=creds["port"])
+        else:
+            client = AsyncQdrantClient(
+                host=creds["host"],
+                port=creds["port"],
+                api_key=creds["api_key"],
+                https=creds["use_https"],
+            )
+        _async_clients[loop] = client
+    return client
+
+
+# the range index of each raw data date format
+DATE_PAYLOAD_SCHEMA = {
+    DataType.FLOAT: models.PayloadSchemaType.FLOAT,
+    DataType.INTEGER: models.PayloadSchemaType.INTEGER,
+}
+
+# the collections having their payload indexes checked within this process
+_indexed_collections: set[str] = set()
+_indexed_collections_lock = threading.Lock()
+
+
+def ensure_collection_indexes(
+    client: QdrantClient,
+    collection_name: str,
+    fields: dict[str, models.PayloadSchemaType],
+) -> list[str]:
+    """
+    create the missing payload indexes of a collection
+
+    the collection is checked once per process, the indexes are built
+    in the background so the searches meanwhile run as before
+
+    Parameters
+    ------------
+    client : QdrantClient
+        the qdrant client
+    collection_name : str
+        the collection to index
+    fields : dict[str, models.PayloadSchemaType]
+        the payload fields and their index types
+
+    Returns
+    ---------
+    created : list[str]
+        the fields having their index created
+    """
+    with _indexed_collections_lock:
+        if collection_name in _indexed_collections:
+            return []
+
+        try:
+            payload_schema = client.get_collection(collection_name).payload_schema
+        except Exception as exp:
+            logging.error(
+                f"Couldn't check the payload indexes of `{collection_name}`! exp: {exp}"
+            )
+            return []
+
+        created: list[str] = []
+        for field_name, field_schema in fields.items():
+            index = payload_schema.get(field_name)
+            if index is not None:
+                if index.data_type != field_schema:
+                    logging.warning(
+                        f"`{collection_name}` has a `{index.data_type}` index "
+                        f"on `{field_name}` instead of `{field_schema}`!"
+                    )
+                continue
+
+            try:
+                client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                    wait=False,
+                )
+                created.append(field_name)
+            except Exception as exp:
+                logging.error(
+                    f"Couldn't create the `{collection_name}` payload index "
+                    f"on `{field_name}`! exp: {exp}"
+                )
+
+        _indexed_collections.add(collection_name)
+
+    if created:
+        logging.info(f"Creating the `{collection_name}` payload indexes: {created}")
+    return created
+
+
+@lru_cache(maxsize=None)
+def _parse_platform_config(
+    env_name: str, config: str, model: type[BaseModel]
+) -> dict[str, BaseModel]:
+    try:
+        return {
+            name: model(**params) for name, params in json.loads(config).items()
+        }
+    except Exception as exp:
+        logging.error(f"Invalid `{env_name}`, using the defaults! exp: {exp}")
+        return {}
+
+
+def _load_platform_config(
+    env_name: str, model: type[BaseModel], platform_name: str | None, summary: bool
+) -> BaseModel | None:
+    # the env variable holds a JSON object keyed by the platform name,
+    # or `<platform_name>_summary` for the platform's summaries
+    load_dotenv()
+    config = os.getenv(env_name)
+    if platform_name is None or not config:
+        return None
+    name = f"{platform_name}_summary" if summary else platform_name
+    return _parse_platform_config(env_name, config, model).get(name)
+
+
+def load_search_params(
+    platform_name: str | None, summary: bool = False
+) -> models.SearchParams:
+    """
+    the qdrant search params configured for a platform's collections
+
+    the `QDRANT_SEARCH_PARAMS` env variable holds them as a JSON object
+    keyed by the platform name, or `<platform_name>_summary` for its summaries
+    i.e. `{"discord": {"hnsw_ef": 128, "quantization": {"rescore": true,
+    "oversampling": 2.0}}, "discord_summary": {"exact": true}}`
+
+    the quantized collections are re-scored using their original vectors
+    unless configured otherwise, the others ignore the quantization params
+
+    Parameters
+    ------------
+    platform_name : str | None
+        the platform name, i.e. `discord`
+    summary : bool
+        to load the params of the platform's summary collection
+
+    Returns
+    ---------
+    search_params : models.SearchParams
+        the configured params, the server defaults for the ones not given
+    """
+    params = _load_platform_config(
+        "QDRANT_SEARCH_PARAMS", models.SearchParams, platform_name, summary
+    )
+    params = params or models.SearchParams()
+    if params.quantization is None:
+        params = params.model_copy(
+            update={
+                "quantization": models.QuantizationSearchParams(
+                    rescore=True, oversampling=QUANTIZATION_OVERSAMPLING
+                )
+            }
+        )
+    return params
+
+
+
+class AdaptiveTopK(BaseModel):
+    """
+    retrieve as many nodes as are relevant to the query, within `min_k` and `max_k`
+
+    the search asks qdrant for up to `max_k` points scoring at least
+    `score_threshold`, then the nodes after the first score drop
+    larger than `score_gap` are cut, keeping at least `min_k` of them
+    """
+
+    min_k: int = 1
+    max_k: int
+    score_threshold: float | None = None
+    score_gap: float | None = None
+
+    @model_validator(mode="after")
+    def check_bounds(self) -> "AdaptiveTopK":
+        if not 0 < self.min_k <= self.max_k:
+            raise ValueError("`min_k` should be positive and at most `max_k`!")
+        return self
+
+    def cut(self, nodes: list) -> list:
+        """
+        cut the retrieved nodes, sorted by their descending scores
+
+        Parameters
+        ------------
+        nodes : list[NodeWithScore]
+            the retrieved nodes
+
+        Returns
+        ---------
+        nodes : list[NodeWithScore]
+            the nodes before the threshold and the score gap
+        """
+        nodes = nodes[: self.max_k]
+        if self.score_threshold is not None:
+            # the hybrid searches are not thresholded by qdrant
+            nodes = [
+                node
+                for node in nodes
+                if node.score is None or node.score >= self.score_threshold
+            ]
+        if self.score_gap is None:
+            return nodes
+
+        for position in range(max(self.min_k, 1), len(nodes)):
+            previous, current = nodes[position - 1].score, nodes[position].score
+            if previous is None or current is None:
+                break
+            if previous - current > self.score_gap:
+                return nodes[:position]
+        return nodes
+
+
+def load_adaptive_top_k(
+    platform_name: str | None, summary: bool = False
+) -> AdaptiveTopK | None:
+    """
+    the adaptive top k configured for a platform's collections
+
+    the `QDRANT_ADAPTIVE_TOP_K` env variable holds them as a JSON object
+    keyed by the platform name, or `<platform_name>_summary` for its summaries
+    i.e. `{"discord": {"min_k": 5, "max_k": 50, "score_threshold": 0.3,
+    "score_gap": 0.1}, "discord_summary": {"max_k": 100, "score_gap": 0.05}}`
+
+    Parameters
+    ------------
+    platform_name : str | None
+        the platform name, i.e. `discord`
+    summary : bool
+        to load the config of the platform's summary collection
+
+    Returns
+    ---------
+    adaptive_top_k : AdaptiveTopK | None
+        the configured adaptive top k, None to retrieve a fixed top k
+    """
+    return _load_platform_config(
+        "QDRANT_ADAPTIVE_TOP_K", AdaptiveTopK, platform_name, summary
+    )
 
 
 class QDrantUtils:
@@ -32,3 +303,151 @@ class QDrantUtils:
         collection_name = f"{self.community_id}_{platform_name}"
         available = self.qdrant_client.collection_exists(collection_name)
         return available
+
+    def ensure_payload_indexes(
+        self,
+        platform_id: str,
+        metadata_date_key: str | None = None,
+        metadata_date_format: DataType | None = None,
+        with_summary: bool = False,
+    ) -> dict[str, list[str]]:
+        """
+        create the payload indexes the retrieval filters use on a platform's collections
+        a range index on the raw data date key and a keyword index
+        on the summaries' `type`, leaving the available ones as they are
+
+        Parameters
+        ------------
+        platform_id : str
+            the platform id the collections are named after
+        metadata_date_key : str | None
+            the date field of the raw data
+        metadata_date_format : DataType | None
+            the type of the raw data date
+        with_summary : bool
+            to index the platform's `_summary` collection too
+
+        Returns
+        ---------
+        created : dict[str, list[str]]
+            the created indexes' fields of each collection
+        """
+        collection_name = f"{self.community_id}_{platform_id}"
+        indexes: dict[str, dict[str, models.PayloadSchemaType]] = {}
+        if metadata_date_key is not None and metadata_date_format in DATE_PAYLOAD_SCHEMA:
+            indexes[collection_name] = {
+                metadata_date_key: DATE_PAYLOAD_SCHEMA[metadata_date_format]
+            }
+        if with_summary:
+            indexes[f"{collection_name}_summary"] = {
+                "type": models.PayloadSchemaType.KEYWORD
+            }
+
+        return {
+            name: ensure_collection_indexes(self.qdrant_client, name, fields)
+            for name, fields in indexes.items()
+        }
+
+    def list_collections(self, platform_ids: list[str] | None = None) -> list[str]:
+        """
+        the community's collections, their raw and summary ones
+
+        Parameters
+        ------------
+        platform_ids : list[str] | None
+            the platforms to list the collections of
+            if None, all the community's collections would be listed
+
+        Returns
+        ---------
+        collection_names : list[str]
+            the sorted collection names
+        """
+        prefix = f"{self.community_id}_"
+        names = [
+            collection.name
+            for collection in self.qdrant_client.get_collections().collections
+            if collection.name.startswith(prefix)
+        ]
+        if platform_ids is not None:
+            selected = {f"{prefix}{platform_id}" for platform_id in platform_ids}
+            selected |= {f"{name}_summary" for name in selected}
+            names = [name for name in names if name in selected]
+        return sorted(names)
+
+    def quantize_collection(
+        self, collection_name: str, method: str, always_ram: bool = True
+    ) -> bool:
+        """
+        quantize a collection's vectors, moving the original ones to disk
+
+        the searches keep using the quantized vectors in memory
+        and re-score their candidates with the originals (see `load_search_params`)
+
+        Parameters
+        ------------
+        collection_name : str
+            the collection to quantize
+        method : str
+            either `scalar` (int8) or `binary`
+        always_ram : bool
+            keep the quantized vectors in memory
+
+        Returns
+        ---------
+        updated : bool
+            if the collection update was accepted
+        """
+        if method == "scalar":
+            quantization_config = models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8, quantile=0.99, always_ram=always_ram
+                )
+            )
+        elif method == "binary":
+            quantization_config = models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=always_ram)
+            )
+        else:
+            raise ValueError(f"No such `{method}` quantization method available!")
+
+        vectors = self.qdrant_client.get_collection(
+            collection_name
+        ).config.params.vectors
+        # llama-index's hybrid collections name their dense vectors
+        vector_names = list(vectors.keys()) if isinstance(vectors, dict) else [""]
+        return self.qdrant_client.update_collection(
+            collection_name=collection_name,
+            vectors_config={
+                name: models.VectorParamsDiff(on_disk=True) for name in vector_names
+            },
+            quantization_config=quantization_config,
+        )
+
+    def estimate_vector_memory(
+        self, collection_name: str, method: str | None = None
+    ) -> float:
+        """
+        estimate the memory the collection's vectors take, in MB
+
+        Parameters
+        ------------
+        collection_name : str
+            the collection to estimate for
+        method : str | None
+            the quantization the collection would have, `scalar` or `binary`
+            if None, the original float32 vectors are held in memory
+
+        Returns
+        ---------
+        memory_mb : float
+            the vectors' memory, excluding the HNSW graph and the payloads
+        """
+        info = self.qdrant_client.get_collection(collection_name)
+        vectors = info.config.params.vectors
+        dimensions = sum(
+            params.size
+            for params in (vectors.values() if isinstance(vectors, dict) else [vectors])
+        )
+        bytes_per_dimension = {None: 4, "scalar": 1, "binary": 1 / 8}[method]
+        return (info.points_count or 0) * dimensions * bytes_per_dimension / 1024**2
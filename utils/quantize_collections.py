@@ -0,0 +1,259 @@
+"""
+quantize a community's qdrant collections, keeping the original vectors on disk
+for the searches to re-score with, and report the vectors' memory saved
+and the recall@k and latency changes on a sample of queries
+
+usage:
+    python -m utils.quantize_collections --community <community_id> --method scalar
+    python -m utils.quantize_collections --community <community_id> \
+        --platform <platform_id> --method binary --dry-run
+
+the sampled queries are the collection's own stored vectors, each searched
+without its own point, the recall is against the exact (brute force) search
+of the original vectors
+"""
+
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+from qdrant_client.http import models
+from utils.globals import QUANTIZATION_OVERSAMPLING
+from utils.qdrant_utils import QDrantUtils
+
+
+def sample_queries(
+    utils: QDrantUtils, collection_name: str, count: int
+) -> tuple[str | None, list[tuple[models.ExtendedPointId, list[float]]]]:
+    """
+    sample the stored dense vectors of a collection to query with
+
+    Returns
+    ---------
+    vector_name : str | None
+        the dense vector name, None for the unnamed ones
+    queries : list[tuple[models.ExtendedPointId, list[float]]]
+        the sampled points' ids and vectors
+    """
+    vectors = utils.qdrant_client.get_collection(collection_name).config.params.vectors
+    vector_name = next(iter(vectors)) if isinstance(vectors, dict) else None
+    points, _ = utils.qdrant_client.scroll(
+        collection_name,
+        limit=count,
+        with_payload=False,
+        with_vectors=[vector_name] if vector_name else True,
+    )
+    queries = [
+        (point.id, point.vector[vector_name] if vector_name else point.vector)
+        for point in points
+        if point.vector
+    ]
+    return vector_name, queries
+
+
+def search_neighbors(
+    utils: QDrantUtils,
+    collection_name: str,
+    vector_name: str | None,
+    query: tuple[models.ExtendedPointId, list[float]],
+    top_k: int,
+    params: models.SearchParams,
+) -> set:
+    """
+    the ids of a sampled point's nearest neighbors, the point itself excluded
+
+    a stored vector is always its own nearest neighbor,
+    counting it would inflate the recall of every search
+    """
+    point_id, vector = query
+    points = utils.qdrant_client.query_points(
+        collection_name,
+        query=vector,
+        using=vector_name,
+        query_filter=models.Filter(must_not=[models.HasIdCondition(has_id=[point_id])]),
+        limit=top_k,
+        search_params=params,
+        with_payload=False,
+    ).points
+    return {point.id for point in points}
+
+
+def measure_searches(
+    utils: QDrantUtils,
+    collection_name: str,
+    vector_name: str | None,
+    queries: list[tuple[models.ExtendedPointId, list[float]]],
+    ground_truth: list[set],
+    top_k: int,
+    params: models.SearchParams,
+) -> dict[str, float]:
+    """
+    the mean recall@k and the latencies of searching the queries with the params
+    """
+    recalls = []
+    latencies = []
+    for query, expected in zip(queries, ground_truth):
+        start = time.perf_counter()
+        ids = search_neighbors(
+            utils, collection_name, vector_name, query, top_k, params
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(ids & expected) / max(len(expected), 1))
+
+    return {
+        "recall": float(np.mean(recalls)) if recalls else 0.0,
+        "mean_ms": float(np.mean(latencies)) if latencies else 0.0,
+        "p95_ms": float(np.percentile(latencies, 95)) if latencies else 0.0,
+    }
+
+
+def wait_for_optimization(
+    utils: QDrantUtils, collection_name: str, timeout: float
+) -> bool:
+    """
+    wait for qdrant to finish building the collection's quantized vectors
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = utils.qdrant_client.get_collection(collection_name).status
+        if status == models.CollectionStatus.GREEN:
+            return True
+        time.sleep(1)
+    return False
+
+
+def quantize(
+    utils: QDrantUtils,
+    collection_name: str,
+    method: str,
+    sample_size: int,
+    top_k: int,
+    oversampling: float,
+    dry_run: bool = False,
+    timeout: float = 600,
+) -> dict:
+    """
+    quantize a collection and report the before and after memory and searches
+
+    Parameters
+    ------------
+    utils : QDrantUtils
+        the community's qdrant utils
+    collection_name : str
+        the collection to quantize
+    method : str
+        either `scalar` or `binary`
+    sample_size : int
+        the number of queries to sample
+    top_k : int
+        the k of recall@k
+    oversampling : float
+        the re-scored candidates' multiplier of the quantized searches
+    dry_run : bool
+        only report the memory estimates and the current searches
+    timeout : float
+        the seconds to wait for the quantization to be built
+
+    Returns
+    ---------
+    report : dict
+        the collection's memory and search measures
+    """
+    memory_before = utils.estimate_vector_memory(collection_name)
+    memory_after = utils.estimate_vector_memory(collection_name, method)
+    report: dict = {
+        "method": method,
+        "vectors_memory_mb": {
+            "before": memory_before,
+            "after": memory_after,
+            "saved": memory_before - memory_after,
+        },
+    }
+
+    vector_name, queries = sample_queries(utils, collection_name, sample_size)
+    exact = models.SearchParams(exact=True)
+    ground_truth = [
+        search_neighbors(utils, collection_name, vector_name, query, top_k, exact)
+        for query in queries
+    ]
+
+    report["before"] = measure_searches(
+        utils,
+        collection_name,
+        vector_name,
+        queries,
+        ground_truth,
+        top_k,
+        models.SearchParams(),
+    )
+    if dry_run:
+        return report
+
+    utils.quantize_collection(collection_name, method)
+    if not wait_for_optimization(utils, collection_name, timeout):
+        logging.warning(
+            f"`{collection_name}` is still optimizing after {timeout}s, "
+            "the measures may not reflect the quantized searches!"
+        )
+
+    report["after"] = measure_searches(
+        utils,
+        collection_name,
+        vector_name,
+        queries,
+        ground_truth,
+        top_k,
+        models.SearchParams(
+            quantization=models.QuantizationSearchParams(
+                rescore=True, oversampling=oversampling
+            )
+        ),
+    )
+    report["change"] = {
+        measure: report["after"][measure] - report["before"][measure]
+        for measure in report["before"]
+    }
+    return report
+
+
+def main(args: argparse.Namespace) -> dict:
+    utils = QDrantUtils(args.community)
+    collection_names = utils.list_collections(args.platform)
+    if not collection_names:
+        logging.warning(f"No collections found for community {args.community}!")
+
+    return {
+        collection_name: quantize(
+            utils,
+            collection_name,
+            method=args.method,
+            sample_size=args.sample_queries,
+            top_k=args.top_k,
+            oversampling=args.oversampling,
+            dry_run=args.dry_run,
+            timeout=args.timeout,
+        )
+        for collection_name in collection_names
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--community", required=True)
+    parser.add_argument(
+        "--platform",
+        action="append",
+        help="the platform ids to quantize, all the community's if not given",
+    )
+    parser.add_argument("--method", choices=["scalar", "binary"], default="scalar")
+    parser.add_argument("--sample-queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--oversampling", type=float, default=QUANTIZATION_OVERSAMPLING)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    print(json.dumps(main(args), indent=2))
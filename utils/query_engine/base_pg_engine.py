@@ -4,7 +4,7 @@ from llama_index.core import VectorStoreIndex, get_response_synthesizer
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.query_engine import RetrieverQueryEngine
 from tc_hivemind_backend.embeddings import CohereEmbedding
-from tc_hivemind_backend.pg_vector_access import PGVectorAccess
+from utils.pg_engines import load_pooled_index
 
 
 class BasePGEngine:
@@ -69,11 +69,10 @@ class BasePGEngine:
         else:
             embed_model = CohereEmbedding()
 
-        pg_vector = PGVectorAccess(
+        # the connections are pooled per database, shared by all the queries
+        index = load_pooled_index(
             table_name=table_name,
             dbname=dbname,
-            testing=testing,
             embed_model=embed_model,
         )
-        index = pg_vector.load_index()
         return index
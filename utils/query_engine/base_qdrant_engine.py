@@ -1,10 +1,16 @@
 from llama_index.core import Settings, get_response_synthesizer
 from llama_index.core.query_engine import BaseQueryEngine
 
+from utils.qdrant_utils import load_adaptive_top_k, load_search_params
+from utils.query_engine.context_packer import load_token_budget
+
 from .dual_qdrant_retrieval_engine import DualQdrantRetrievalEngine
 
 
 class BaseQdrantEngine:
+    # the platform name, to load its configured search params and adaptive top k
+    platform_name: str | None = None
+
     def __init__(self, platform_id: str, community_id: str) -> None:
         """
         initialize the qdrant db engine to query the database related to a community
@@ -31,6 +37,9 @@ class BaseQdrantEngine:
             platform_id=self.platform_id,
             community_id=self.community_id,
             enable_answer_skipping=enable_answer_skipping,
+            search_params=load_search_params(self.platform_name),
+            adaptive_top_k=load_adaptive_top_k(self.platform_name),
+            token_budget=load_token_budget(self.platform_name),
         )
 
         return engine
@@ -0,0 +1,193 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.schema import NodeWithScore
+from qdrant_client.http import models
+from utils.query_engine.combined_qdrant_retriever import (
+    CombinedQdrantRetriever,
+    is_dense_qdrant_index,
+)
+from utils.query_engine.dual_qdrant_retrieval_engine import DualQdrantRetrievalEngine
+
+# a search to run: the retriever asking for it, the index to search,
+# the query embedding, the top k and the filter (or a filter per group)
+SearchTask = tuple[
+    CombinedQdrantRetriever,
+    VectorStoreIndex,
+    list[float],
+    int,
+    models.Filter | list[models.Filter] | None,
+]
+
+
+def batch_search(tasks: list[SearchTask]) -> list[list[NodeWithScore]]:
+    """
+    run the searches with one `search_batch` request per collection
+
+    qdrant batches the searches of a single collection,
+    so the requests of different collections are sent concurrently
+
+    Parameters
+    ------------
+    tasks : list[SearchTask]
+        the searches, each as the retriever (defining the payload to fetch),
+        the index, the query embedding, the top k nodes to retrieve
+        and the qdrant filter to apply, or a list of filters to search
+        each as a group of top k nodes
+
+    Returns
+    ---------
+    results : list[list[NodeWithScore]]
+        the retrieved nodes of each search, in the order of the tasks
+    """
+    # the positions of the tasks searching each collection
+    groups: dict[tuple[int, str], list[int]] = {}
+    for position, (_, index, _, _, _) in enumerate(tasks):
+        vector_store = index.vector_store
+        key = (id(vector_store.client), vector_store.collection_name)
+        groups.setdefault(key, []).append(position)
+
+    def search_collection(positions: list[int]) -> list[list[NodeWithScore]]:
+        vector_store = tasks[positions[0]][1].vector_store
+        requests: list[models.SearchRequest] = []
+        # the requests of each task, as their range within the batch
+        spans: list[tuple[int, int]] = []
+        for position in positions:
+            retriever, index, embedding, top_k, filter = tasks[position]
+            start = len(requests)
+            requests.extend(
+                retriever.search_requests(index, embedding, top_k, filter)
+            )
+            spans.append((start, len(requests)))
+        responses = vector_store.client.search_batch(
+            collection_name=vector_store.collection_name, requests=requests
+        )
+        results = []
+        for position, (start, end) in zip(positions, spans):
+            retriever, index, _, _, filter = tasks[position]
+            results.append(
+                retriever.parse_responses(index, filter, responses[start:end])
+            )
+        return results
+
+    results: list[list[NodeWithScore]] = [[] for _ in tasks]
+    if not groups:
+        return results
+
+    with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+        for positions, nodes in zip(
+            groups.values(), executor.map(search_collection, groups.values())
+        ):
+            for position, retrieved in zip(positions, nodes):
+                results[position] = retrieved
+
+    return results
+
+
+def _supports_batching(retriever: CombinedQdrantRetriever) -> bool:
+    indexes = [retriever.raw_index]
+    if retriever.has_summary:
+        indexes.append(retriever.summary_index)
+    return all(is_dense_qdrant_index(index) for index in indexes)
+
+
+def prefetch_nodes(queries: list[tuple[BaseQueryEngine, str]]) -> int:
+    """
+    retrieve the nodes of the queries ahead with batched qdrant searches
+
+    instead of each engine searching its collections on its own,
+    the summary searches of all queries are sent at once, and after
+    reranking them and extracting their dates, the raw searches too.
+    The retrieved nodes are kept on the engines to be used
+    once each one is queried with the same query
+
+    Parameters
+    ------------
+    queries : list[tuple[BaseQueryEngine, str]]
+        the query engines and the query each one would be asked
+        the engines other than `DualQdrantRetrievalEngine` are skipped
+
+    Returns
+    ---------
+    prefetched_count : int
+        the number of queries having their nodes prefetched
+    """
+    targets: list[tuple[DualQdrantRetrievalEngine, CombinedQdrantRetriever, str]] = []
+    seen: set[tuple[int, str]] = set()
+    for engine, query in queries:
+        if not isinstance(engine, DualQdrantRetrievalEngine):
+            continue
+        retriever = engine.retriever
+        if not isinstance(retriever, CombinedQdrantRetriever):
+            continue
+        if not _supports_batching(retriever):
+            continue
+        if (id(engine), query) in seen:
+            continue
+        seen.add((id(engine), query))
+        targets.append((engine, retriever, query))
+
+    if not targets:
+        return 0
+
+    # the raw and summary collections share the embedding model
+    # so each query is embedded once for both stages
+    embeddings: dict[tuple[int, str], list[float]] = {}
+
+    def embed(index: VectorStoreIndex, query: str) -> list[float]:
+        key = (id(index._embed_model), query)
+        if key not in embeddings:
+            embeddings[key] = index._embed_model.get_query_embedding(query)
+        return embeddings[key]
+
+    summary_targets = [target for target in targets if target[1].has_summary]
+    summary_results = batch_search(
+        [
+            (
+                retriever,
+                retriever.summary_index,
+                embed(retriever.summary_index, query),
+                retriever.summary_top_k,
+                retriever.build_summary_filter(),
+            )
+            for _, retriever, query in summary_targets
+        ]
+    )
+    summary_nodes: dict[tuple[int, str], list[NodeWithScore]] = {}
+    for (engine, _, query), nodes in zip(summary_targets, summary_results):
+        summary_nodes[(id(engine), query)] = engine._rerank_nodes(query, nodes)
+
+    raw_tasks: list[SearchTask] = []
+    # the summary nodes of each target, None if it would run a basic query
+    target_summaries: list[list[NodeWithScore] | None] = []
+    for engine, retriever, query in targets:
+        nodes = summary_nodes.get((id(engine), query))
+        dates = engine.summary_dates(nodes) if nodes else []
+        if not dates:
+            # the same as the engine's basic query mode
+            nodes = None
+        target_summaries.append(nodes)
+        day_filters = retriever.build_day_filters(dates) if dates else []
+        raw_tasks.append(
+            (
+                retriever,
+                retriever.raw_index,
+                embed(retriever.raw_index, query),
+                retriever.expansion_group_size if day_filters else retriever.raw_top_k,
+                day_filters or retriever.build_raw_filter(dates),
+            )
+        )
+
+    raw_results = batch_search(raw_tasks)
+    for (engine, _, query), nodes, raw_nodes in zip(
+        targets, target_summaries, raw_results
+    ):
+        engine.prefetched_nodes[query] = (nodes, raw_nodes)
+
+    logging.info(
+        f"Prefetched the nodes of {len(targets)} queries with batched searches "
+        f"({len(summary_targets)} summary searches, {len(raw_tasks)} raw searches)"
+    )
+    return len(targets)
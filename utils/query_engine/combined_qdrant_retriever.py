@@ -1,20 +1,112 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import json
+from typing import Any, Optional
 
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
 from llama_index.core import VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.indices.vector_store.retrievers.retriever import (
     VectorIndexRetriever,
 )
 from llama_index.core.retrievers import BaseRetriever
-from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
 
 from schema.type import DataType
-from utils.globals import EXCLUDED_DATE_MARGIN
+from utils.globals import (
+    DAY_GROUPED_EXPANSION_DAYS,
+    DAY_GROUPED_EXPANSION_SIZE,
+    EXCLUDED_DATE_MARGIN,
+    NODE_MMR_PRUNING,
+    QDRANT_DAY_GROUPED_EXPANSION,
+    QDRANT_PAYLOAD_PROJECTION,
+)
+from utils.qdrant_utils import AdaptiveTopK, get_async_qdrant_client
 from utils.query_engine.qdrant_query_engine_utils import QdrantEngineUtils
 
 
+def is_dense_qdrant_index(index: VectorStoreIndex) -> bool:
+    """
+    whether the index is a qdrant collection searched by its dense vectors only
+    hybrid collections search named dense and sparse vectors, left to llama-index
+    """
+    vector_store = index.vector_store
+    return isinstance(vector_store, QdrantVectorStore) and not vector_store.enable_hybrid
+
+
+def points_to_nodes(
+    vector_store: QdrantVectorStore, points: list[Any]
+) -> list[NodeWithScore]:
+    """
+    convert the qdrant search results into the scored nodes
+    """
+    query_result = vector_store.parse_to_query_result(points)
+    return [
+        NodeWithScore(node=node, score=score)
+        for node, score in zip(query_result.nodes, query_result.similarities)
+    ]
+
+
+# llama-index keeps the node's text within the serialized `_node_content`,
+# while the top-level metadata fields are just duplicates of it
+PROJECTED_PAYLOAD_FIELDS = ["_node_content", "text"]
+# the metadata used by the prompt builders and the answer sources
+PROJECTED_METADATA_KEYS = ["date", "url", "author", "type"]
+
+
+def projected_points_to_nodes(
+    points: list[Any], metadata_keys: list[str]
+) -> list[NodeWithScore]:
+    """
+    convert the qdrant search results with projected payloads into the scored nodes
+
+    Parameters
+    ------------
+    points : list[Any]
+        the scored points having the `PROJECTED_PAYLOAD_FIELDS` payload
+    metadata_keys : list[str]
+        the metadata fields to keep on the nodes
+
+    Returns
+    ---------
+    nodes : list[NodeWithScore]
+        the nodes with their text and only the given metadata fields
+    """
+    nodes: list[NodeWithScore] = []
+    for point in points:
+        payload = point.payload or {}
+        node_id = str(point.id)
+        if "_node_content" in payload:
+            content = json.loads(payload["_node_content"])
+            node_id = content.get("id_") or node_id
+            text = content.get("text") or ""
+            metadata = content.get("metadata") or {}
+        else:
+            text = payload.get("text") or ""
+            metadata = payload
+
+        node = TextNode(
+            id_=node_id,
+            text=text,
+            metadata={key: metadata[key] for key in metadata_keys if key in metadata},
+        )
+        nodes.append(NodeWithScore(node=node, score=point.score))
+    return nodes
+
+
+async def aembed_query(embed_model: BaseEmbedding, query_str: str) -> list[float]:
+    """
+    embed the query, on a thread if the model has no async implementation
+    """
+    try:
+        return await embed_model.aget_query_embedding(query_str)
+    except NotImplementedError:
+        return await asyncio.to_thread(embed_model.get_query_embedding, query_str)
+
+
 class CombinedQdrantRetriever(BaseRetriever):
     def __init__(
         self,
@@ -30,6 +122,16 @@ class CombinedQdrantRetriever(BaseRetriever):
         date_margin: int = EXCLUDED_DATE_MARGIN,
         enable_answer_skipping: bool = False,
         summary_type: str | None = None,
+        async_client: AsyncQdrantClient | None = None,
+        payload_projection: bool = QDRANT_PAYLOAD_PROJECTION,
+        search_params: Optional[models.SearchParams] = None,
+        summary_search_params: Optional[models.SearchParams] = None,
+        adaptive_top_k: Optional[AdaptiveTopK] = None,
+        summary_adaptive_top_k: Optional[AdaptiveTopK] = None,
+        day_grouped_expansion: bool = QDRANT_DAY_GROUPED_EXPANSION,
+        expansion_days: int = DAY_GROUPED_EXPANSION_DAYS,
+        expansion_group_size: int = DAY_GROUPED_EXPANSION_SIZE,
+        fetch_vectors: bool = NODE_MMR_PRUNING,
     ) -> None:
         """
         Prepare the combined retriever
@@ -65,6 +167,43 @@ class CombinedQdrantRetriever(BaseRetriever):
         summary_type : str, optional
             Optional label describing the type of the summary collection.
             Default is None meaning no filter is applied to the summary index.
+        async_client : AsyncQdrantClient, optional
+            The client used by the async retrievals. Default is None meaning
+            the client shared within the running event loop.
+        payload_projection : bool, optional
+            If True, fetch only the text and the metadata fields used to answer
+            (`PROJECTED_METADATA_KEYS` and the date keys) instead of the whole
+            payload. Default is `QDRANT_PAYLOAD_PROJECTION`.
+        search_params : models.SearchParams, optional
+            The search params (i.e. `hnsw_ef`, `exact`, quantization
+            `rescore`/`oversampling`) for the raw index. Default is None
+            meaning the server defaults.
+        summary_search_params : models.SearchParams, optional
+            The search params for the summary index. Default is None
+            meaning the server defaults.
+        adaptive_top_k : AdaptiveTopK, optional
+            Retrieve the raw nodes up to its `max_k` instead of `raw_top_k`,
+            stopping at its score threshold and score gap. Default is None
+            meaning always `raw_top_k` nodes.
+        summary_adaptive_top_k : AdaptiveTopK, optional
+            The adaptive top k of the summary index. Default is None
+            meaning always `summary_top_k` nodes.
+        day_grouped_expansion : bool, optional
+            If True, `retrieve_raw_with_dates` fetches up to
+            `expansion_group_size` raw nodes of each of the first
+            `expansion_days` summary days, all within one batched request,
+            instead of `raw_top_k` nodes around the dates.
+            Default is `QDRANT_DAY_GROUPED_EXPANSION`.
+        expansion_days : int, optional
+            The most relevant summary days to expand.
+            Default is `DAY_GROUPED_EXPANSION_DAYS`.
+        expansion_group_size : int, optional
+            The raw nodes fetched per summary day.
+            Default is `DAY_GROUPED_EXPANSION_SIZE`.
+        fetch_vectors : bool, optional
+            If True, the dense searches fetch the points' vectors too,
+            set as the nodes' embeddings (i.e. for the MMR pruning).
+            Default is `NODE_MMR_PRUNING`.
         """
         super().__init__()
         self.raw_index = raw_index
@@ -78,6 +217,16 @@ class CombinedQdrantRetriever(BaseRetriever):
         self.date_margin = date_margin
         self.enable_answer_skipping = enable_answer_skipping
         self.summary_type = summary_type
+        self.async_client = async_client
+        self.payload_projection = payload_projection
+        self.search_params = search_params
+        self.summary_search_params = summary_search_params
+        self.adaptive_top_k = adaptive_top_k
+        self.summary_adaptive_top_k = summary_adaptive_top_k
+        self.day_grouped_expansion = day_grouped_expansion
+        self.expansion_days = expansion_days
+        self.expansion_group_size = expansion_group_size
+        self.fetch_vectors = fetch_vectors
 
     @property
     def has_summary(self) -> bool:
@@ -86,66 +235,319 @@ class CombinedQdrantRetriever(BaseRetriever):
     def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
         # Default behavior: raw retrieval, with cutoff filter if configured
         filter = self._build_cutoff_filter()
-        retriever = self._build_raw_retriever(filter=filter, top_k=self.raw_top_k)
-        return retriever.retrieve(query_bundle.query_str)
+        return self._search(
+            self.raw_index, query_bundle.query_str, self.raw_top_k, filter
+        )
 
     def retrieve_summary(self, query_str: str) -> list[NodeWithScore]:
         if not self.has_summary:
             return []
         assert self.summary_index is not None
         assert self.summary_top_k is not None
+        return self._search(
+            self.summary_index,
+            query_str,
+            self.summary_top_k,
+            self.build_summary_filter(),
+        )
 
-        if self.summary_type is not None:
-            filter = models.Filter(
-                must=[
-                    models.FieldCondition(key="type", match=models.MatchValue(value=self.summary_type))
-                ]
+    def retrieve_raw_with_dates(self, query_str: str, dates: list[str | float]) -> list[NodeWithScore]:
+        if self.metadata_date_key is None or self.metadata_date_format is None:
+            return self.retrieve(query_str)
+        day_filters = self.build_day_filters(dates)
+        if day_filters:
+            vector_store = self.raw_index.vector_store
+            embedding = self.raw_index._embed_model.get_query_embedding(query_str)
+            responses = vector_store.client.search_batch(
+                collection_name=vector_store.collection_name,
+                requests=self.search_requests(
+                    self.raw_index, embedding, self.expansion_group_size, day_filters
+                ),
             )
+            return self.parse_responses(self.raw_index, day_filters, responses)
 
-            retriever = self.summary_index.as_retriever(
-                vector_store_kwargs={"qdrant_filters": filter},
-                similarity_top_k=self.summary_top_k
-            )
+        filter = self.build_raw_filter(dates)
+        return self._search(self.raw_index, query_str, self.raw_top_k, filter)
+
+    def _search(
+        self,
+        index: VectorStoreIndex,
+        query_str: str,
+        top_k: int,
+        filter: Optional[models.Filter],
+    ) -> list[NodeWithScore]:
+        limit, score_threshold = self.search_limits(index, top_k)
+        if not is_dense_qdrant_index(index):
+            retriever = self._build_retriever(index, filter=filter, top_k=limit)
+            return self.cut_nodes(index, retriever.retrieve(query_str))
+
+        vector_store = index.vector_store
+        embedding = index._embed_model.get_query_embedding(query_str)
+        points = vector_store.client.search(
+            collection_name=vector_store.collection_name,
+            query_vector=embedding,
+            limit=limit,
+            query_filter=filter,
+            search_params=self.search_params_for(index),
+            with_payload=self.payload_selector(),
+            with_vectors=self.fetch_vectors,
+            score_threshold=score_threshold,
+        )
+        return self.cut_nodes(index, self.to_nodes(vector_store, points))
+
+    def search_params_for(self, index: VectorStoreIndex) -> Optional[models.SearchParams]:
+        """
+        the search params of the raw or the summary index
+        """
+        if index is self.summary_index:
+            return self.summary_search_params
+        return self.search_params
+
+    def adaptive_top_k_for(self, index: VectorStoreIndex) -> Optional[AdaptiveTopK]:
+        """
+        the adaptive top k of the raw or the summary index
+        """
+        if index is self.summary_index:
+            return self.summary_adaptive_top_k
+        return self.adaptive_top_k
+
+    def search_limits(
+        self, index: VectorStoreIndex, top_k: int
+    ) -> tuple[int, Optional[float]]:
+        """
+        the limit and the score threshold to search the index with
+        """
+        adaptive_top_k = self.adaptive_top_k_for(index)
+        if adaptive_top_k is None:
+            return top_k, None
+        return adaptive_top_k.max_k, adaptive_top_k.score_threshold
+
+    def cut_nodes(
+        self, index: VectorStoreIndex, nodes: list[NodeWithScore]
+    ) -> list[NodeWithScore]:
+        """
+        cut the nodes retrieved from the index at its adaptive top k
+        """
+        adaptive_top_k = self.adaptive_top_k_for(index)
+        if adaptive_top_k is None:
+            return nodes
+        return adaptive_top_k.cut(nodes)
+
+    def search_requests(
+        self,
+        index: VectorStoreIndex,
+        embedding: list[float],
+        top_k: int,
+        filter: models.Filter | list[models.Filter] | None,
+    ) -> list[models.SearchRequest]:
+        """
+        the qdrant requests of a search on the index
+
+        Parameters
+        ------------
+        index : VectorStoreIndex
+            the raw or the summary index to search
+        embedding : list[float]
+            the query embedding
+        top_k : int
+            the nodes to retrieve, within each group for the grouped searches
+        filter : models.Filter | list[models.Filter] | None
+            the search filter, or a filter per group (i.e. the `build_day_filters`)
+            each group is searched on its own with `top_k` as its size
+
+        Returns
+        ---------
+        requests : list[models.SearchRequest]
+            one request per group, or a single one
+        """
+        if isinstance(filter, list):
+            limit, score_threshold = top_k, None
+            filters = filter
         else:
-            retriever = self.summary_index.as_retriever(
-                similarity_top_k=self.summary_top_k
+            limit, score_threshold = self.search_limits(index, top_k)
+            filters = [filter]
+
+        return [
+            models.SearchRequest(
+                vector=embedding,
+                limit=limit,
+                filter=group_filter,
+                params=self.search_params_for(index),
+                with_payload=self.payload_selector(),
+                with_vector=self.fetch_vectors,
+                score_threshold=score_threshold,
             )
-        return retriever.retrieve(query_str)
+            for group_filter in filters
+        ]
 
-    def retrieve_raw_with_dates(self, query_str: str, dates: list[str | float]) -> list[NodeWithScore]:
-        if self.metadata_date_key is None or self.metadata_date_format is None:
-            return self.retrieve(query_str)
+    def parse_responses(
+        self,
+        index: VectorStoreIndex,
+        filter: models.Filter | list[models.Filter] | None,
+        responses: list[list[Any]],
+    ) -> list[NodeWithScore]:
+        """
+        convert the responses of the `search_requests` into the scored nodes
+        the groups' nodes are merged in order of their scores
+        """
+        vector_store = index.vector_store
+        if not isinstance(filter, list):
+            return self.cut_nodes(index, self.to_nodes(vector_store, responses[0]))
+
+        points = sorted(
+            (point for group in responses for point in group),
+            key=lambda point: point.score,
+            reverse=True,
+        )
+        return self.to_nodes(vector_store, points)
+
+    def build_day_filters(self, dates: list[str | float]) -> list[models.Filter]:
+        """
+        the filters of the summary days to expand with their raw data
+        an empty list if the day grouped expansion is not applicable
+        """
+        if (
+            not self.day_grouped_expansion
+            or self.metadata_date_key is None
+            or self.metadata_date_format is None
+            or not is_dense_qdrant_index(self.raw_index)
+        ):
+            return []
         utils = QdrantEngineUtils(
             metadata_date_key=self.metadata_date_key,
             metadata_date_format=self.metadata_date_format,
             date_margin=self.date_margin,
         )
-        filter = utils.define_raw_data_filters(dates)
-        retriever = self._build_raw_retriever(filter=filter, top_k=self.raw_top_k)
-        return retriever.retrieve(query_str)
+        return utils.define_day_filters(dates, max_days=self.expansion_days)
 
-    def _build_raw_retriever(
-        self, *, filter: Optional[models.Filter], top_k: int
-    ) -> VectorIndexRetriever:
-        if filter is not None:
-            return self.raw_index.as_retriever(
-                vector_store_kwargs={"qdrant_filters": filter},
-                similarity_top_k=top_k,
+    def payload_selector(self) -> bool | models.PayloadSelectorInclude:
+        """
+        the payload fields to fetch with the searches
+        """
+        if not self.payload_projection:
+            return True
+        return models.PayloadSelectorInclude(include=PROJECTED_PAYLOAD_FIELDS)
+
+    def to_nodes(
+        self, vector_store: QdrantVectorStore, points: list[Any]
+    ) -> list[NodeWithScore]:
+        """
+        convert the points of a search with `payload_selector` into the scored nodes
+        """
+        if not self.payload_projection:
+            nodes = points_to_nodes(vector_store, points)
+        else:
+            metadata_keys = list(PROJECTED_METADATA_KEYS)
+            for key in [self.metadata_date_key, self.metadata_date_summary_key]:
+                if key is not None and key not in metadata_keys:
+                    metadata_keys.append(key)
+            nodes = projected_points_to_nodes(points, metadata_keys)
+
+        if self.fetch_vectors:
+            for node, point in zip(nodes, points):
+                # the unnamed dense vectors only, the named ones are hybrid
+                if isinstance(point.vector, list):
+                    node.node.embedding = point.vector
+        return nodes
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        filter = self._build_cutoff_filter()
+        return await self._asearch(
+            self.raw_index, query_bundle.query_str, self.raw_top_k, filter
+        )
+
+    async def aretrieve_summary(self, query_str: str) -> list[NodeWithScore]:
+        if not self.has_summary:
+            return []
+        assert self.summary_index is not None
+        assert self.summary_top_k is not None
+        return await self._asearch(
+            self.summary_index,
+            query_str,
+            self.summary_top_k,
+            self.build_summary_filter(),
+        )
+
+    async def aretrieve_raw_with_dates(
+        self, query_str: str, dates: list[str | float]
+    ) -> list[NodeWithScore]:
+        if self.metadata_date_key is None or self.metadata_date_format is None:
+            return await self.aretrieve(query_str)
+        day_filters = self.build_day_filters(dates)
+        if day_filters:
+            embedding = await aembed_query(self.raw_index._embed_model, query_str)
+            client = self.async_client or get_async_qdrant_client()
+            responses = await client.search_batch(
+                collection_name=self.raw_index.vector_store.collection_name,
+                requests=self.search_requests(
+                    self.raw_index, embedding, self.expansion_group_size, day_filters
+                ),
             )
-        return self.raw_index.as_retriever(similarity_top_k=top_k)
+            return self.parse_responses(self.raw_index, day_filters, responses)
+        return await self._asearch(
+            self.raw_index, query_str, self.raw_top_k, self.build_raw_filter(dates)
+        )
 
-    def _build_cutoff_filter(self) -> Optional[models.Filter]:
-        # Safety cutoff to exclude very recent messages from raw retrieval
+    async def _asearch(
+        self,
+        index: VectorStoreIndex,
+        query_str: str,
+        top_k: int,
+        filter: Optional[models.Filter],
+    ) -> list[NodeWithScore]:
+        limit, score_threshold = self.search_limits(index, top_k)
+        if not is_dense_qdrant_index(index):
+            retriever = self._build_retriever(index, filter=filter, top_k=limit)
+            nodes = await asyncio.to_thread(retriever.retrieve, query_str)
+            return self.cut_nodes(index, nodes)
+
+        vector_store = index.vector_store
+        embedding = await aembed_query(index._embed_model, query_str)
+        client = self.async_client or get_async_qdrant_client()
+        points = await client.search(
+            collection_name=vector_store.collection_name,
+            query_vector=embedding,
+            limit=limit,
+            query_filter=filter,
+            search_params=self.search_params_for(index),
+            with_payload=self.payload_selector(),
+            with_vectors=self.fetch_vectors,
+            score_threshold=score_threshold,
+        )
+        return self.cut_nodes(index, self.to_nodes(vector_store, points))
+
+    def build_summary_filter(self) -> Optional[models.Filter]:
+        # filter the summary index on its type, if given
+        if self.summary_type is None:
+            return None
+        return models.Filter(
+            must=[
+                models.FieldCondition(key="type", match=models.MatchValue(value=self.summary_type))
+            ]
+        )
+
+    def build_raw_filter(self, dates: list[str | float]) -> Optional[models.Filter]:
+        # the raw data around the given dates, always applying the global cutoff
         if self.metadata_date_key is None or self.metadata_date_format is None:
             return None
-        # Delegate to QdrantEngineUtils with an empty date list and only cutoff
-        # Note: define_raw_data_filters always includes a global cutoff must-filter
         utils = QdrantEngineUtils(
             metadata_date_key=self.metadata_date_key,
             metadata_date_format=self.metadata_date_format,
             date_margin=self.date_margin,
         )
-        # An empty list yields only the global cutoff
-        return utils.define_raw_data_filters(dates=[])
+        return utils.define_raw_data_filters(dates)
 
+    def _build_retriever(
+        self, index: VectorStoreIndex, *, filter: Optional[models.Filter], top_k: int
+    ) -> VectorIndexRetriever:
+        if filter is not None:
+            return index.as_retriever(
+                vector_store_kwargs={"qdrant_filters": filter},
+                similarity_top_k=top_k,
+            )
+        return index.as_retriever(similarity_top_k=top_k)
 
+    def _build_cutoff_filter(self) -> Optional[models.Filter]:
+        # Safety cutoff to exclude very recent messages from raw retrieval
+        # An empty list yields only the global cutoff
+        return self.build_raw_filter(dates=[])
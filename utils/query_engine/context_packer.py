@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Callable
+
+from dotenv import load_dotenv
+from llama_index.core.schema import NodeWithScore
+from utils.globals import (
+    CONTEXT_MAX_NODE_TOKENS,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_TOKEN_ENCODING,
+)
+from utils.model_cache import get_token_encoding
+
+
+@lru_cache(maxsize=None)
+def _parse_token_budgets(config: str) -> dict[str, int]:
+    try:
+        return {name: int(budget) for name, budget in json.loads(config).items()}
+    except Exception as exp:
+        logging.error(f"Invalid `CONTEXT_TOKEN_BUDGETS`, using the default! exp: {exp}")
+        return {}
+
+
+def load_token_budget(platform_name: str | None) -> int:
+    """
+    the prompt context token budget configured for a platform
+
+    the `CONTEXT_TOKEN_BUDGETS` env variable holds them as a JSON object
+    keyed by the platform name, i.e. `{"discord": 6000, "github": 12000}`
+
+    Parameters
+    ------------
+    platform_name : str | None
+        the platform name, i.e. `discord`
+
+    Returns
+    ---------
+    token_budget : int
+        the configured budget, `CONTEXT_TOKEN_BUDGET` for the ones not given
+    """
+    load_dotenv()
+    config = os.getenv("CONTEXT_TOKEN_BUDGETS")
+    if platform_name is None or not config:
+        return CONTEXT_TOKEN_BUDGET
+    return _parse_token_budgets(config).get(platform_name, CONTEXT_TOKEN_BUDGET)
+
+
+class ContextPacker:
+    def __init__(
+        self,
+        token_budget: int,
+        max_node_tokens: int = CONTEXT_MAX_NODE_TOKENS,
+        min_node_tokens: int = 32,
+        encoding: Any | None = None,
+    ) -> None:
+        """
+        fill the prompt context with the nodes' texts up to a token budget
+
+        the nodes are taken in the order given (i.e. reranked), the longer
+        ones are cut and the ones not fitting the remaining budget are dropped.
+        Packing several node lists (i.e. the summaries and then the raw nodes)
+        shares the same budget
+
+        Parameters
+        ------------
+        token_budget : int
+            the context tokens to fill
+        max_node_tokens : int
+            the tokens a single node can take, the longer ones are cut
+        min_node_tokens : int
+            a node is only cut to fit the remaining budget
+            if at least this many of its tokens could be kept
+        encoding : tiktoken.Encoding | None
+            the encoding to count the tokens with
+            if None, the `CONTEXT_TOKEN_ENCODING` would be used
+        """
+        self.token_budget = token_budget
+        self.max_node_tokens = max_node_tokens
+        self.min_node_tokens = min_node_tokens
+        self.encoding = encoding
+
+        self.packed_tokens = 0
+        self.dropped_tokens = 0
+        self.dropped_nodes = 0
+        self.truncated_nodes = 0
+
+    @property
+    def remaining_tokens(self) -> int:
+        return max(self.token_budget - self.packed_tokens, 0)
+
+    def pack(
+        self,
+        nodes: list[NodeWithScore],
+        max_tokens: int | None = None,
+        node_overhead: Callable[[NodeWithScore], str] | None = None,
+    ) -> tuple[list[NodeWithScore], list[NodeWithScore]]:
+        """
+        pack the nodes into the remaining budget
+
+        Parameters
+        ------------
+        nodes : list[NodeWithScore]
+            the nodes to pack, the most relevant first
+        max_tokens : int | None
+            the most tokens these nodes can take of the remaining budget
+        node_overhead : Callable[[NodeWithScore], str] | None
+            the text rendered along each node within the prompt (i.e. its metadata lines)
+            counted against the budget too, but never cut
+
+        Returns
+        ---------
+        prompt_nodes : list[NodeWithScore]
+            the packed nodes to build the prompt with, the cut ones as copies
+        kept_nodes : list[NodeWithScore]
+            the given nodes having (part of) their text packed, i.e. the answer sources
+        """
+        if not nodes:
+            return [], []
+
+        encoding = self._load_encoding()
+        if encoding is None:
+            return nodes, nodes
+
+        budget = self.remaining_tokens
+        if max_tokens is not None:
+            budget = min(budget, max_tokens)
+
+        prompt_nodes: list[NodeWithScore] = []
+        kept_nodes: list[NodeWithScore] = []
+        texts = [node.node.get_content() for node in nodes]
+        overheads = [0] * len(nodes)
+        if node_overhead is not None:
+            overheads = [
+                len(tokens)
+                for tokens in encoding.encode_ordinary_batch(
+                    [node_overhead(node) for node in nodes]
+                )
+            ]
+        for node, tokens, overhead in zip(
+            nodes, encoding.encode_ordinary_batch(texts), overheads
+        ):
+            allowed = min(self.max_node_tokens, budget - overhead)
+            if len(tokens) <= allowed:
+                prompt_nodes.append(node)
+            elif allowed >= self.min_node_tokens:
+                text = encoding.decode(tokens[:allowed])
+                prompt_nodes.append(
+                    NodeWithScore(
+                        node=node.node.copy(update={"text": text}), score=node.score
+                    )
+                )
+                self.truncated_nodes += 1
+                self.dropped_tokens += len(tokens) - allowed
+            else:
+                self.dropped_nodes += 1
+                self.dropped_tokens += len(tokens)
+                continue
+
+            packed = min(len(tokens), allowed) + overhead
+            budget -= packed
+            self.packed_tokens += packed
+            kept_nodes.append(node)
+
+        return prompt_nodes, kept_nodes
+
+    def metadata(self) -> dict[str, int]:
+        """
+        the packing measures, to be included within the response metadata
+        """
+        return {
+            "token_budget": self.token_budget,
+            "packed_tokens": self.packed_tokens,
+            "dropped_tokens": self.dropped_tokens,
+            "dropped_nodes": self.dropped_nodes,
+            "truncated_nodes": self.truncated_nodes,
+        }
+
+    def _load_encoding(self) -> Any | None:
+        if self.encoding is None:
+            try:
+                self.encoding = get_token_encoding(CONTEXT_TOKEN_ENCODING)
+            except Exception as exp:
+                # answering with the whole context is better than not answering
+                logging.error(
+                    f"Couldn't load the `{CONTEXT_TOKEN_ENCODING}` encoding, "
+                    f"the context is not packed! exp: {exp}"
+                )
+        return self.encoding
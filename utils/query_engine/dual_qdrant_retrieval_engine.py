@@ -1,23 +1,35 @@
+import asyncio
 import logging
 from utils.globals import (
+    CONTEXT_TOKEN_BUDGET,
     K1_RETRIEVER_SEARCH,
     K2_RETRIEVER_SEARCH,
     D_RETRIEVER_SEARCH,
-    RERANK_TOP_K
+    NODE_MMR_PRUNING,
+    NODE_MMR_TOP_K,
+    NODE_NEAR_DUPLICATE_PRUNING,
+    RERANK_TOP_K,
+    SUMMARY_CONTEXT_SHARE,
 )
 from sentence_transformers import CrossEncoder
 from llama_index.core import PromptTemplate, VectorStoreIndex
 from llama_index.core.base.response.schema import Response
+from llama_index.core.bridge.pydantic import Field
 from llama_index.core.query_engine import CustomQueryEngine
 from llama_index.core.response_synthesizers import BaseSynthesizer
 from llama_index.core.retrievers import BaseRetriever
 from llama_index.core.schema import NodeWithScore
 from llama_index.llms.openai import OpenAI
+from qdrant_client.http import models
 from schema.type import DataType
 from tc_hivemind_backend.qdrant_vector_access import QDrantVectorAccess
+from utils.qdrant_utils import AdaptiveTopK, QDrantUtils
 from utils.query_engine.qa_prompt import qa_prompt
 from utils.query_engine.combined_qdrant_retriever import CombinedQdrantRetriever
+from utils.query_engine.context_packer import ContextPacker
+from utils.query_engine.node_pruning import prune_nodes
 from utils.query_engine.qdrant_query_engine_utils import QdrantEngineUtils
+from utils.model_cache import get_cross_encoder
 
 
 class DualQdrantRetrievalEngine(CustomQueryEngine):
@@ -30,16 +42,49 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
     enable_reranking: bool = False
     reranker_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
     cross_encoder: CrossEncoder | None = None
+    # the prompt context tokens, the less relevant nodes are dropped to fit in
+    token_budget: int = CONTEXT_TOKEN_BUDGET
+    # the retrieved nodes are pruned of their duplicates before reranking
+    near_duplicate_pruning: bool = NODE_NEAR_DUPLICATE_PRUNING
+    # the nodes kept by the MMR pruning, None to disable it
+    mmr_top_k: int | None = NODE_MMR_TOP_K if NODE_MMR_PRUNING else None
+    # nodes retrieved ahead by a batched search, keyed by the query
+    # the values are the reranked summary nodes (None for a basic query) and raw nodes
+    prefetched_nodes: dict[
+        str, tuple[list[NodeWithScore] | None, list[NodeWithScore]]
+    ] = Field(default_factory=dict)
 
     def custom_query(self, query_str: str):
+        prefetched = self.prefetched_nodes.pop(query_str, None)
+        if prefetched is not None:
+            summary_nodes, raw_nodes = prefetched
+            if summary_nodes is None:
+                return self._process_basic_query(query_str, nodes=raw_nodes)
+            return self._answer_with_summaries(query_str, summary_nodes, raw_nodes)
+
         retriever = self.retriever
         if isinstance(retriever, CombinedQdrantRetriever) and retriever.has_summary:
             return self._process_summary_query(query_str)
         return self._process_basic_query(query_str)
 
+    async def acustom_query(self, query_str: str):
+        prefetched = self.prefetched_nodes.pop(query_str, None)
+        if prefetched is not None:
+            summary_nodes, raw_nodes = prefetched
+            if summary_nodes is None:
+                return await self._aprocess_basic_query(query_str, nodes=raw_nodes)
+            return await self._aanswer_with_summaries(
+                query_str, summary_nodes, raw_nodes
+            )
+
+        retriever = self.retriever
+        if isinstance(retriever, CombinedQdrantRetriever) and retriever.has_summary:
+            return await self._aprocess_summary_query(query_str)
+        return await self._aprocess_basic_query(query_str)
+
     def _rerank_nodes(self, query_str: str, nodes: list[NodeWithScore]) -> list[NodeWithScore]:
         """
-        Rerank nodes using CrossEncoder model.
+        Prune the repeated and redundant nodes, then rerank them using CrossEncoder model.
         
         Parameters
         ----------
@@ -53,14 +98,18 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
         list[NodeWithScore]
             Reranked list of nodes
         """
+        nodes = prune_nodes(
+            nodes,
+            near_duplicates=self.near_duplicate_pruning,
+            mmr_top_k=self.mmr_top_k,
+        )
         if not self.enable_reranking or not nodes:
             return nodes
             
         try:
-            # Initialize CrossEncoder model once and reuse
+            # The CrossEncoder model is loaded once per process and shared
             if self.cross_encoder is None and self.enable_reranking:
-                logging.info("Initializing CrossEncoder reranker model once for reuse")
-                self.cross_encoder = CrossEncoder(self.reranker_model)
+                self.cross_encoder = get_cross_encoder(self.reranker_model)
             model = self.cross_encoder
             
             # Prepare query-document pairs for reranking
@@ -105,6 +154,9 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
         enable_reranking: bool = True,
         reranker_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
         rerank_top_k: int = RERANK_TOP_K,
+        search_params: models.SearchParams | None = None,
+        adaptive_top_k: AdaptiveTopK | None = None,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
     ):
         """
         Set up a query engine over Qdrant data without summaries.
@@ -134,6 +186,15 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
         rerank_top_k : int, optional
             Number of top nodes to keep after reranking. Default from
             `utils.globals.RERANK_TOP_K`.
+        search_params : models.SearchParams | None, optional
+            Qdrant search params (`hnsw_ef`, `exact`, quantization `rescore`
+            and `oversampling`) for the collection. Default None uses the
+            server defaults.
+        adaptive_top_k : AdaptiveTopK | None, optional
+            Retrieve up to its `max_k` nodes, stopping at its score threshold
+            and score gap. Default None retrieves `K2_RETRIEVER_SEARCH` nodes.
+        token_budget : int, optional
+            The prompt context tokens. Default from `utils.globals.CONTEXT_TOKEN_BUDGET`.
 
         Returns
         -------
@@ -156,6 +217,14 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
             metadata_date_summary_format=None,
             date_margin=D_RETRIEVER_SEARCH,
             enable_answer_skipping=enable_answer_skipping,
+            search_params=search_params,
+            adaptive_top_k=adaptive_top_k,
+        )
+        # the first engine of the collection within the process indexes its filters
+        QDrantUtils(community_id).ensure_payload_indexes(
+            platform_id=platform_id,
+            metadata_date_key=metadata_date_key,
+            metadata_date_format=metadata_date_format,
         )
 
         return cls(
@@ -166,6 +235,7 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
             enable_reranking=enable_reranking,
             reranker_model=reranker_model,
             rerank_top_k=rerank_top_k,
+            token_budget=token_budget,
         )
 
     @classmethod
@@ -184,6 +254,11 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
         enable_reranking: bool = True,
         reranker_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
         rerank_top_k: int = RERANK_TOP_K,
+        search_params: models.SearchParams | None = None,
+        summary_search_params: models.SearchParams | None = None,
+        adaptive_top_k: AdaptiveTopK | None = None,
+        summary_adaptive_top_k: AdaptiveTopK | None = None,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
     ):
         """
         Set up a query engine over Qdrant data with a summary index.
@@ -219,6 +294,23 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
         rerank_top_k : int, optional
             Number of top nodes to keep after reranking. Default from
             `utils.globals.RERANK_TOP_K`.
+        search_params : models.SearchParams | None, optional
+            Qdrant search params (`hnsw_ef`, `exact`, quantization `rescore`
+            and `oversampling`) for the raw collection. Default None uses the
+            server defaults.
+        summary_search_params : models.SearchParams | None, optional
+            Qdrant search params for the summary collection. Default None uses
+            the server defaults.
+        adaptive_top_k : AdaptiveTopK | None, optional
+            The adaptive top k of the raw collection. Default None retrieves
+            `K2_RETRIEVER_SEARCH` nodes.
+        summary_adaptive_top_k : AdaptiveTopK | None, optional
+            The adaptive top k of the summary collection. Default None
+            retrieves `K1_RETRIEVER_SEARCH` nodes.
+        token_budget : int, optional
+            The prompt context tokens, shared by the summaries (up to
+            `SUMMARY_CONTEXT_SHARE` of it) and the raw nodes. Default from
+            `utils.globals.CONTEXT_TOKEN_BUDGET`.
 
         Returns
         -------
@@ -248,6 +340,17 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
             date_margin=D_RETRIEVER_SEARCH,
             enable_answer_skipping=enable_answer_skipping,
             summary_type=summary_type,
+            search_params=search_params,
+            summary_search_params=summary_search_params,
+            adaptive_top_k=adaptive_top_k,
+            summary_adaptive_top_k=summary_adaptive_top_k,
+        )
+        # the first engine of the collections within the process indexes their filters
+        QDrantUtils(community_id).ensure_payload_indexes(
+            platform_id=platform_id,
+            metadata_date_key=metadata_date_key,
+            metadata_date_format=metadata_date_format,
+            with_summary=True,
         )
 
         return cls(
@@ -258,6 +361,7 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
             enable_reranking=enable_reranking,
             reranker_model=reranker_model,
             rerank_top_k=rerank_top_k,
+            token_budget=token_budget,
         )
 
     @classmethod
@@ -277,11 +381,65 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
         index = qdrant_vector.load_index()
         return index
 
-    def _process_basic_query(self, query_str: str) -> Response:
+    def summary_dates(self, summary_nodes: list[NodeWithScore]) -> list[str | float]:
+        """
+        the dates of the given summary nodes, used to filter the raw data
+        """
+        combined = self.retriever
+        if (
+            not isinstance(combined, CombinedQdrantRetriever)
+            or combined.metadata_date_summary_key is None
+        ):
+            return []
+        return [
+            node.metadata[combined.metadata_date_summary_key]
+            for node in summary_nodes
+            if combined.metadata_date_summary_key in node.metadata
+        ]
+
+    def _process_basic_query(
+        self, query_str: str, nodes: list[NodeWithScore] | None = None
+    ) -> Response:
         logging.info("=== BASIC QUERY MODE ===")
 
         # Delegate to retriever (combined retriever applies cutoff internally)
-        nodes: list[NodeWithScore] = self.retriever.retrieve(query_str)
+        if nodes is None:
+            nodes = self.retriever.retrieve(query_str)
+        prompt, nodes, packing = self._prepare_basic_prompt(query_str, nodes)
+        response = self.llm.complete(prompt)
+
+        logging.info("=== BASIC QUERY MODE COMPLETED ===")
+
+        # return final_response
+        return Response(
+            response=str(response),
+            source_nodes=nodes,
+            metadata={"context_packing": packing},
+        )
+
+    async def _aprocess_basic_query(
+        self, query_str: str, nodes: list[NodeWithScore] | None = None
+    ) -> Response:
+        logging.info("=== BASIC QUERY MODE (ASYNC) ===")
+
+        if nodes is None:
+            nodes = await self.retriever.aretrieve(query_str)
+        # the reranking is cpu-bound, keeping the event loop free for other questions
+        prompt, nodes, packing = await asyncio.to_thread(
+            self._prepare_basic_prompt, query_str, nodes
+        )
+        response = await self.llm.acomplete(prompt)
+
+        logging.info("=== BASIC QUERY MODE (ASYNC) COMPLETED ===")
+        return Response(
+            response=str(response),
+            source_nodes=nodes,
+            metadata={"context_packing": packing},
+        )
+
+    def _prepare_basic_prompt(
+        self, query_str: str, nodes: list[NodeWithScore]
+    ) -> tuple[str, list[NodeWithScore], dict[str, int]]:
         logging.info(f"Retrieved {len(nodes)} nodes with cutoff filter applied")
 
         # Apply reranking if enabled
@@ -289,14 +447,11 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
 
         logging.info(f"Filtered to {len(nodes)} nodes Using cross encoder reranking")
 
-        context_str = "\n\n".join([n.node.get_content() for n in nodes])
+        packer = ContextPacker(self.token_budget)
+        prompt_nodes, nodes = packer.pack(nodes)
+        context_str = "\n\n".join([n.node.get_content() for n in prompt_nodes])
         prompt = self.qa_prompt.format(context_str=context_str, query_str=query_str)
-        response = self.llm.complete(prompt)
-
-        logging.info("=== BASIC QUERY MODE COMPLETED ===")
-
-        # return final_response
-        return Response(response=str(response), source_nodes=nodes)
+        return prompt, nodes, packer.metadata()
 
     def _process_summary_query(self, query_str: str) -> Response:
         logging.info("=== SUMMARY QUERY MODE ===")
@@ -308,19 +463,82 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
         # Apply reranking to summary nodes if enabled
         summary_nodes = self._rerank_nodes(query_str, summary_nodes)
 
-        dates = []
-        if combined.metadata_date_summary_key is not None:
-            dates = [
-                node.metadata[combined.metadata_date_summary_key]
-                for node in summary_nodes
-                if combined.metadata_date_summary_key in node.metadata
-            ]
-
+        dates = self.summary_dates(summary_nodes)
         if not dates:
             logging.info("No dates found in summary nodes, proceeding to basic query")
             return self._process_basic_query(query_str)
 
         raw_nodes = combined.retrieve_raw_with_dates(query_str, dates)
+        return self._answer_with_summaries(query_str, summary_nodes, raw_nodes)
+
+    async def _aprocess_summary_query(self, query_str: str) -> Response:
+        logging.info("=== SUMMARY QUERY MODE (ASYNC) ===")
+        combined = self.retriever
+        assert isinstance(combined, CombinedQdrantRetriever)
+        summary_nodes = await combined.aretrieve_summary(query_str)
+        summary_nodes = await asyncio.to_thread(
+            self._rerank_nodes, query_str, summary_nodes
+        )
+
+        dates = self.summary_dates(summary_nodes)
+        if not dates:
+            logging.info("No dates found in summary nodes, proceeding to basic query")
+            return await self._aprocess_basic_query(query_str)
+
+        raw_nodes = await combined.aretrieve_raw_with_dates(query_str, dates)
+        return await self._aanswer_with_summaries(query_str, summary_nodes, raw_nodes)
+
+    def _answer_with_summaries(
+        self,
+        query_str: str,
+        summary_nodes: list[NodeWithScore],
+        raw_nodes: list[NodeWithScore],
+    ) -> Response:
+        prompt, raw_nodes, packing = self._prepare_summary_prompt(
+            query_str, summary_nodes, raw_nodes
+        )
+        response = self.llm.complete(prompt)
+
+        logging.info("=== SUMMARY QUERY MODE COMPLETED ===")
+        return Response(
+            response=str(response),
+            source_nodes=raw_nodes,
+            metadata={
+                "summary_nodes": summary_nodes,
+                "context_packing": packing,
+            },
+        )
+
+    async def _aanswer_with_summaries(
+        self,
+        query_str: str,
+        summary_nodes: list[NodeWithScore],
+        raw_nodes: list[NodeWithScore],
+    ) -> Response:
+        prompt, raw_nodes, packing = await asyncio.to_thread(
+            self._prepare_summary_prompt, query_str, summary_nodes, raw_nodes
+        )
+        response = await self.llm.acomplete(prompt)
+
+        logging.info("=== SUMMARY QUERY MODE (ASYNC) COMPLETED ===")
+        return Response(
+            response=str(response),
+            source_nodes=raw_nodes,
+            metadata={
+                "summary_nodes": summary_nodes,
+                "context_packing": packing,
+            },
+        )
+
+    def _prepare_summary_prompt(
+        self,
+        query_str: str,
+        summary_nodes: list[NodeWithScore],
+        raw_nodes: list[NodeWithScore],
+    ) -> tuple[str, list[NodeWithScore], dict[str, int]]:
+        # the summary nodes are already reranked, as their dates filtered the raw nodes
+        combined = self.retriever
+        assert isinstance(combined, CombinedQdrantRetriever)
         logging.info(f"Retrieved {len(raw_nodes)} raw nodes")
 
         # Apply reranking to raw nodes if enabled
@@ -334,19 +552,33 @@ class DualQdrantRetrievalEngine(CustomQueryEngine):
             metadata_date_format=combined.metadata_date_format,
             date_margin=combined.date_margin,
         )
+        # the summaries take up to their share, leaving the rest to the raw nodes
+        # each with the header lines of its day's section counted too
+        packer = ContextPacker(self.token_budget)
+        summary_days = dict(
+            zip(map(id, summary_nodes), utils_helper.summary_days(summary_nodes))
+        )
+        prompt_summary_nodes, _ = packer.pack(
+            summary_nodes,
+            max_tokens=int(self.token_budget * SUMMARY_CONTEXT_SHARE),
+            node_overhead=lambda node: utils_helper.summary_header(
+                summary_days[id(node)]
+            )
+            + "\n\nRaw Messages:\n",
+        )
+        # a raw node is only rendered under its day's summary
+        packed_days = set(utils_helper.summary_days(prompt_summary_nodes))
+        raw_days = utils_helper.to_utc_day_strings(
+            [node.metadata.get(combined.metadata_date_key) for node in raw_nodes]
+        )
+        prompt_raw_nodes, raw_nodes = packer.pack(
+            [node for node, day in zip(raw_nodes, raw_days) if day in packed_days],
+            node_overhead=lambda node: "\n",
+        )
         context_str = utils_helper.combine_nodes_for_prompt(
-            summary_nodes, raw_nodes
+            prompt_summary_nodes, prompt_raw_nodes
         )
         prompt = self.qa_prompt.format(context_str=context_str, query_str=query_str)
         # TODO: remove this after testing
         # logging.error(f"Prompt: {prompt}")
-        response = self.llm.complete(prompt)
-
-        logging.info("=== SUMMARY QUERY MODE COMPLETED ===")
-        return Response(
-            response=str(response),
-            source_nodes=raw_nodes,
-            metadata={
-                "summary_nodes": summary_nodes,
-            },
-        )
+        return prompt, raw_nodes, packer.metadata()
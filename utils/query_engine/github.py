@@ -1,11 +1,15 @@
 from llama_index.core import Settings, get_response_synthesizer
 from llama_index.core.query_engine import BaseQueryEngine
 from schema.type import DataType
+from utils.qdrant_utils import load_adaptive_top_k, load_search_params
+from utils.query_engine.context_packer import load_token_budget
 from utils.query_engine import DualQdrantRetrievalEngine
 from utils.query_engine.base_qdrant_engine import BaseQdrantEngine
 
 
 class GitHubQueryEngine(BaseQdrantEngine):
+    platform_name = "github"
+
     def __init__(self, community_id: str, platform_id: str = None) -> None:
         # If no platform_id provided, use default collection name for backward compatibility
         platform_id = platform_id or "github"
@@ -29,5 +33,10 @@ class GitHubDualQueryEngine:
             metadata_date_summary_key="date",
             metadata_date_summary_format=DataType.FLOAT,
             enable_answer_skipping=enable_answer_skipping,
+            search_params=load_search_params("github"),
+            adaptive_top_k=load_adaptive_top_k("github"),
+            token_budget=load_token_budget("github"),
+            summary_search_params=load_search_params("github", summary=True),
+            summary_adaptive_top_k=load_adaptive_top_k("github", summary=True),
         )
         return engine
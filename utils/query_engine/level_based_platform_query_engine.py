@@ -14,8 +14,13 @@ from llama_index.core.response_synthesizers import (
 from llama_index.core.retrievers import BaseRetriever
 from llama_index.core.schema import NodeWithScore
 from llama_index.llms.openai import OpenAI
-from utils.globals import REFERENCE_SCORE_THRESHOLD, RETRIEVER_THRESHOLD
+from utils.globals import (
+    REFERENCE_SCORE_THRESHOLD,
+    RETRIEVER_THRESHOLD,
+    SUMMARY_CONTEXT_SHARE,
+)
 from utils.query_engine.base_pg_engine import BasePGEngine
+from utils.query_engine.context_packer import ContextPacker, load_token_budget
 from utils.query_engine.level_based_platforms_util import LevelBasedPlatformUtils
 from utils.query_engine.qa_prompt import qa_prompt
 
@@ -52,8 +57,12 @@ class LevelBasedPlatformQueryEngine(CustomQueryEngine):
                 " Returning empty response"
             )
         else:
+            packer = ContextPacker(self._token_budget)
+            prompt_summary_nodes, prompt_nodes, similar_nodes_filtered = (
+                self._pack_context(packer, similar_nodes_filtered)
+            )
             context_str = self._prepare_context_str(
-                raw_nodes=similar_nodes_filtered, summary_nodes=None
+                raw_nodes=prompt_nodes, summary_nodes=prompt_summary_nodes
             )
             fmt_qa_prompt = qa_prompt.format(
                 context_str=context_str, query_str=query_str
@@ -61,7 +70,11 @@ class LevelBasedPlatformQueryEngine(CustomQueryEngine):
             response = self.llm.complete(fmt_qa_prompt)
             logging.debug(f"fmt_qa_prompt:\n{fmt_qa_prompt}")
 
-        return Response(response=str(response), source_nodes=similar_nodes_filtered)
+        return Response(
+            response=str(response),
+            source_nodes=similar_nodes_filtered,
+            metadata={"context_packing": packer.metadata()},
+        )
 
     @classmethod
     def prepare_platform_engine(
@@ -116,6 +129,9 @@ class LevelBasedPlatformQueryEngine(CustomQueryEngine):
             enable_answer_skipping : bool
                 skip answering questions with non-relevant retrieved nodes
                 having this, it could provide `None` for response and source_nodes
+            token_budget : int
+                the prompt context tokens, shared by the summaries and the raw nodes
+                default is the one configured for the platform
 
 
         Returns
@@ -155,6 +171,9 @@ class LevelBasedPlatformQueryEngine(CustomQueryEngine):
         cls._raw_vector_store = index._vector_store
 
         cls._similarity_top_k = K2_RETRIEVER_SEARCH
+        cls._token_budget = kwargs.get(
+            "token_budget", load_token_budget(platform_table_name)
+        )
         cls._filters = filters
         cls._summary_nodes_filters = summary_nodes_filters
 
@@ -287,6 +306,78 @@ class LevelBasedPlatformQueryEngine(CustomQueryEngine):
         )
         return engine
 
+    def _fetch_summary_nodes(self) -> list[NodeWithScore]:
+        """
+        the summaries of the raw nodes' days
+        Note: `self._summary_nodes_filters` must be set before
+        """
+        retriever = RetrieveSimilarNodes(
+            self._summary_vector_store,
+            similarity_top_k=None,
+        )
+        return retriever.query_db(
+            query="",
+            filters=self._summary_nodes_filters,
+            aggregate_records=True,
+            ignore_sort=True,
+            group_by_metadata=[self._level1_key, self._date_key, self._level2_key],
+            date_interval=self._d,
+        )
+
+    def _pack_context(
+        self, packer: ContextPacker, raw_nodes: list[NodeWithScore]
+    ) -> tuple[list[NodeWithScore], list[NodeWithScore], list[NodeWithScore]]:
+        """
+        pack the raw nodes and their summaries into the token budget,
+        counting the metadata lines rendered along each of them
+
+        a raw node is only rendered under its day's summary, so the summaries
+        of the most relevant raw nodes take up to their `SUMMARY_CONTEXT_SHARE`
+        of the budget first, and the raw nodes having their summary packed the rest
+
+        Returns
+        ---------
+        prompt_summary_nodes : list[NodeWithScore]
+            the packed summaries to build the prompt with
+        prompt_nodes : list[NodeWithScore]
+            the packed raw nodes to build the prompt with, the cut ones as copies
+        source_nodes : list[NodeWithScore]
+            the given raw nodes packed, i.e. the answer sources
+        """
+        utils = self._utils_class
+
+        summaries: dict[tuple, list[NodeWithScore]] = {}
+        for node in self._fetch_summary_nodes():
+            summaries.setdefault(utils.node_group(node), []).append(node)
+        # in the order of their most relevant raw node
+        ordered_summaries: list[NodeWithScore] = []
+        for group in dict.fromkeys(utils.node_group(node) for node in raw_nodes):
+            ordered_summaries.extend(summaries.get(group, []))
+
+        prompt_summary_nodes, _ = packer.pack(
+            ordered_summaries,
+            max_tokens=int(self._token_budget * SUMMARY_CONTEXT_SHARE),
+            node_overhead=lambda node: utils.summary_context(
+                *utils.node_group(node), summary=""
+            )
+            + "\n",
+        )
+
+        packed_groups = {utils.node_group(node) for node in prompt_summary_nodes}
+        candidates = [
+            node for node in raw_nodes if utils.node_group(node) in packed_groups
+        ]
+        # a node's position is at least its index within its group
+        positions = {id(node): idx for idx, node in enumerate(candidates)}
+        prompt_nodes, source_nodes = packer.pack(
+            candidates,
+            node_overhead=lambda node: utils.message_header(
+                node, positions[id(node)], prefix="  "
+            )
+            + "\n",
+        )
+        return prompt_summary_nodes, prompt_nodes, source_nodes
+
     def _prepare_context_str(
         self, raw_nodes: list[NodeWithScore], summary_nodes: list[NodeWithScore] | None
     ) -> str:
@@ -304,19 +395,7 @@ class LevelBasedPlatformQueryEngine(CustomQueryEngine):
                 nodes=raw_nodes
             )
         elif summary_nodes is None:
-            retriever = RetrieveSimilarNodes(
-                self._summary_vector_store,
-                similarity_top_k=None,
-            )
-            # Note: `self._summary_nodes_filters` must be set before
-            fetched_summary_nodes = retriever.query_db(
-                query="",
-                filters=self._summary_nodes_filters,
-                aggregate_records=True,
-                ignore_sort=True,
-                group_by_metadata=[self._level1_key, self._date_key, self._level2_key],
-                date_interval=self._d,
-            )
+            fetched_summary_nodes = self._fetch_summary_nodes()
             grouped_summary_nodes = self._utils_class.group_nodes_per_metadata(
                 fetched_summary_nodes
             )
@@ -19,24 +19,75 @@ class LevelBasedPlatformUtils:
         """
         context_str = "\n".join(
             [
-                prefix
-                + "author: "
-                + node.metadata["author_username"]
-                + "\n"
-                + prefix
-                + "message_date: "
-                + node.metadata["date"]
-                + "\n"
-                + prefix
-                + f"message {idx + 1}: "
-                + node.get_content()
-                + "\n"
+                self.message_header(node, idx, prefix) + node.get_content() + "\n"
                 for idx, node in enumerate(nodes)
             ]
         )
 
         return context_str
 
+    def message_header(self, node: NodeWithScore, idx: int, prefix: str = "") -> str:
+        """
+        the metadata lines rendered before a message's text within the prompt
+        """
+        return (
+            prefix
+            + "author: "
+            + node.metadata["author_username"]
+            + "\n"
+            + prefix
+            + "message_date: "
+            + node.metadata["date"]
+            + "\n"
+            + prefix
+            + f"message {idx + 1}: "
+        )
+
+    def summary_context(
+        self,
+        level1_title: str | None,
+        level2_title: str | None,
+        date: str,
+        summary: str,
+    ) -> str:
+        """
+        the lines rendered for a summary within the prompt, its messages following them
+        """
+        if level1_title is not None and level2_title is not None:
+            return (
+                f"{self.level1_key}: {level1_title}\n"
+                f"{self.level2_key}: {level2_title}\n"
+                f"{self.date_key}: {date}\n"
+                f"summary: {summary}\n"
+                "messages:\n"
+            )
+        elif level1_title is None:
+            # if it was None, then we would say it is the main level2_key
+            # e.g.: for the thread in discord we would say the main channel
+            return (
+                f"{self.level1_key}: Main {self.level2_key}\n"
+                f"{self.level2_key}: {level2_title}\n"
+                f"{self.date_key}: {date}\n"
+                f"summary: {summary}\n"
+                "messages:\n"
+            )
+        else:
+            # if it was None, then we would say it is the main level1_key
+            return (
+                f"{self.level1_key}: {level1_title}\n"
+                f"{self.level2_key}: Main {self.level1_key}\n"
+                f"{self.date_key}: {date}\n"
+                f"summary: {summary}\n"
+                "messages:\n"
+            )
+
+    def node_group(self, node: NodeWithScore) -> tuple[str | None, str | None, str]:
+        """
+        the `level1_key`, `level2_key` and the day of a node, grouping it with its summary
+        """
+        date = parser.parse(node.metadata[self.date_key]).strftime("%Y-%m-%d")
+        return node.metadata[self.level1_key], node.metadata[self.level2_key], date
+
     def group_nodes_per_metadata(
         self,
         nodes: list[NodeWithScore],
@@ -63,10 +114,7 @@ class LevelBasedPlatformUtils:
             str | None, dict[str | None, dict[str, list[NodeWithScore]]]
         ] = {}
         for node in nodes:
-            level1_title = node.metadata[self.level1_key]
-            level2_title = node.metadata[self.level2_key]
-            date_str = node.metadata[self.date_key]
-            date = parser.parse(date_str).strftime("%Y-%m-%d")
+            level1_title, level2_title, date = self.node_group(node)
 
             # defining an empty list (if keys weren't previously made)
             grouped_nodes.setdefault(level1_title, {}).setdefault(
@@ -123,33 +171,9 @@ class LevelBasedPlatformUtils:
                         )
                         summary_node = summary_nodes[0]
 
-                        if level1_title is not None and level2_title is not None:
-                            node_context = (
-                                f"{self.level1_key}: {level1_title}\n"
-                                f"{self.level2_key}: {level2_title}\n"
-                                f"{self.date_key}: {date}\n"
-                                f"summary: {summary_node.text}\n"
-                                "messages:\n"
-                            )
-                        elif level1_title is None:
-                            # if it was None, then we would say it is the main level2_key
-                            # e.g.: for the thread in discord we would say the main channel
-                            node_context = (
-                                f"{self.level1_key}: Main {self.level2_key}\n"
-                                f"{self.level2_key}: {level2_title}\n"
-                                f"{self.date_key}: {date}\n"
-                                f"summary: {summary_node.text}\n"
-                                "messages:\n"
-                            )
-                        elif level2_title is None:
-                            # if it was None, then we would say it is the main level1_key
-                            node_context = (
-                                f"{self.level1_key}: {level1_title}\n"
-                                f"{self.level2_key}: Main {self.level1_key}\n"
-                                f"{self.date_key}: {date}\n"
-                                f"summary: {summary_node.text}\n"
-                                "messages:\n"
-                            )
+                        node_context = self.summary_context(
+                            level1_title, level2_title, date, summary_node.text
+                        )
                         node_context += self.prepare_prompt_with_metadata_info(
                             raw_nodes, prefix="  "
                         )
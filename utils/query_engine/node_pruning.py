@@ -0,0 +1,219 @@
+import hashlib
+import logging
+import re
+from functools import lru_cache
+
+import numpy as np
+from llama_index.core.schema import NodeWithScore
+from utils.globals import NODE_MMR_LAMBDA, SIMHASH_MAX_DISTANCE
+
+SIMHASH_BITS = 64
+# the consecutive words hashed as a single feature
+SHINGLE_SIZE = 3
+
+
+def dedupe_nodes(nodes: list[NodeWithScore]) -> list[NodeWithScore]:
+    """
+    drop the repeated nodes by their id, keeping the first of each
+    """
+    seen: set[str] = set()
+    unique: list[NodeWithScore] = []
+    for node in nodes:
+        if node.node.node_id in seen:
+            continue
+        seen.add(node.node.node_id)
+        unique.append(node)
+    return unique
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    # the splitmix64 finalizer, spreading the combined word hashes over all the bits
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+@lru_cache(maxsize=2**16)
+def _word_hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+
+
+def simhash_fingerprints(texts: list[str]) -> np.ndarray:
+    """
+    the 64-bit simhash of each text over its word shingles
+
+    Parameters
+    ------------
+    texts : list[str]
+        the texts to fingerprint
+
+    Returns
+    ---------
+    fingerprints : np.ndarray
+        the `uint64` fingerprints, similar texts differing in a few bits
+    """
+    words = [re.findall(r"\w+", text.lower()) for text in texts]
+    lengths = np.array([len(text_words) for text_words in words], dtype=np.int64)
+    word_hashes = np.array(
+        [_word_hash(word) for text_words in words for word in text_words],
+        dtype=np.uint64,
+    )
+    if not len(word_hashes):
+        return np.zeros(len(texts), dtype=np.uint64)
+
+    # a shingle starts at each word, not crossing its text's end;
+    # the texts shorter than a shingle are a single one of their words
+    owners = np.repeat(np.arange(len(texts)), lengths)
+    positions = np.arange(len(word_hashes))
+    starts = np.cumsum(lengths) - lengths
+    ends = (starts + lengths)[owners]
+    is_shingle = positions - starts[owners] < np.maximum(
+        lengths - SHINGLE_SIZE + 1, 1
+    )[owners]
+    shingles = np.zeros(len(word_hashes), dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        indices = positions + offset
+        shingles = np.where(
+            indices < ends,
+            _mix(shingles ^ word_hashes[np.minimum(indices, len(word_hashes) - 1)]),
+            shingles,
+        )
+    shingles, owners = shingles[is_shingle], owners[is_shingle]
+
+    # each shingle votes for its set bits, the majority ones set in the simhash
+    bits = np.unpackbits(
+        shingles.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little"
+    )
+    counts = np.bincount(owners, minlength=len(texts))
+    has_words = counts > 0
+    set_bits = np.zeros((len(texts), SIMHASH_BITS), dtype=np.int64)
+    set_bits[has_words] = np.add.reduceat(
+        bits, (np.cumsum(counts) - counts)[has_words], axis=0, dtype=np.int64
+    )
+    majority = 2 * set_bits > counts[:, None]
+
+    packed = np.packbits(majority, axis=1, bitorder="little")
+    return packed.view(np.uint64).reshape(len(texts))
+
+
+def drop_near_duplicates(
+    nodes: list[NodeWithScore], max_distance: int = SIMHASH_MAX_DISTANCE
+) -> list[NodeWithScore]:
+    """
+    drop the nodes almost the same as a previous one (i.e. reposts, adjacent summaries)
+
+    Parameters
+    ------------
+    nodes : list[NodeWithScore]
+        the nodes, the most relevant first
+    max_distance : int
+        the most differing simhash bits of two near-duplicates
+
+    Returns
+    ---------
+    nodes : list[NodeWithScore]
+        the first node of each near-duplicate group, in order
+    """
+    if len(nodes) < 2:
+        return nodes
+
+    fingerprints = simhash_fingerprints([node.node.get_content() for node in nodes])
+    differing = fingerprints[:, None] ^ fingerprints[None, :]
+    distances = np.unpackbits(differing.view(np.uint8), axis=1).reshape(
+        len(nodes), len(nodes), SIMHASH_BITS
+    ).sum(axis=2)
+
+    # the nodes near a previous one, only these could be dropped
+    near = np.tril(distances <= max_distance, k=-1)
+    kept = np.ones(len(nodes), dtype=bool)
+    for position in np.flatnonzero(near.any(axis=1)):
+        if (near[position] & kept).any():
+            kept[position] = False
+    return [node for node, is_kept in zip(nodes, kept) if is_kept]
+
+
+def mmr_select(
+    nodes: list[NodeWithScore], top_k: int, mmr_lambda: float = NODE_MMR_LAMBDA
+) -> list[NodeWithScore]:
+    """
+    select the relevant yet diverse nodes with maximal marginal relevance
+
+    the relevance is the nodes' retrieval score (the query cosine similarity)
+    and the redundancy their embeddings' similarity to the selected ones
+
+    Parameters
+    ------------
+    nodes : list[NodeWithScore]
+        the nodes having their embeddings, else all are kept
+    top_k : int
+        the nodes to select
+    mmr_lambda : float
+        the relevance weight against the diversity
+
+    Returns
+    ---------
+    nodes : list[NodeWithScore]
+        the selected nodes, in the order of selection
+    """
+    if len(nodes) <= top_k:
+        return nodes
+    if any(node.node.embedding is None or node.score is None for node in nodes):
+        logging.debug("Skipping MMR, the nodes have no embeddings or scores!")
+        return nodes
+
+    embeddings = np.array([node.node.embedding for node in nodes], dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
+    similarities = embeddings @ embeddings.T
+    relevance = np.array([node.score for node in nodes], dtype=np.float32)
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarities[:, selected[0]].copy()
+    available = np.ones(len(nodes), dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < top_k:
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        scores[~available] = -np.inf
+        position = int(np.argmax(scores))
+        selected.append(position)
+        available[position] = False
+        np.maximum(redundancy, similarities[:, position], out=redundancy)
+
+    return [nodes[position] for position in selected]
+
+
+def prune_nodes(
+    nodes: list[NodeWithScore],
+    near_duplicates: bool = True,
+    mmr_top_k: int | None = None,
+    mmr_lambda: float = NODE_MMR_LAMBDA,
+) -> list[NodeWithScore]:
+    """
+    drop the repeated and redundant retrieved nodes before reranking them
+
+    Parameters
+    ------------
+    nodes : list[NodeWithScore]
+        the retrieved nodes, the most relevant first
+    near_duplicates : bool
+        drop the near-duplicate nodes too, not just the repeated ones
+    mmr_top_k : int | None
+        if given, select this many diverse nodes with MMR
+    mmr_lambda : float
+        the MMR relevance weight against the diversity
+
+    Returns
+    ---------
+    nodes : list[NodeWithScore]
+        the pruned nodes
+    """
+    pruned = dedupe_nodes(nodes)
+    if near_duplicates:
+        pruned = drop_near_duplicates(pruned)
+    if mmr_top_k is not None:
+        pruned = mmr_select(pruned, mmr_top_k, mmr_lambda)
+
+    if len(pruned) < len(nodes):
+        logging.info(f"Pruned {len(nodes)} nodes to {len(pruned)}")
+    return pruned
@@ -1,7 +1,7 @@
 import logging
 
 from llama_index.core.query_engine import SubQuestionAnswerPair
-from llama_index.core.schema import NodeWithScore
+from schema.workflow import NodeReference
 from utils.globals import REFERENCE_SCORE_THRESHOLD
 
 
@@ -55,32 +55,58 @@ class PrepareAnswerSources:
             logging.error("No reference nodes available! returning empty string.")
             return ""
 
-        # Flatten and sort nodes (descending by score)
-        all_nodes: list[NodeWithScore] = sorted(
-            (
-                node
-                for subq_node in nodes
-                if subq_node is not None
-                for node in subq_node.sources
-                if node.metadata.get("url")
-            ),
-            key=lambda x: x.score,
-            reverse=True,
-        )
+        # Flatten the nodes having a url
+        candidates = [
+            (node.score, node.metadata["url"])
+            for subq_node in nodes
+            if subq_node is not None
+            for node in subq_node.sources
+            if node.metadata.get("url")
+        ]
+        return self._format_sources(candidates)
+
+    def prepare_reference_sources(self, references: list[NodeReference]) -> str:
+        """
+        the same as `prepare_answer_sources`, for compact node references
+
+        Parameters
+        ----------
+        references : list[NodeReference]
+            the references of the nodes used for answering a question
+
+        Returns
+        -------
+        all_sources : str
+            the formatted string of numbered URLs,
+            empty if no reference was available or met the score threshold
+        """
+        if not references:
+            logging.error("No reference nodes available! returning empty string.")
+            return ""
+
+        candidates = [(ref.score, ref.url) for ref in references if ref.url]
+        return self._format_sources(candidates)
+
+    def _format_sources(self, candidates: list[tuple[float | None, str]]) -> str:
+        """
+        format the top unique urls among the (score, url) candidates
+        """
+        # Sort (descending by score)
+        sorted_candidates = sorted(candidates, key=lambda x: x[0], reverse=True)
 
         # De-duplicate URLs, and filter by score threshold
         seen_urls = set()
-        deduped_nodes = []
-        for node in all_nodes:
-            if node.score > self.threshold and node.metadata["url"] not in seen_urls:
-                deduped_nodes.append(node)
-                seen_urls.add(node.metadata["url"])
+        deduped_urls = []
+        for score, url in sorted_candidates:
+            if score > self.threshold and url not in seen_urls:
+                deduped_urls.append(url)
+                seen_urls.add(url)
 
         # Take only top references up to max_references
-        limited_nodes = deduped_nodes[: self.max_references]
+        limited_urls = deduped_urls[: self.max_references]
 
         # If nothing remains after filtering, return empty
-        if not limited_nodes:
+        if not limited_urls:
             logging.error(
                 f"All node scores are below threshold ({self.threshold}) "
                 "or no valid URLs. Returning empty string!"
@@ -89,7 +115,6 @@ class PrepareAnswerSources:
 
         # Format the sources
         sources_str = "\n".join(
-            f"[{idx + 1}] {node.metadata['url']}"
-            for idx, node in enumerate(limited_nodes)
+            f"[{idx + 1}] {url}" for idx, url in enumerate(limited_urls)
         )
         return f"Top References:\n{sources_str}"
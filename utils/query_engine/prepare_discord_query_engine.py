@@ -1,11 +1,15 @@
 from llama_index.core import Settings, get_response_synthesizer
 from llama_index.core.query_engine import BaseQueryEngine
 from schema.type import DataType
+from utils.qdrant_utils import load_adaptive_top_k, load_search_params
+from utils.query_engine.context_packer import load_token_budget
 from utils.query_engine import DualQdrantRetrievalEngine
 from utils.query_engine.base_qdrant_engine import BaseQdrantEngine
 
 
 class DiscordQueryEngine(BaseQdrantEngine):
+    platform_name = "discord"
+
     def __init__(self, community_id: str, platform_id: str | None = None) -> None:
         # If no platform_id provided, use default collection name for backward compatibility
         platform_id = platform_id or "discord"
@@ -26,6 +30,9 @@ class DiscordQueryEngine(BaseQdrantEngine):
             enable_answer_skipping=enable_answer_skipping,
             metadata_date_key="date",
             metadata_date_format=DataType.FLOAT,
+            search_params=load_search_params(self.platform_name),
+            adaptive_top_k=load_adaptive_top_k(self.platform_name),
+            token_budget=load_token_budget(self.platform_name),
         )
 
         return engine
@@ -48,6 +55,11 @@ class DiscordDualQueryEngine:
             metadata_date_summary_key="date",
             metadata_date_summary_format=DataType.STRING,
             enable_answer_skipping=enable_answer_skipping,
+            search_params=load_search_params("discord"),
+            adaptive_top_k=load_adaptive_top_k("discord"),
+            token_budget=load_token_budget("discord"),
+            summary_search_params=load_search_params("discord", summary=True),
+            summary_adaptive_top_k=load_adaptive_top_k("discord", summary=True),
             # Ignore searching on specific summaries and 
             # just search based on all available summaries
             # summary_type="day",
@@ -2,6 +2,7 @@ from collections import defaultdict
 from datetime import datetime, timedelta, timezone
 import logging
 
+import numpy as np
 from dateutil.parser import parse
 from llama_index.core.schema import NodeWithScore
 from qdrant_client.http import models
@@ -36,7 +37,6 @@ class QdrantEngineUtils:
             the filters to be applied on raw data
         """
         should_filters: list[models.FieldCondition] = []
-        expanded_dates: set[datetime] = set()
 
         # Calculate the cutoff timestamp for excluding recent messages
         # we want messages older than EXCLUDED_DATE_MARGIN minutes ago
@@ -46,38 +46,19 @@ class QdrantEngineUtils:
         )
         cutoff_timestamp = cutoff_datetime.timestamp()
 
-        # accounting for the date margin
-        for date in dates:
-            if isinstance(date, str):
-                # Ensure we parse the date in UTC timezone to match our cutoff
-                day_value = parse(date).replace(tzinfo=timezone.utc)
-            elif isinstance(date, float):
-                # if it was timestamp, convert to UTC
-                day_value = datetime.fromtimestamp(date, tz=timezone.utc)
-            else:
-                raise ValueError(f"Type {type(date)} date is not supported!")
-
-            expanded_dates.add(day_value)
-
-            for i in range(1, self.date_margin + 1):
-                expanded_dates.add(day_value - timedelta(days=i))
-                expanded_dates.add(day_value + timedelta(days=i))
-
-
-        for day_value in expanded_dates:
-            # Start of the day in UTC
-            day_start = day_value.replace(hour=0, minute=0, second=0, microsecond=0)
-            # Start of next day in UTC
-            next_day = day_start + timedelta(days=1)
+        for interval_start, interval_end in self.merge_date_intervals(dates):
+            if interval_start > cutoff_datetime:
+                # the intervals are sorted, the rest are after the cutoff too
+                break
 
             if self.metadata_date_format == DataType.INTEGER:
-                gte_value = int(day_start.timestamp())
+                gte_value = int(interval_start.timestamp())
                 # Ensure we don't include messages newer than the cutoff
-                lte_value = min(int(next_day.timestamp()), int(cutoff_timestamp))
+                lte_value = min(int(interval_end.timestamp()), int(cutoff_timestamp))
             elif self.metadata_date_format == DataType.FLOAT:
-                gte_value = day_start.timestamp()
+                gte_value = interval_start.timestamp()
                 # Ensure we don't include messages newer than the cutoff
-                lte_value = min(next_day.timestamp(), cutoff_timestamp)
+                lte_value = min(interval_end.timestamp(), cutoff_timestamp)
             else:
                 raise ValueError(
                     (
@@ -86,17 +67,15 @@ class QdrantEngineUtils:
                     )
                 )
 
-            # Only add the filter if the date range is valid (gte <= lte)
-            if gte_value <= lte_value:
-                should_filters.append(
-                    models.FieldCondition(
-                        key=self.metadata_date_key,
-                        range=models.Range(
-                            gte=gte_value,
-                            lte=lte_value,
-                        ),
-                    )
+            should_filters.append(
+                models.FieldCondition(
+                    key=self.metadata_date_key,
+                    range=models.Range(
+                        gte=gte_value,
+                        lte=lte_value,
+                    ),
                 )
+            )
 
         # Create the filter with both should conditions for date ranges
         # AND a global must condition as a safety net to ensure NO recent messages get through
@@ -121,6 +100,121 @@ class QdrantEngineUtils:
 
         return filter
 
+    def define_day_filters(
+        self, dates: list[str | float], max_days: int | None = None
+    ) -> list[models.Filter]:
+        """
+        define a filter per day of the given dates, to search each day's raw data
+        the days after the recent messages cutoff are skipped
+
+        Parameters
+        -----------
+        dates : list[str | float]
+            the dates as `%Y-%m-%d` strings or timestamps, in order of relevance
+        max_days : int | None
+            the most relevant days to define the filters for
+            if None, all the given days
+
+        Returns
+        ---------
+        filters : list[models.Filter]
+            the filters of the distinct days, in the order of the dates
+        """
+        cutoff_datetime = datetime.now(tz=timezone.utc) - timedelta(
+            minutes=EXCLUDED_DATE_MARGIN
+        )
+        days: list[datetime] = []
+        for date in dates:
+            day = self.to_utc_day(date)
+            if day in days or day > cutoff_datetime:
+                continue
+            days.append(day)
+            if max_days is not None and len(days) == max_days:
+                break
+
+        return [
+            models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key=self.metadata_date_key,
+                        range=models.Range(
+                            gte=self._to_date_value(day),
+                            lt=self._to_date_value(
+                                min(day + timedelta(days=1), cutoff_datetime)
+                            ),
+                        ),
+                    )
+                ]
+            )
+            for day in days
+        ]
+
+    def to_utc_day(self, date: str | float) -> datetime:
+        """
+        the UTC midnight of the day a `%Y-%m-%d` string or a timestamp is within
+        """
+        if isinstance(date, str):
+            # Ensure we parse the date in UTC timezone to match our cutoff
+            day_value = parse(date).replace(tzinfo=timezone.utc)
+        elif isinstance(date, float):
+            # if it was timestamp, convert to UTC
+            day_value = datetime.fromtimestamp(date, tz=timezone.utc)
+        else:
+            raise ValueError(f"Type {type(date)} date is not supported!")
+        return day_value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _to_date_value(self, date: datetime) -> int | float:
+        if self.metadata_date_format == DataType.INTEGER:
+            return int(date.timestamp())
+        elif self.metadata_date_format == DataType.FLOAT:
+            return date.timestamp()
+        raise ValueError(
+            (
+                "raw data metadata `date` shouldn't be anything other than FLOAT or INTEGER"
+                f"! The Current given one is: {self.metadata_date_format}"
+            )
+        )
+
+    def merge_date_intervals(
+        self, dates: list[str | float]
+    ) -> list[tuple[datetime, datetime]]:
+        """
+        expand each date by the date margin (in days) and merge the expanded days
+        into the smallest set of disjoint intervals
+
+        Parameters
+        -----------
+        dates : list[str | float]
+            the dates as `%Y-%m-%d` strings or timestamps, each representing a day
+
+        Returns
+        ---------
+        intervals : list[tuple[datetime, datetime]]
+            sorted `(start, end)` UTC intervals, the start being the first day's
+            midnight and the end being the midnight after the last day
+        """
+        # the expanded days of each date as (first, last) day ordinals
+        day_ranges: list[tuple[int, int]] = []
+        for date in dates:
+            day = self.to_utc_day(date).toordinal()
+            day_ranges.append((day - self.date_margin, day + self.date_margin))
+
+        merged: list[list[int]] = []
+        for first, last in sorted(day_ranges):
+            # a day range right after the previous one is contiguous with it
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+
+        return [
+            (
+                datetime.fromordinal(first).replace(tzinfo=timezone.utc),
+                datetime.fromordinal(last + 1).replace(tzinfo=timezone.utc),
+            )
+            for first, last in merged
+        ]
+
     def combine_nodes_for_prompt(
         self,
         summary_nodes: list[NodeWithScore],
@@ -133,57 +227,109 @@ class QdrantEngineUtils:
         ----------
         summary_nodes : list[NodeWithScore]
             list of summary nodes containing metadata with 'date' in "%Y-%m-%d" format
-            and 'text' field
+            (or a timestamp) and 'text' field
         raw_nodes : list[NodeWithScore]
-            list of raw nodes containing metadata with self.me as float timestamp
-            and 'text' field
+            list of raw nodes containing metadata with `self.metadata_date_key`
+            as a timestamp and 'text' field
 
         Returns
         -------
         prompt : str
             A formatted prompt combining matched summary and raw texts
         """
-        # Create a mapping of date to raw nodes for efficient lookup
-        raw_nodes_by_date: dict[str, list[NodeWithScore]] = {}
-
-        for raw_node in raw_nodes:
-            timestamp = raw_node.metadata[self.metadata_date_key]
-            date_str = (
-                datetime.fromtimestamp(timestamp)
-                .replace(tzinfo=timezone.utc)
-                .strftime("%Y-%m-%d")
-            )
-
-            if date_str not in raw_nodes_by_date:
-                raw_nodes_by_date[date_str] = []
-            raw_nodes_by_date[date_str].append(raw_node)
+        # the UTC day of each raw node, in the order of the nodes
+        raw_days = self.to_utc_day_strings(
+            [raw_node.metadata.get(self.metadata_date_key) for raw_node in raw_nodes]
+        )
+        raw_texts_by_day: dict[str, list[str]] = defaultdict(list)
+        for raw_node, day in zip(raw_nodes, raw_days):
+            if day is not None:
+                raw_texts_by_day[day].append(raw_node.text.replace("\n", " "))
 
         # A summary could be separated into multiple nodes
-        # combining them together
-        combined_summaries: dict[str, str] = defaultdict(str)
-        for summary_node in summary_nodes:
-            date = summary_node.metadata["date"]
-            summary_text = summary_node.text
-
-            summaries = summary_text.split("\n")
-            summary_bullets = set(summaries)
-            if "" in summary_bullets:
-                summary_bullets.remove("")
-            combined_summaries[date] += "\n".join(summary_bullets)
+        # combining their bullets together, in order and without the repeated ones
+        summary_bullets: dict[str, dict[str, None]] = {}
+        for summary_node, day in zip(summary_nodes, self.summary_days(summary_nodes)):
+            bullets = summary_bullets.setdefault(day, {})
+            for bullet in summary_node.text.split("\n"):
+                if bullet:
+                    bullets[bullet] = None
 
         # Build the combined prompt
-        combined_sections = []
+        sections: list[str] = []
+        for day, bullets in summary_bullets.items():
+            sections.append(self.summary_header(day))
+            sections.append("\n".join(bullets))
+            sections.append("\n\n")
+            if day in raw_texts_by_day:
+                sections.append("Raw Messages:\n")
+                sections.append("\n".join(raw_texts_by_day[day]))
+            sections.append("\n\n")
 
-        for date, summary_bullets in combined_summaries.items():
-            section = f"Date: {date}\nContext Summary:\n" + summary_bullets + "\n\n"
+        # the separator of the last section is not part of the prompt
+        return "".join(sections[:-1])
 
-            if date in raw_nodes_by_date:
-                raw_texts = [node.text for node in raw_nodes_by_date[date]]
-                raw_texts_cleaned = []
-                for text in raw_texts:
-                    raw_texts_cleaned.append(text.replace("\n", " "))
-                section += "Raw Messages:\n" + "\n".join(raw_texts_cleaned)
+    def summary_header(self, day: str) -> str:
+        """
+        the lines rendered before a day's summary within the prompt
+        """
+        return f"Date: {day}\nContext Summary:\n"
 
-            combined_sections.append(section)
+    def summary_days(self, summary_nodes: list[NodeWithScore]) -> list[str]:
+        """
+        the day of each summary node, as rendered within the prompt
 
-        return "\n\n".join(combined_sections)
+        Parameters
+        ----------
+        summary_nodes : list[NodeWithScore]
+            the summary nodes having their `date` metadata
+            either in "%Y-%m-%d" format or a timestamp
+
+        Returns
+        -------
+        days : list[str]
+            the days of the summaries in their order
+        """
+        summary_dates = [summary_node.metadata["date"] for summary_node in summary_nodes]
+        timestamp_days = iter(
+            self.to_utc_day_strings(
+                [date for date in summary_dates if not isinstance(date, str)]
+            )
+        )
+        days: list[str] = []
+        for date in summary_dates:
+            day = date if isinstance(date, str) else next(timestamp_days)
+            days.append(day or str(date))
+        return days
+
+    def to_utc_day_strings(self, timestamps: list) -> list[str | None]:
+        """
+        convert the timestamps into their UTC `%Y-%m-%d` days, all at once
+
+        Parameters
+        ----------
+        timestamps : list
+            the float or integer timestamps, in seconds
+            the missing or invalid ones are None
+
+        Returns
+        -------
+        days : list[str | None]
+            the days of the timestamps in their order, None for the invalid ones
+        """
+        if not timestamps:
+            return []
+        values = np.array(
+            [
+                value if isinstance(value, (int, float)) and not isinstance(value, bool)
+                else np.nan
+                for value in timestamps
+            ],
+            dtype=np.float64,
+        )
+        valid = np.isfinite(values)
+        days = np.floor_divide(np.where(valid, values, 0), 86400).astype("datetime64[D]")
+        day_strings = np.datetime_as_string(days, unit="D").tolist()
+        return [
+            day if is_valid else None for day, is_valid in zip(day_strings, valid.tolist())
+        ]
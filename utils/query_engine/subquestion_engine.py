@@ -10,14 +10,107 @@ from llama_index.core.instrumentation.events.query import QueryEndEvent, QuerySt
 from llama_index.core.query_engine import SubQuestionAnswerPair, SubQuestionQueryEngine
 from llama_index.core.question_gen.types import BaseQuestionGenerator, SubQuestion
 from llama_index.core.response_synthesizers import BaseSynthesizer
-from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
 from llama_index.core.tools.query_engine import QueryEngineTool
+from llama_index.core.tools.types import ToolMetadata
 from llama_index.core.utils import get_color_mapping, print_text
+from utils.globals import QDRANT_BATCH_RETRIEVAL
+from utils.query_engine.batch_qdrant_retrieval import prefetch_nodes
+from utils.query_engine.node_pruning import dedupe_nodes
 
 dispatcher = instrument.get_dispatcher(__name__)
 logger = logging.getLogger(__name__)
 
 
+def generate_sub_questions(
+    question_gen: BaseQuestionGenerator,
+    tools: Sequence[ToolMetadata],
+    query_bundle: QueryBundle,
+) -> list[SubQuestion]:
+    """
+    generate the sub-questions of a query
+    if the generator fails to parse/return output, gracefully fall back
+    to querying each available tool with the original query
+
+    Parameters
+    ------------
+    question_gen : BaseQuestionGenerator
+        the sub-question generator
+    tools : Sequence[ToolMetadata]
+        the tools the sub-questions could be asked from
+    query_bundle : QueryBundle
+        the user query
+
+    Returns
+    ---------
+    sub_questions : list[SubQuestion]
+        the sub-questions, each for one of the tools
+    """
+    try:
+        sub_questions = question_gen.generate(tools, query_bundle)
+    except Exception as exp:
+        logger.warning(
+            "Sub-question generation failed; falling back to default strategy: %s",
+            exp,
+        )
+        sub_questions = []
+    else:
+        # Handle empty or None returns defensively
+        if not sub_questions:
+            logger.warning(
+                "Sub-question generator returned no items; using fallback with all tools."
+            )
+
+    if not sub_questions:
+        # Fallback: one sub-question per available tool using the original query
+        sub_questions = [
+            SubQuestion(sub_question=query_bundle.query_str, tool_name=tool.name)
+            for tool in tools
+        ]
+    return sub_questions
+
+
+def synthesize_answer(
+    response_synthesizer: BaseSynthesizer,
+    query_bundle: QueryBundle,
+    qa_pairs: Sequence[SubQuestionAnswerPair],
+) -> RESPONSE_TYPE:
+    """
+    synthesize the final answer from the sub-questions' answers
+
+    Parameters
+    ------------
+    response_synthesizer : BaseSynthesizer
+        the synthesizer to use
+    query_bundle : QueryBundle
+        the user query
+    qa_pairs : Sequence[SubQuestionAnswerPair]
+        the answered sub-questions
+
+    Returns
+    ---------
+    response : RESPONSE_TYPE
+        the synthesized response
+    """
+    nodes = [
+        NodeWithScore(
+            node=TextNode(
+                text=f"Sub question: {pair.sub_q.sub_question}\nResponse: {pair.answer}"
+            )
+        )
+        for pair in qa_pairs
+    ]
+    # the sub-questions of the same platform often share their sources
+    source_nodes = dedupe_nodes(
+        [node for qa_pair in qa_pairs for node in qa_pair.sources]
+    )
+    return response_synthesizer.synthesize(
+        query=query_bundle,
+        nodes=nodes,
+        additional_source_nodes=source_nodes,
+    )
+
+
 class CustomSubQuestionQueryEngine(SubQuestionQueryEngine):
     def __init__(
         self,
@@ -27,6 +120,7 @@ class CustomSubQuestionQueryEngine(SubQuestionQueryEngine):
         callback_manager: CallbackManager | None = None,
         verbose: bool = True,
         use_async: bool = False,
+        batch_retrieval: bool = QDRANT_BATCH_RETRIEVAL,
     ) -> None:
         super().__init__(
             question_gen,
@@ -38,6 +132,7 @@ class CustomSubQuestionQueryEngine(SubQuestionQueryEngine):
         )
         # Store metadata from individual query engines
         self._engine_metadata = {}
+        self._batch_retrieval = batch_retrieval
 
     def _query(
         self, query_bundle: QueryBundle
@@ -48,29 +143,9 @@ class CustomSubQuestionQueryEngine(SubQuestionQueryEngine):
         with self.callback_manager.event(
             CBEventType.QUERY, payload={EventPayload.QUERY_STR: query_bundle.query_str}
         ) as query_event:
-            # Generate sub-questions; if the generator fails to parse/return output,
-            # gracefully fall back to querying each available tool with the original query.
-            try:
-                sub_questions = self._question_gen.generate(self._metadatas, query_bundle)
-            except Exception as exp:
-                logger.warning(
-                    "Sub-question generation failed; falling back to default strategy: %s",
-                    exp,
-                )
-                # Fallback: one sub-question per available tool using the original query
-                sub_questions = [
-                    SubQuestion(sub_question=query_bundle.query_str, tool_name=tool_name)
-                    for tool_name in self._query_engines.keys()
-                ]
-            # Handle empty or None returns defensively
-            if not sub_questions:
-                logger.warning(
-                    "Sub-question generator returned no items; using fallback with all tools."
-                )
-                sub_questions = [
-                    SubQuestion(sub_question=query_bundle.query_str, tool_name=tool_name)
-                    for tool_name in self._query_engines.keys()
-                ]
+            sub_questions = generate_sub_questions(
+                self._question_gen, self._metadatas, query_bundle
+            )
 
             colors = get_color_mapping([str(i) for i in range(len(sub_questions))])
 
@@ -86,6 +161,8 @@ class CustomSubQuestionQueryEngine(SubQuestionQueryEngine):
                 qa_pairs_all = run_async_tasks(tasks)
                 qa_pairs_all = cast(List[Optional[SubQuestionAnswerPair]], qa_pairs_all)
             else:
+                if self._batch_retrieval:
+                    self._prefetch_nodes(sub_questions)
                 qa_pairs_all = [
                     self._query_subq(sub_q, color=colors[str(ind)])
                     for ind, sub_q in enumerate(sub_questions)
@@ -94,15 +171,8 @@ class CustomSubQuestionQueryEngine(SubQuestionQueryEngine):
             # filter out sub questions that failed
             qa_pairs: List[SubQuestionAnswerPair] = list(filter(None, qa_pairs_all))
             if qa_pairs:
-                nodes = [self._construct_node(pair) for pair in qa_pairs]
-
-                source_nodes = [
-                    node for qa_pair in qa_pairs for node in qa_pair.sources
-                ]
-                response = self._response_synthesizer.synthesize(
-                    query=query_bundle,
-                    nodes=nodes,
-                    additional_source_nodes=source_nodes,
+                response = synthesize_answer(
+                    self._response_synthesizer, query_bundle, qa_pairs
                 )
                 # Add response metadata from each query engine
                 response.metadata = self._engine_metadata.copy()
@@ -129,6 +199,22 @@ class CustomSubQuestionQueryEngine(SubQuestionQueryEngine):
         )
         return query_result, qa_pairs_all
 
+    def _prefetch_nodes(self, sub_questions: list[SubQuestion]) -> None:
+        """
+        search the engines' collections for all sub-questions with batched requests
+        on failure, each engine would retrieve its nodes itself
+        """
+        try:
+            prefetch_nodes(
+                [
+                    (self._query_engines[sub_q.tool_name], sub_q.sub_question)
+                    for sub_q in sub_questions
+                    if sub_q.tool_name in self._query_engines
+                ]
+            )
+        except Exception as exp:
+            logger.warning(f"Batched retrieval failed, retrieving per engine: {exp}")
+
     def _query_subq(
         self, sub_q: SubQuestion, color: Optional[str] = None
     ) -> Optional[SubQuestionAnswerPair]:
@@ -6,11 +6,32 @@ from traceloop.sdk import Traceloop
 
 load_dotenv()
 
+# the process tracing was initialized in (the exporters don't survive a fork)
+_initialized_pid: int | None = None
+
 
 def init_tracing():
+    """
+    initialize Traceloop once per process, calling it again is a no-op
+
+    the share of traced requests can be bounded by `TRACELOOP_SAMPLING_RATE`
+    (between 0 and 1), unless an OpenTelemetry sampler is already configured
+    """
+    global _initialized_pid
+    if _initialized_pid == os.getpid():
+        return
+    _initialized_pid = os.getpid()
+
     otel_endpoint = os.getenv("TRACELOOP_BASE_URL")
     if not otel_endpoint:
         logging.error("TRACELOOP_BASE_URL is not set.")
         return
+
+    sampling_rate = os.getenv("TRACELOOP_SAMPLING_RATE")
+    if sampling_rate and "OTEL_TRACES_SAMPLER" not in os.environ:
+        # read by the TracerProvider Traceloop creates
+        os.environ["OTEL_TRACES_SAMPLER"] = "parentbased_traceidratio"
+        os.environ["OTEL_TRACES_SAMPLER_ARG"] = str(float(sampling_rate))
+
     Traceloop.init(app_name="hivemind-worker", api_endpoint=otel_endpoint)
     logging.info("Traceloop initialized.")
@@ -1,4 +1,5 @@
 from celery import Celery
+from kombu import Queue
 from utils.credentials import load_rabbitmq_credentials, load_redis_credentials
 
 rabbit_creds = load_rabbitmq_credentials()
@@ -9,12 +10,42 @@ port = rabbit_creds["port"]
 
 redis_creds = load_redis_credentials()
 
+# priority lanes, each consumed by its own workers
+# the interactive lane keeps celery's default queue name for backward compatibility
+INTERACTIVE_QUEUE = "celery"
+BACKGROUND_QUEUE = "hivemind_background"
+
 app = Celery(
     "tasks",
     broker=f"pyamqp://{user}:{password}@{host}:{port}//",
     backend=redis_creds["url"],
     include=["worker.tasks"],
 )
+app.conf.task_queues = (
+    Queue(INTERACTIVE_QUEUE, routing_key=INTERACTIVE_QUEUE),
+    Queue(BACKGROUND_QUEUE, routing_key=BACKGROUND_QUEUE),
+)
+app.conf.task_default_queue = INTERACTIVE_QUEUE
+# a long question shouldn't hold other prefetched ones behind it
+app.conf.worker_prefetch_multiplier = 1
+
+
+def select_queue(enable_answer_skipping: bool) -> str:
+    """
+    select the lane of a question
+
+    Parameters
+    ------------
+    enable_answer_skipping : bool
+        auto-answer questions (answered only if confident) go to the background lane
+        explicit user questions go to the interactive lane
+
+    Returns
+    ---------
+    queue : str
+        the celery queue to send the task to
+    """
+    return BACKGROUND_QUEUE if enable_answer_skipping else INTERACTIVE_QUEUE
 
 
 if __name__ == "__main__":
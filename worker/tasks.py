@@ -1,19 +1,24 @@
 import gc
 import logging
+import os
 from typing import Any
 
-from celery.signals import task_postrun, task_prerun
+from celery.signals import task_postrun, worker_init, worker_process_init
 from llama_index.core.query_engine import SubQuestionAnswerPair
 from subquery import query_multiple_source
-from utils.data_source_selector import DataSourceSelector
+from utils.data_source_selector import DataSourceCache
 from utils.globals import (
     NO_ANSWER_REFERENCE,
     NO_DATA_SOURCE_SELECTED,
     QUERY_ERROR_MESSAGE,
 )
+from utils.model_cache import preload_models, warm_up_models
+from utils.mongo_indexes import ensure_mongo_indexes
+from utils.pg_engines import get_pg_engine_registry
 from utils.query_engine.prepare_answer_sources import PrepareAnswerSources
 from utils.traceloop import init_tracing
 from worker.celery import app
+from worker.utils.memory import AdaptiveGarbageCollector, current_rss_mb
 
 
 # TODO: update the flow to accept testing parameters in HivemindQueryPayload
@@ -25,10 +30,13 @@ EVALUATION_DISCORD_PLATFORM_ID = "4321"
 def ask_question_auto_search(
     community_id: str,
     query: str,
+    enable_answer_skipping: bool = False,
 ) -> dict[str, Any]:
     try:
         response, references = query_data_sources(
-            community_id=community_id, query=query
+            community_id=community_id,
+            query=query,
+            enable_answer_skipping=enable_answer_skipping,
         )
         answer_sources = PrepareAnswerSources().prepare_answer_sources(nodes=references)
     except Exception:
@@ -46,16 +54,46 @@ def ask_question_auto_search(
     }
 
 
-@task_prerun.connect
-def task_prerun_handler(sender=None, **kwargs):
-    # Initialize Traceloop for LLM
+garbage_collector = AdaptiveGarbageCollector(
+    rss_threshold_mb=float(os.getenv("CELERY_GC_RSS_THRESHOLD_MB", 2048)),
+    gen2_threshold=int(os.getenv("CELERY_GC_GEN2_THRESHOLD", 5)),
+    max_tasks_between_collections=int(os.getenv("CELERY_GC_MAX_TASKS", 20)),
+)
+
+
+@worker_init.connect
+def worker_init_handler(**kwargs):
+    # loading the models in the parent process before the pool forks,
+    # so the children share them through copy-on-write
+    try:
+        preload_models()
+    except Exception as exp:
+        logging.error(f"Failed to preload models, loading lazily instead! exp: {exp}")
+    # keeping the preloaded objects out of the collections
+    # so the gc doesn't write to (and copy) the shared pages
+    gc.freeze()
+
+
+@worker_process_init.connect
+def worker_process_init_handler(**kwargs):
+    # creating the indexes the queries rely on (no-op if already available)
+    ensure_mongo_indexes()
+    # Initialize Traceloop for LLM once per child process
     init_tracing()
+    try:
+        warm_up_models()
+    except Exception as exp:
+        logging.error(f"Failed to warm up models! exp: {exp}")
+    logging.info(f"Worker process ready, rss: {current_rss_mb():.1f} MB")
 
 
 @task_postrun.connect
 def task_postrun_handler(sender=None, **kwargs):
-    # Trigger garbage collection after each task
-    gc.collect()
+    # a full collection only when the memory or the gc generations call for it
+    garbage_collector.maybe_collect()
+    # the stats walk all the pools, only gathered if they would be logged
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug(f"Postgres pools: {get_pg_engine_registry().stats()}")
 
 
 def query_data_sources(
@@ -98,14 +136,7 @@ def query_data_sources(
         f"{prefix} Answer skipping in case of non-relevant information: {enable_answer_skipping}"
     )
 
-    if community_id == EVALUATION_COMMUNITY_ID:
-        data_sources = {
-            "discord": EVALUATION_DISCORD_PLATFORM_ID,
-        }
-    else:
-        selector = DataSourceSelector()
-        data_sources = selector.select_data_source(community_id)
-
+    data_sources = select_data_sources(community_id)
     logging.info(f"{prefix} Data sources selected: {data_sources}")
 
     # Platform IDs are now directly in data_sources, pass them directly
@@ -138,3 +169,19 @@ def query_data_sources(
         return response, references, metadata
 
     return response, references
+
+
+def select_data_sources(community_id: str) -> dict[str, str]:
+    """
+    the platforms of a community to answer its questions from
+
+    Returns
+    ---------
+    data_sources : dict[str, str]
+        the platform names and their ids
+    """
+    if community_id == EVALUATION_COMMUNITY_ID:
+        return {
+            "discord": EVALUATION_DISCORD_PLATFORM_ID,
+        }
+    return DataSourceCache.get_instance().select_data_source(community_id)
@@ -1,11 +1,126 @@
+import asyncio
+import json
 import logging
+from datetime import datetime
 from typing import Any
 
-from tc_messageBroker import RabbitMQ
+import aio_pika
+from aio_pika.abc import AbstractChannel, AbstractRobustConnection
+from aio_pika.pool import Pool
 from utils.credentials import load_rabbitmq_credentials
 
 
-def job_send(event: str, queue_name: str, content: dict[str, Any]) -> None:
+class RabbitMQPublisher:
+    """
+    a long-lived rabbitmq publisher
+    holding a robust (auto-reconnecting) connection and a pool of channels
+    """
+
+    __instance = None
+
+    def __init__(self, url: str, max_channels: int = 10) -> None:
+        """
+        Parameters
+        ------------
+        url : str
+            the amqp url of the broker
+        max_channels : int
+            the maximum number of channels to publish concurrently on
+        """
+        self.url = url
+        self.max_channels = max_channels
+
+        self._connection: AbstractRobustConnection | None = None
+        self._connection_lock = asyncio.Lock()
+        self._channel_pool: Pool[AbstractChannel] = Pool(
+            self._create_channel, max_size=max_channels
+        )
+        # queues already declared on the broker
+        self._declared_queues: set[str] = set()
+
+    @staticmethod
+    def get_instance() -> "RabbitMQPublisher":
+        if RabbitMQPublisher.__instance is None:
+            rabbit_creds = load_rabbitmq_credentials()
+            RabbitMQPublisher.__instance = RabbitMQPublisher(url=rabbit_creds["url"])
+        return RabbitMQPublisher.__instance
+
+    async def publish(self, event: str, queue_name: str, content: dict[str, Any]) -> None:
+        """
+        publish a message on a queue and wait for the broker to confirm it
+
+        Parameters
+        -----------
+        event : str
+            the event to fire message to
+        queue_name : str
+            the queue to fire message on
+        content : dict[str, Any]
+            the content to send messages to
+        """
+        await self.publish_batch([(event, queue_name, content)])
+
+    async def publish_batch(
+        self, messages: list[tuple[str, str, dict[str, Any]]]
+    ) -> None:
+        """
+        publish multiple messages on a single channel
+        and wait for the broker confirms of the whole batch at once
+
+        Parameters
+        -----------
+        messages : list[tuple[str, str, dict[str, Any]]]
+            tuples of (event, queue_name, content) to publish
+        """
+        async with self._channel_pool.acquire() as channel:
+            for queue_name in {queue_name for _, queue_name, _ in messages}:
+                await self._declare_queue(channel, queue_name)
+
+            confirmations = [
+                channel.default_exchange.publish(
+                    aio_pika.Message(body=self._define_data(event, content)),
+                    routing_key=queue_name,
+                )
+                for event, queue_name, content in messages
+            ]
+            await asyncio.gather(*confirmations)
+
+    async def close(self) -> None:
+        """
+        close the channels and the connection
+        """
+        await self._channel_pool.close()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+        self._declared_queues.clear()
+
+    async def _get_connection(self) -> AbstractRobustConnection:
+        async with self._connection_lock:
+            if self._connection is None or self._connection.is_closed:
+                self._connection = await aio_pika.connect_robust(self.url)
+        return self._connection
+
+    async def _create_channel(self) -> AbstractChannel:
+        connection = await self._get_connection()
+        return await connection.channel(publisher_confirms=True)
+
+    async def _declare_queue(self, channel: AbstractChannel, queue_name: str) -> None:
+        """
+        declare the queue just the first time it is published to
+        """
+        if queue_name in self._declared_queues:
+            return
+        await channel.declare_queue(queue_name, durable=True)
+        self._declared_queues.add(queue_name)
+
+    def _define_data(self, event: str, content: dict[str, Any]) -> bytes:
+        # the same message structure as `tc_messageBroker.RabbitMQ`
+        data = {"event": event, "date": str(datetime.now()), "content": content}
+        return json.dumps(data).encode()
+
+
+async def job_send(event: str, queue_name: str, content: dict[str, Any]) -> None:
     """
     fire the data to a specific event on a specific queue
 
@@ -18,21 +133,10 @@ def job_send(event: str, queue_name: str, content: dict[str, Any]) -> None:
     content : dict[str, Any]
         the content to send messages to
     """
-    rabbit_creds = load_rabbitmq_credentials()
-    username = rabbit_creds["user"]
-    password = rabbit_creds["password"]
-    broker_url = rabbit_creds["host"]
-    port = rabbit_creds["port"]
-    rabbit_mq = RabbitMQ(
-        broker_url=broker_url, port=port, username=username, password=password
-    )
-    rabbit_mq.connect(queue_name)
-    rabbit_mq.publish(
-        queue_name=queue_name,
-        event=event,
-        content=content,
-    )
     try:
-        rabbit_mq.connection.close()
+        await RabbitMQPublisher.get_instance().publish(
+            event=event, queue_name=queue_name, content=content
+        )
     except Exception as e:
-        logging.error(f"Failed to close RabbitMQ connection: {e}")
+        logging.error(f"Failed to publish message on queue {queue_name}: {e}")
+        raise
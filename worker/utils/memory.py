@@ -0,0 +1,91 @@
+import gc
+import logging
+import os
+import resource
+
+
+def current_rss_mb() -> float:
+    """
+    the resident set size of the current process in megabytes
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # not linux, the peak rss is the closest available value
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def private_memory_mb() -> float | None:
+    """
+    the memory private to the current process (not shared with the parent)
+    in megabytes, None if not available on the platform
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            private_kb = sum(
+                int(line.split()[1])
+                for line in smaps
+                if line.startswith(("Private_Clean:", "Private_Dirty:"))
+            )
+        return private_kb / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class AdaptiveGarbageCollector:
+    """
+    run a full garbage collection only when it is likely to free memory
+    instead of after every single task
+    """
+
+    def __init__(
+        self,
+        rss_threshold_mb: float,
+        gen2_threshold: int,
+        max_tasks_between_collections: int,
+    ) -> None:
+        """
+        Parameters
+        ------------
+        rss_threshold_mb : float
+            collect if the process memory went above this value
+        gen2_threshold : int
+            collect if this many younger-generation collections
+            happened since the last full collection (`gc.get_count()[2]`)
+        max_tasks_between_collections : int
+            collect anyway after this number of tasks
+        """
+        self.rss_threshold_mb = rss_threshold_mb
+        self.gen2_threshold = gen2_threshold
+        self.max_tasks_between_collections = max_tasks_between_collections
+
+        self._tasks_since_collection = 0
+
+    def maybe_collect(self) -> bool:
+        """
+        run the garbage collection if any of the thresholds were reached
+
+        Returns
+        ---------
+        collected : bool
+            whether a collection was done
+        """
+        self._tasks_since_collection += 1
+
+        reason = None
+        if self._tasks_since_collection >= self.max_tasks_between_collections:
+            reason = f"{self._tasks_since_collection} tasks since the last collection"
+        elif current_rss_mb() >= self.rss_threshold_mb:
+            reason = f"rss above {self.rss_threshold_mb} MB"
+        elif gc.get_count()[2] >= self.gen2_threshold:
+            reason = "oldest generation pending collections"
+
+        if reason is None:
+            return False
+
+        collected = gc.collect()
+        logging.info(f"Garbage collected {collected} objects, reason: {reason}")
+        self._tasks_since_collection = 0
+        return True